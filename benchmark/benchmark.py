@@ -0,0 +1,324 @@
+'''
+#
+# benchmark.py
+#
+# Run the public reports against the synthetic database of mgdfixture.py
+# and print, per report, its time, CPU, peak memory and the number and time
+# of the queries it issued, so that a change can be measured without the
+# production database.
+#
+# The reports run through lib/reportrunner.py with the query trace on
+# (lib/querytrace.py, lib/reporttelemetry.py).  Every directory variable
+# the reports write to (OUTPUTS: ${REPORTOUTPUTDIR}, ${CVDCDIR},
+# ${IPHONEARCHIVE}, ${QCREPORTDIR}, ...) and the history of the benchmark
+# runs are pointed at the benchmark directory.  benchmark.py refuses to run
+# if a report reads a variable it does not know (not in OUTPUTS or INPUTS),
+# or if one of OUTPUTS resolves outside the benchmark directory.
+#
+# Usage:
+#       benchmark.py [-S server] [-D database] [-U user] [-P password file]
+#               [-o benchmark directory] [-j jobs] [-i] [report directory ...]
+#
+#       -S, -D, -U      the fixture database (defaults: localhost, mgdfixture,
+#                       ${PG_DBUSER})
+#       -P              password file of the user (${PG_1LINE_PASSFILE})
+#       -o              benchmark directory (default: ./benchmark.out); keep it
+#                       between runs to compare them
+#       -j              reports run at the same time (default: 1, so that the
+#                       timings do not depend on each other)
+#       -i              run the reports in-process (reportrunner.py -i)
+#
+#       report directory: default weekly daily
+#
+#       Run it with the report environment (source Configuration), e.g.:
+#
+#       createdb mgdfixture
+#       ${PYTHON} benchmark/mgdfixture.py -s 0.5
+#       ${PYTHON} benchmark/benchmark.py
+#       ... change a report ...
+#       ${PYTHON} benchmark/benchmark.py
+#
+#       The second run prints the time of the first next to its own.
+#       A report that needs data the fixture does not have (files of other
+#       loads, tables mgdfixture.py does not build) fails; see its log in
+#       <benchmark directory>/logs/<report directory>/<report>.log.
+#
+# Python:
+#       benchmark.results(benchmark directory, report directory) returns the
+#       results of the last run of the report directory (dicts: task, status,
+#       seconds, cpu, maxrss, queries, querySeconds, previous)
+#
+'''
+
+import sys
+import os
+import re
+import json
+import glob
+import getopt
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+
+import reporttelemetry
+
+# {variable : subdirectory of the benchmark directory}: where the reports write
+OUTPUTS = {
+    'REPORTOUTPUTDIR' : 'output',
+    'REPORTLOGSDIR' : 'logs',
+    'REPORTCACHEDIR' : 'cache',
+    'CVDCDIR' : 'output/cvdc',
+    'GXDRNASEQDIR' : 'output/gxdrnaseq',
+    'IPHONEARCHIVE' : 'archive/iphone',
+    'QCREPORTDIR' : 'qcreports',
+}
+
+# subdirectories the reports expect to exist
+SUBDIRECTORIES = ('qcreports/output',)
+
+# variables the reports read that name no place they write: settings and
+# input files
+INPUTS = (
+    'PYTHON', 'DATADOWNLOADS', 'TAL_FILE', 'WI_URL', 'IMSR_STRAINS_CSV',
+    'NCBILINKOUT_BASE_MARKER', 'NCBILINKOUT_BASE_REF', 'NCBILINKOUT_COUNT',
+    'REPORTJOBS', 'REPORTSTREAMBATCH', 'REPORTEXPORTCHECK',
+    'REPORTQUERYTRACE', 'REPORTQUERYEXPLAIN', 'REPORTQUERYTOP',
+    'REPORTHISTORY', 'REPORTREGRESSIONFACTOR', 'REPORTHISTORYWINDOW',
+    'REPORTPROFILE', 'REPORTPROFILEINTERVAL',
+)
+
+# os.environ['X'], os.environ.get('X'), os.getenv('X'), ${X} (os.system())
+variable = re.compile(r'''os\.environ\[\s*['"](\w+)['"]|os\.environ\.get\(\s*['"](\w+)['"]|os\.getenv\(\s*['"](\w+)['"]|\$\{(\w+)\}''')
+
+def variables(directories):
+    #
+    # {variable : [file]} of the variables read by the reports of directories
+    # and by lib/ (test_*.py excepted)
+    #
+
+    files = []
+    for directory in directories:
+        files = files + sorted(glob.glob(os.path.join(directory, '*.py')))
+    files = files + [f for f in sorted(glob.glob(os.path.join(ROOT, 'lib', '*.py'))) \
+        if not os.path.basename(f).startswith('test_')]
+
+    found = {}
+    for fileName in files:
+        fp = open(fileName, 'r')
+        text = fp.read()
+        fp.close()
+        for m in variable.finditer(text):
+            name = [g for g in m.groups() if g][0]
+            # ${X} of lib/ are documentation
+            if m.group(4) and os.path.dirname(fileName) == os.path.join(ROOT, 'lib'):
+                continue
+            found.setdefault(name, []).append(os.path.relpath(fileName, ROOT))
+
+    return found
+
+def inside(path, benchDir):
+    path = os.path.realpath(path)
+    benchDir = os.path.realpath(benchDir)
+    return path == benchDir or path.startswith(benchDir + os.sep)
+
+def environment(server, database, user, passwordFile, benchDir, directories):
+    #
+    # the report environment, pointed at the fixture and the benchmark directory;
+    # raise ValueError if the reports of directories could write outside it
+    #
+
+    env = dict(os.environ)
+    env['PG_DBSERVER'] = server
+    env['PG_DBNAME'] = database
+    if user:
+        env['PG_DBUSER'] = user
+    if passwordFile:
+        env['PG_1LINE_PASSFILE'] = passwordFile
+
+    for name, subdirectory in OUTPUTS.items():
+        env[name] = os.path.join(benchDir, subdirectory)
+    env['REPORTHISTORY'] = historyFile(benchDir)
+    env['REPORTQUERYTRACE'] = '1'
+    env['PYTHONPATH'] = os.path.join(ROOT, 'lib') + os.pathsep + env.get('PYTHONPATH', '')
+
+    unknown = []
+    for name, files in sorted(variables(directories).items()):
+        if name not in OUTPUTS and name not in INPUTS and not name.startswith('PG_'):
+            unknown.append('%s (%s)' % (name, ', '.join(sorted(set(files)))))
+    if unknown:
+        raise ValueError('variables the reports read that benchmark.py does not redirect ' + \
+            '(add them to OUTPUTS or INPUTS): %s' % (', '.join(unknown)))
+
+    for name in list(OUTPUTS.keys()) + ['REPORTHISTORY']:
+        # a symbolic link of the benchmark directory may lead elsewhere
+        if not inside(env[name], benchDir):
+            raise ValueError('%s (%s) is outside the benchmark directory %s' % (name, env[name], benchDir))
+
+    for subdirectory in list(OUTPUTS.values()) + list(SUBDIRECTORIES):
+        path = os.path.join(benchDir, subdirectory)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    return env
+
+def historyFile(benchDir):
+    return os.path.join(benchDir, 'history.jsonl')
+
+def logDir(benchDir, directory):
+    return os.path.join(benchDir, 'logs', os.path.basename(directory))
+
+def runReports(env, benchDir, directory, jobs, inprocess):
+    #
+    # run the reports of directory; the runner's own log goes to
+    # <benchmark directory>/logs/<report directory>.log
+    #
+
+    logs = logDir(benchDir, directory)
+    if not os.path.isdir(logs):
+        os.makedirs(logs)
+
+    command = [sys.executable, os.path.join(ROOT, 'lib', 'reportrunner.py'), '-d', directory, '-l', logs, '-j', str(jobs), '-q']
+    if inprocess:
+        command.append('-i')
+
+    fp = open(logs + '.log', 'w')
+    subprocess.call(command, env = env, stdout = fp, stderr = subprocess.STDOUT)
+    fp.close()
+
+def queryStats(fileName):
+    #
+    # (queries, seconds) of a trace file
+    #
+
+    queries = 0
+    seconds = 0.0
+
+    if not os.path.exists(fileName):
+        return queries, seconds
+
+    fp = open(fileName, 'r')
+    for line in fp:
+        try:
+            e = json.loads(line)
+        except ValueError:
+            continue
+        queries = queries + 1
+        seconds = seconds + e['seconds']
+    fp.close()
+
+    return queries, seconds
+
+def results(benchDir, directory):
+    #
+    # the results of the last run of directory, with the time of the
+    # run before it ("previous", None if there is none)
+    #
+
+    name = os.path.basename(directory)
+    history = [e for e in reporttelemetry.read(historyFile(benchDir)) if e.get('directory') == name]
+    runs = sorted(set([e['run'] for e in history]))
+    if not runs:
+        return []
+
+    previous = {}
+    if len(runs) > 1:
+        for e in history:
+            if e['run'] == runs[-2]:
+                previous[e['task']] = e['seconds']
+
+    rows = []
+    for e in history:
+        if e['run'] != runs[-1]:
+            continue
+        queries, querySeconds = queryStats(os.path.join(logDir(benchDir, directory), e['task'] + '.queries.jsonl'))
+        rows.append({
+            'task' : e['task'],
+            'status' : e['status'],
+            'seconds' : e['seconds'],
+            'cpu' : e['cpu'],
+            'maxrss' : e['maxrss'],
+            'queries' : queries,
+            'querySeconds' : querySeconds,
+            'previous' : previous.get(e['task']),
+        })
+
+    return rows
+
+def report(directory, rows):
+    #
+    # the results as lines of text
+    #
+
+    lines = [directory,
+        '    %-40s %6s %9s %9s %8s %8s %9s %9s' % ('report', 'status', 'seconds', 'cpu', 'rss MB', 'queries', 'query s', 'previous')]
+
+    failed = []
+    for r in sorted(rows, key = lambda r: r['task']):
+        if r['previous'] is None:
+            previous = '-'
+        else:
+            previous = '%.1f' % (r['previous'])
+        lines.append('    %-40s %6s %9.1f %9.1f %8.0f %8d %9.1f %9s' % (r['task'], r['status'], r['seconds'], r['cpu'],
+            r['maxrss'] / 1024.0, r['queries'], r['querySeconds'], previous))
+        if r['status'] != 0:
+            failed.append(r['task'])
+
+    ok = [r for r in rows if r['status'] == 0]
+    lines.append('    %d reports, %d failed; succeeded: %.1f seconds, %d queries' % \
+        (len(rows), len(failed), sum([r['seconds'] for r in ok]), sum([r['queries'] for r in ok])))
+    if failed:
+        lines.append('    failed: %s' % (', '.join(failed)))
+
+    return lines
+
+def main():
+
+    server = 'localhost'
+    database = 'mgdfixture'
+    user = os.environ.get('PG_DBUSER')
+    passwordFile = os.environ.get('PG_1LINE_PASSFILE')
+    benchDir = 'benchmark.out'
+    jobs = 1
+    inprocess = 0
+
+    try:
+        optlist, args = getopt.getopt(sys.argv[1:], 'S:D:U:P:o:j:i')
+    except getopt.GetoptError as e:
+        sys.stderr.write('%s\n%s\n' % (e, __doc__))
+        sys.exit(1)
+
+    for opt, arg in optlist:
+        if opt == '-S':
+            server = arg
+        elif opt == '-D':
+            database = arg
+        elif opt == '-U':
+            user = arg
+        elif opt == '-P':
+            passwordFile = arg
+        elif opt == '-o':
+            benchDir = arg
+        elif opt == '-j':
+            jobs = int(arg)
+        elif opt == '-i':
+            inprocess = 1
+
+    directories = args or ['weekly', 'daily']
+    directories = [os.path.abspath(os.path.join(ROOT, d)) for d in directories]
+    benchDir = os.path.abspath(benchDir)
+
+    try:
+        env = environment(server, database, user, passwordFile, benchDir, directories)
+    except ValueError as e:
+        sys.stderr.write('benchmark.py: %s\n' % (e))
+        sys.exit(1)
+
+    for directory in directories:
+        runReports(env, benchDir, directory, jobs, inprocess)
+        for line in report(os.path.basename(directory), results(benchDir, directory)):
+            print(line)
+        sys.stdout.flush()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,780 @@
+'''
+#
+# mgdfixture.py
+#
+# Build a synthetic, scaled subset of MGD in a local PostgreSQL database,
+# so that the reports can be run and timed without the production database
+# (see benchmark.py).
+#
+# The tables have the MGD names and the columns the reports use, in schema
+# "mgd" (the database's search_path is set to mgd, public).  The rows are
+# random but consistent: every key points to a row that exists, and the
+# keys the reports select on (logical DBs, MGI types, annotation types,
+# note types, cluster type/source, qualifiers, ...) have their MGD values.
+#
+# Usage:
+#       mgdfixture.py [-S server] [-D database] [-U user] [-s scale] [-r seed] [--replace]
+#
+#       -S      database server (default: localhost)
+#       -D      database; created by the caller, its "mgd" schema is replaced
+#               (default: mgdfixture)
+#       --replace
+#               load into a database other than mgdfixture; refused if it has
+#               an "mgd" schema that mgdfixture.py did not create (that has no
+#               table mgd.mgdfixture)
+#
+#       Without --replace, mgdfixture.py only loads into the database named
+#       mgdfixture, so that it never drops the mgd schema of a real database.
+#       -U      database user (default: ${PG_DBUSER})
+#       -s      scale factor (default: 1); scale 1 is about 10,000 mouse markers,
+#               and every row count grows with the scale
+#       -r      random seed (default: 1); the same scale and seed give the
+#               same database
+#
+# Tables:
+#       markers         MRK_Marker, MRK_Status, MRK_Types, MRK_Chromosome,
+#                       MRK_Location_Cache, MRK_Current, MRK_MCV_Cache,
+#                       MRK_Cluster, MRK_ClusterMember, SEQ_Marker_Cache
+#       accessions      ACC_Accession, ACC_LogicalDB, ACC_MGIType
+#       vocabularies    VOC_Vocab, VOC_Term, VOC_AnnotType, VOC_Annot, VOC_Evidence
+#       alleles         ALL_Allele, PRB_Strain, GXD_Genotype, GXD_AllelePair,
+#                       GXD_AlleleGenotype
+#       RNA-Seq         GXD_HTSample, GXD_HTSample_RNASeqSet,
+#                       GXD_HTSample_RNASeqSetMember, GXD_HTSample_RNASeqCombined,
+#                       GXD_HTSample_RNASeq
+#       other           BIB_Refs, BIB_Citation_Cache, MGI_Organism, MGI_User,
+#                       MGI_Synonym, MGI_SynonymType, MGI_Note, MGI_NoteType,
+#                       MGI_Reference_Assoc, MGI_RefAssocType
+#
+#       A report that uses another table (or a view) fails on the fixture;
+#       benchmark.py lists it as failed.
+#
+'''
+
+import sys
+import os
+import io
+import getopt
+import random
+import psycopg2
+
+# rows at scale 1
+SIZES = {
+    'mouseMarkers' : 10000,
+    'humanMarkers' : 6000,
+    'otherMarkers' : 2000,
+    'references' : 5000,
+    'strains' : 500,
+    'alleles' : 8000,
+    'genotypes' : 4000,
+    'goTerms' : 2000,
+    'mpTerms' : 1500,
+    'doTerms' : 500,
+    'emapaTerms' : 300,
+    'experiments' : 4,
+}
+
+# per-row fan-out (not scaled)
+GOANNOTATIONS = 3               # per mouse gene
+MPANNOTATIONS = 3               # per genotype
+SYNONYMS = 1                    # per mouse marker
+SAMPLES = 12                    # per experiment
+SETS = 4                        # per experiment
+RNASEQMARKERS = 2000            # markers with RNA-Seq data per experiment
+
+# the fixture database
+FIXTUREDB = 'mgdfixture'
+
+# the table that marks a schema mgd made by load()
+MARKER = 'mgdfixture'
+
+DATE = '2024-01-01 00:00:00'
+USER = 1000
+
+# keys of VOC_Term rows that have no MGD key of their own
+TERMKEY = 20000000
+
+INT = 'int'
+TEXT = 'text'
+FLAG = 'smallint'
+NUMBER = 'numeric'
+FLOAT = 'double precision'
+TIME = 'timestamp without time zone'
+
+AUDIT = [('_CreatedBy_key', INT), ('_ModifiedBy_key', INT), ('creation_date', TIME), ('modification_date', TIME)]
+DATES = [('creation_date', TIME), ('modification_date', TIME)]
+
+# (table, [(column, type)]); the first column is the primary key unless
+# the table is in NOKEY
+SCHEMA = [
+    ('MGI_User', [('_User_key', INT), ('login', TEXT), ('name', TEXT)] + DATES),
+    ('MGI_Organism', [('_Organism_key', INT), ('commonName', TEXT), ('latinName', TEXT)] + AUDIT),
+    ('ACC_MGIType', [('_MGIType_key', INT), ('name', TEXT), ('tableName', TEXT), ('primaryKeyName', TEXT)] + AUDIT),
+    ('ACC_LogicalDB', [('_LogicalDB_key', INT), ('name', TEXT), ('description', TEXT), ('_Organism_key', INT)] + AUDIT),
+    ('MRK_Status', [('_Marker_Status_key', INT), ('status', TEXT)] + DATES),
+    ('MRK_Types', [('_Marker_Type_key', INT), ('name', TEXT)] + DATES),
+    ('MRK_Chromosome', [('_Chromosome_key', INT), ('_Organism_key', INT), ('chromosome', TEXT), ('sequenceNum', INT)] + AUDIT),
+    ('VOC_Vocab', [('_Vocab_key', INT), ('_Refs_key', INT), ('_LogicalDB_key', INT), ('isSimple', FLAG), ('isPrivate', FLAG), ('name', TEXT)] + DATES),
+    ('VOC_Term', [('_Term_key', INT), ('_Vocab_key', INT), ('term', TEXT), ('abbreviation', TEXT), ('note', TEXT), ('sequenceNum', INT), ('isObsolete', FLAG)] + AUDIT),
+    ('VOC_AnnotType', [('_AnnotType_key', INT), ('_MGIType_key', INT), ('_Vocab_key', INT), ('_EvidenceVocab_key', INT), ('_QualifierVocab_key', INT), ('name', TEXT)] + DATES),
+    ('MGI_SynonymType', [('_SynonymType_key', INT), ('_MGIType_key', INT), ('_Organism_key', INT), ('synonymType', TEXT), ('allowOnlyOne', FLAG)] + AUDIT),
+    ('MGI_NoteType', [('_NoteType_key', INT), ('_MGIType_key', INT), ('noteType', TEXT), ('private', FLAG)] + AUDIT),
+    ('MGI_RefAssocType', [('_RefAssocType_key', INT), ('_MGIType_key', INT), ('assocType', TEXT), ('allowOnlyOne', FLAG)] + AUDIT),
+    ('BIB_Refs', [('_Refs_key', INT), ('_ReferenceType_key', INT), ('authors', TEXT), ('_primary', TEXT), ('title', TEXT), ('journal', TEXT),
+        ('vol', TEXT), ('issue', TEXT), ('date', TEXT), ('year', INT), ('pgs', TEXT), ('abstract', TEXT), ('isReviewArticle', FLAG), ('isDiscard', FLAG)] + AUDIT),
+    ('BIB_Citation_Cache', [('_Refs_key', INT), ('numericPart', INT), ('jnumID', TEXT), ('mgiID', TEXT), ('pubmedID', TEXT), ('doiID', TEXT),
+        ('journal', TEXT), ('citation', TEXT), ('short_citation', TEXT), ('referencetype', TEXT), ('_Relevance_key', INT), ('relevanceTerm', TEXT),
+        ('isReviewArticle', FLAG), ('isReviewArticleString', TEXT)]),
+    ('MRK_Marker', [('_Marker_key', INT), ('_Organism_key', INT), ('_Marker_Status_key', INT), ('_Marker_Type_key', INT),
+        ('symbol', TEXT), ('name', TEXT), ('chromosome', TEXT), ('cytogeneticOffset', TEXT), ('cmOffset', FLOAT)] + AUDIT),
+    ('MRK_Location_Cache', [('_Marker_key', INT), ('_Marker_Type_key', INT), ('_Organism_key', INT), ('chromosome', TEXT), ('sequenceNum', INT),
+        ('cytogeneticOffset', TEXT), ('cmOffset', FLOAT), ('genomicChromosome', TEXT), ('startCoordinate', NUMBER), ('endCoordinate', NUMBER),
+        ('strand', TEXT), ('mapUnits', TEXT), ('provider', TEXT), ('version', TEXT)] + AUDIT),
+    ('MRK_Current', [('_Current_key', INT), ('_Marker_key', INT)] + DATES),
+    ('MRK_MCV_Cache', [('_Marker_key', INT), ('_MCVTerm_key', INT), ('term', TEXT), ('qualifier', TEXT), ('directTerms', TEXT)] + AUDIT),
+    ('MRK_Cluster', [('_Cluster_key', INT), ('_ClusterType_key', INT), ('_ClusterSource_key', INT), ('clusterID', TEXT), ('version', TEXT), ('cluster_date', TIME)] + AUDIT),
+    ('MRK_ClusterMember', [('_ClusterMember_key', INT), ('_Cluster_key', INT), ('_Marker_key', INT), ('sequenceNum', INT)]),
+    ('SEQ_Marker_Cache', [('_Cache_key', INT), ('_Sequence_key', INT), ('_Marker_key', INT), ('_Organism_key', INT), ('_Refs_key', INT),
+        ('_Qualifier_key', INT), ('_SequenceType_key', INT), ('_SequenceProvider_key', INT), ('_SequenceStatus_key', INT), ('_LogicalDB_key', INT),
+        ('_Marker_Type_key', INT), ('_BiotypeConflict_key', INT), ('accID', TEXT), ('rawbiotype', TEXT), ('annotation_date', TIME)] + AUDIT),
+    ('ACC_Accession', [('_Accession_key', INT), ('accID', TEXT), ('prefixPart', TEXT), ('numericPart', INT), ('_LogicalDB_key', INT),
+        ('_Object_key', INT), ('_MGIType_key', INT), ('private', FLAG), ('preferred', FLAG)] + AUDIT),
+    ('MGI_Synonym', [('_Synonym_key', INT), ('_Object_key', INT), ('_MGIType_key', INT), ('_SynonymType_key', INT), ('_Refs_key', INT), ('synonym', TEXT)] + AUDIT),
+    ('MGI_Note', [('_Note_key', INT), ('_Object_key', INT), ('_MGIType_key', INT), ('_NoteType_key', INT), ('note', TEXT)] + AUDIT),
+    ('MGI_Reference_Assoc', [('_Assoc_key', INT), ('_Refs_key', INT), ('_Object_key', INT), ('_MGIType_key', INT), ('_RefAssocType_key', INT)] + AUDIT),
+    ('PRB_Strain', [('_Strain_key', INT), ('_Species_key', INT), ('_StrainType_key', INT), ('strain', TEXT), ('standard', FLAG), ('private', FLAG),
+        ('geneticBackground', FLAG)] + AUDIT),
+    ('ALL_Allele', [('_Allele_key', INT), ('_Marker_key', INT), ('_Strain_key', INT), ('_Mode_key', INT), ('_Allele_Type_key', INT),
+        ('_Allele_Status_key', INT), ('_Transmission_key', INT), ('_Collection_key', INT), ('symbol', TEXT), ('name', TEXT),
+        ('isWildType', FLAG), ('isExtinct', FLAG), ('isMixed', FLAG), ('_Refs_key', INT), ('_MarkerAllele_Status_key', INT),
+        ('_ApprovedBy_key', INT), ('approval_date', TIME)] + AUDIT),
+    ('GXD_Genotype', [('_Genotype_key', INT), ('_Strain_key', INT), ('isConditional', FLAG), ('note', TEXT), ('_ExistsAs_key', INT)] + AUDIT),
+    ('GXD_AllelePair', [('_AllelePair_key', INT), ('_Genotype_key', INT), ('sequenceNum', INT), ('_Allele_key_1', INT), ('_Allele_key_2', INT),
+        ('_Marker_key', INT), ('_MutantCellLine_key_1', INT), ('_MutantCellLine_key_2', INT), ('_PairState_key', INT), ('_Compound_key', INT)] + AUDIT),
+    ('GXD_AlleleGenotype', [('_Genotype_key', INT), ('_Marker_key', INT), ('_Allele_key', INT), ('sequenceNum', INT)] + AUDIT),
+    ('VOC_Annot', [('_Annot_key', INT), ('_AnnotType_key', INT), ('_Object_key', INT), ('_Term_key', INT), ('_Qualifier_key', INT)] + DATES),
+    ('VOC_Evidence', [('_AnnotEvidence_key', INT), ('_Annot_key', INT), ('_EvidenceTerm_key', INT), ('_Refs_key', INT), ('inferredFrom', TEXT)] + AUDIT),
+    ('GXD_HTSample', [('_Sample_key', INT), ('_Experiment_key', INT), ('_Relevance_key', INT), ('name', TEXT), ('age', TEXT), ('ageMin', NUMBER),
+        ('ageMax', NUMBER), ('_Organism_key', INT), ('_Sex_key', INT), ('_Emapa_key', INT), ('_Stage_key', INT), ('_Genotype_key', INT),
+        ('_CellType_Term_key', INT), ('_RNASeqType_key', INT)] + AUDIT),
+    ('GXD_HTSample_RNASeqSet', [('_RNASeqSet_key', INT), ('_Experiment_key', INT), ('age', TEXT), ('note', TEXT), ('_Organism_key', INT),
+        ('_Sex_key', INT), ('_Emapa_key', INT), ('_Stage_key', INT), ('_Genotype_key', INT)] + AUDIT),
+    ('GXD_HTSample_RNASeqSetMember', [('_RNASeqSetMember_key', INT), ('_RNASeqSet_key', INT), ('_Sample_key', INT)] + AUDIT),
+    ('GXD_HTSample_RNASeqCombined', [('_RNASeqCombined_key', INT), ('_Marker_key', INT), ('_RNASeqSet_key', INT), ('_Level_key', INT),
+        ('numberOfBiologicalReplicates', INT), ('averageQuantileNormalizedTPM', NUMBER)] + AUDIT),
+    ('GXD_HTSample_RNASeq', [('_RNASeq_key', INT), ('_Sample_key', INT), ('_RNASeqCombined_key', INT), ('_Marker_key', INT),
+        ('averageTPM', NUMBER), ('quantileNormalizedTPM', NUMBER)] + AUDIT),
+]
+
+NOKEY = ('MRK_Location_Cache', 'MRK_Current', 'MRK_MCV_Cache', 'BIB_Citation_Cache', 'GXD_AlleleGenotype')
+
+# indexed columns, besides the primary keys
+INDEXES = {
+    'ACC_Accession' : ['_Object_key', 'accID', '_LogicalDB_key', '_MGIType_key'],
+    'MRK_Marker' : ['_Organism_key', 'symbol'],
+    'MRK_Location_Cache' : ['_Marker_key'],
+    'MRK_Current' : ['_Current_key', '_Marker_key'],
+    'MRK_MCV_Cache' : ['_Marker_key'],
+    'MRK_ClusterMember' : ['_Cluster_key', '_Marker_key'],
+    'SEQ_Marker_Cache' : ['_Marker_key'],
+    'MGI_Synonym' : ['_Object_key'],
+    'MGI_Note' : ['_Object_key'],
+    'MGI_Reference_Assoc' : ['_Object_key', '_Refs_key'],
+    'VOC_Annot' : ['_Object_key', '_Term_key', '_AnnotType_key'],
+    'VOC_Evidence' : ['_Annot_key'],
+    'VOC_Term' : ['_Vocab_key'],
+    'ALL_Allele' : ['_Marker_key'],
+    'GXD_AllelePair' : ['_Genotype_key'],
+    'GXD_AlleleGenotype' : ['_Genotype_key', '_Allele_key'],
+    'GXD_HTSample' : ['_Experiment_key'],
+    'GXD_HTSample_RNASeqSetMember' : ['_Sample_key', '_RNASeqSet_key'],
+    'GXD_HTSample_RNASeqCombined' : ['_Marker_key', '_RNASeqSet_key'],
+    'GXD_HTSample_RNASeq' : ['_Sample_key', '_Marker_key', '_RNASeqCombined_key'],
+}
+
+ORGANISMS = [(1, 'mouse, laboratory', 'Mus musculus/domesticus'), (2, 'human', 'Homo sapiens'),
+        (40, 'rat', 'Rattus norvegicus'), (84, 'zebrafish', 'Danio rerio'), (94, 'dog, domestic', 'Canis familiaris')]
+
+MGITYPES = [(1, 'Reference', 'BIB_Refs'), (2, 'Marker', 'MRK_Marker'), (3, 'Probe', 'PRB_Probe'), (8, 'Assay', 'GXD_Assay'),
+        (10, 'Strain', 'PRB_Strain'), (11, 'Allele', 'ALL_Allele'), (12, 'Genotype', 'GXD_Genotype'),
+        (13, 'Vocabulary Term', 'VOC_Term'), (19, 'Sequence', 'SEQ_Sequence'), (20, 'Orthology', 'MRK_Cluster'),
+        (28, 'Cell Line', 'ALL_CellLine'), (42, 'HT Experiment', 'GXD_HTExperiment'), (43, 'HT Sample', 'GXD_HTSample')]
+
+# the logical DBs the reports select on
+LOGICALDBS = {1 : 'MGI', 9 : 'Sequence DB', 13 : 'SWISS-PROT', 15 : 'OMIM', 22 : 'Genbank EST', 23 : 'UniGene', 27 : 'RefSeq',
+        29 : 'PubMed', 31 : 'Gene Ontology', 32 : 'Protein Ontology', 34 : 'Mammalian Phenotype', 38 : 'Alliance', 41 : 'TrEMBL', 47 : 'RGD', 55 : 'Entrez Gene',
+        59 : 'Ensembl Gene Model', 60 : 'Ensembl Gene Model', 64 : 'HGNC', 65 : 'DOI', 108 : 'ZFIN', 109 : 'VGNC',
+        125 : 'MIRBase', 126 : 'MGI Strain', 133 : 'Ensembl Transcript', 134 : 'Ensembl Protein', 137 : 'GENSAT',
+        138 : 'Cre Portal', 142 : 'IMPC', 143 : 'KOMP', 146 : 'Human Disease Ontology', 169 : 'EMAPA', 179 : 'MGI Reagent',
+        183 : 'Mouse Protein Ontology', 189 : 'ArrayExpress', 191 : 'Disease Ontology', 201 : 'Alliance Gene'}
+
+STATUSES = [(1, 'official'), (2, 'withdrawn'), (3, 'reserved')]
+
+MARKERTYPES = [(1, 'Gene'), (2, 'DNA Segment'), (3, 'Cytogenetic Marker'), (6, 'QTL'), (7, 'Pseudogene'),
+        (9, 'Other Genome Feature'), (10, 'Complex/Cluster/Region'), (12, 'Transgene')]
+
+CHROMOSOMES = [str(c) for c in range(1, 20)] + ['X', 'Y', 'MT', 'UN']
+
+# MGD annotation types: (key, MGI type, vocabulary, name)
+ANNOTTYPES = [(1000, 2, 4, 'GO/Marker'), (1002, 12, 5, 'Mammalian Phenotype/Genotype'), (1011, 2, 79, 'Marker Type/Feature'),
+        (1020, 12, 125, 'DO/Genotype'), (1022, 2, 125, 'DO/Human Marker'), (1023, 2, 125, 'DO/Allele')]
+
+NOTETYPES = [(1016, 12, 'Combination Type 1'), (1020, 11, 'General'), (1041, 11, 'Driver'), (1048, 43, 'HT Sample')]
+
+SYNONYMTYPES = [(1004, 2, 1, 'exact'), (1017, 2, 1, 'broad'), (1018, 2, 1, 'narrow'), (1019, 2, 1, 'related'), (1020, 2, 1, 'similar')]
+
+REFASSOCTYPES = [(1018, 2, 'General')]
+
+# MGD term keys the reports name
+QUALIFIERS = [(615417, 52, '(none)'), (615419, 52, 'colocalizes_with'), (615420, 52, 'contributes_to'), (615421, 52, 'NOT'),
+        (1614157, 53, '(none)'), (1614158, 53, 'NOT')]
+ALLELESTATUSES = [(847114, 37, 'Approved'), (3983021, 37, 'Autoload')]
+
+# MGD term keys of the other columns the fixture fills
+TERMS = [(31576687, 131, 'Peer Reviewed Article'), (70594667, 149, 'keep'), (20475450, 136, 'Yes'),
+        (481207, 26, 'laboratory mouse'), (3410535, 55, 'coisogenic'), (4268545, 73, 'Curated'),
+        (3982946, 60, 'Mouse Line'), (847138, 39, 'Homozygous'), (847167, 42, 'Not Applicable'),
+        (114866227, 147, 'RNA-Seq'), (615434, 1, 'Not Specified'), (316346, 21, 'RNA'),
+        (316372, 25, 'GenBank/EMBL/DDBJ'), (316342, 20, 'ACTIVE'), (5420769, 76, 'Not Specified'),
+        (9272150, 88, 'homology'), (75885739, 89, 'Alliance Direct')]
+
+CLUSTERTYPE = 9272150
+CLUSTERSOURCE = 75885739
+RNASEQCREATEDBY = 1613
+RNASEQSET = 'E-GEOD-22131'
+
+class Fixture:
+
+    def __init__(self, scale, seed):
+        self.scale = scale
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.columns = {}
+        self.rows = {}
+        self.keys = {}
+        for table, columns in SCHEMA:
+            self.columns[table] = [c for c, t in columns]
+            self.rows[table] = []
+        self.termKey = TERMKEY
+
+    def size(self, name):
+        return max(1, int(SIZES[name] * self.scale))
+
+    def key(self, table):
+        self.keys[table] = self.keys.get(table, 0) + 1
+        return self.keys[table]
+
+    def add(self, table, **values):
+        #
+        # add a row; audit columns default to USER/DATE, the others to NULL
+        #
+
+        row = []
+        for c in self.columns[table]:
+            if c in values:
+                row.append(values[c])
+            elif c in ('_CreatedBy_key', '_ModifiedBy_key'):
+                row.append(USER)
+            elif c in ('creation_date', 'modification_date'):
+                row.append(DATE)
+            else:
+                row.append(None)
+        self.rows[table].append(row)
+
+    def term(self, vocab, term, key = None, abbreviation = None):
+        if key is None:
+            self.termKey = self.termKey + 1
+            key = self.termKey
+        self.add('VOC_Term', _Term_key = key, _Vocab_key = vocab, term = term, abbreviation = abbreviation,
+                sequenceNum = len(self.rows['VOC_Term']), isObsolete = 0)
+        return key
+
+    def accession(self, objectKey, mgiType, logicalDB, prefix, number, preferred = 1, private = 0):
+        if number is None:
+            accID = prefix
+        else:
+            accID = '%s%s' % (prefix, number)
+        self.add('ACC_Accession', _Accession_key = self.key('ACC_Accession'), accID = accID, prefixPart = prefix,
+                numericPart = number, _LogicalDB_key = logicalDB, _Object_key = objectKey, _MGIType_key = mgiType,
+                private = private, preferred = preferred)
+
+    def mgiID(self, objectKey, mgiType):
+        self.accession(objectKey, mgiType, 1, 'MGI:', self.key('MGI:'))
+
+    def build(self):
+        self.dimensions()
+        self.vocabularies()
+        self.references()
+        self.markers()
+        self.homology()
+        self.alleles()
+        self.annotations()
+        self.rnaSeq()
+
+    def dimensions(self):
+
+        for key, login in ((USER, 'dbo'), (RNASEQCREATEDBY, 'rnaseqload'), (1673, 'rnaseqload_combined')):
+            self.add('MGI_User', _User_key = key, login = login, name = login)
+        for key, common, latin in ORGANISMS:
+            self.add('MGI_Organism', _Organism_key = key, commonName = common, latinName = latin)
+        for key, name, table in MGITYPES:
+            self.add('ACC_MGIType', _MGIType_key = key, name = name, tableName = table, primaryKeyName = '_%s_key' % (table.split('_')[1]))
+        for key in sorted(LOGICALDBS):
+            self.add('ACC_LogicalDB', _LogicalDB_key = key, name = LOGICALDBS[key], description = LOGICALDBS[key], _Organism_key = 1)
+        for key, status in STATUSES:
+            self.add('MRK_Status', _Marker_Status_key = key, status = status)
+        for key, name in MARKERTYPES:
+            self.add('MRK_Types', _Marker_Type_key = key, name = name)
+        for organism, common, latin in ORGANISMS:
+            for i, c in enumerate(CHROMOSOMES):
+                self.add('MRK_Chromosome', _Chromosome_key = self.key('MRK_Chromosome'), _Organism_key = organism, chromosome = c, sequenceNum = i + 1)
+        for key, mgiType, name in NOTETYPES:
+            self.add('MGI_NoteType', _NoteType_key = key, _MGIType_key = mgiType, noteType = name, private = 0)
+        for key, mgiType, organism, name in SYNONYMTYPES:
+            self.add('MGI_SynonymType', _SynonymType_key = key, _MGIType_key = mgiType, _Organism_key = organism, synonymType = name, allowOnlyOne = 0)
+        for key, mgiType, name in REFASSOCTYPES:
+            self.add('MGI_RefAssocType', _RefAssocType_key = key, _MGIType_key = mgiType, assocType = name, allowOnlyOne = 0)
+
+    def vocabularies(self):
+
+        vocabs = [(4, 'GO'), (5, 'Mammalian Phenotype'), (125, 'Disease Ontology'), (90, 'EMAPA'), (3, 'GO Evidence Codes'),
+                (2, 'MP Evidence Codes'), (43, 'DO Evidence Codes'), (52, 'GO Qualifier'), (53, 'Generic Annotation Qualifier'),
+                (79, 'Marker Category'), (37, 'Allele Status'), (38, 'Allele Type'), (35, 'Allele Inheritance Mode'),
+                (61, 'Allele Transmission'), (74, 'GXD HT Sex'), (144, 'RNA-Seq Level'), (131, 'Reference Type'),
+                (149, 'Relevance'), (136, 'GXD HT Relevance'), (26, 'Species'), (55, 'Strain Type'),
+                (73, 'Marker-Allele Association Status'), (60, 'Genotype Exists As'), (39, 'Allele Pair State'),
+                (42, 'Allele Compound'), (147, 'GXD HT RNA-Seq Type'), (1, 'Sequence Qualifier'), (21, 'Sequence Type'),
+                (25, 'Sequence Provider'), (20, 'Sequence Status'), (76, 'Marker-Sequence Biotype Conflict'),
+                (88, 'Cluster Type'), (89, 'Cluster Source')]
+        for key, name in vocabs:
+            self.add('VOC_Vocab', _Vocab_key = key, _Refs_key = None, _LogicalDB_key = 1, isSimple = 1, isPrivate = 0, name = name)
+        for key, mgiType, vocab, name in ANNOTTYPES:
+            self.add('VOC_AnnotType', _AnnotType_key = key, _MGIType_key = mgiType, _Vocab_key = vocab, name = name)
+
+        self.goTerms = []
+        for i in range(self.size('goTerms')):
+            t = self.term(4, 'GO term %d' % (i))
+            self.accession(t, 13, 31, 'GO:', 1000 + i)
+            self.goTerms.append(t)
+
+        self.mpTerms = []
+        for i in range(self.size('mpTerms')):
+            t = self.term(5, 'MP term %d' % (i))
+            self.accession(t, 13, 34, 'MP:', 1000 + i)
+            self.mpTerms.append(t)
+
+        self.doTerms = []
+        for i in range(self.size('doTerms')):
+            t = self.term(125, 'disease %d' % (i))
+            self.accession(t, 13, 191, 'DOID:', 1000 + i)
+            self.doTerms.append(t)
+
+        self.emapaTerms = []
+        for i in range(self.size('emapaTerms')):
+            t = self.term(90, 'structure %d' % (i))
+            self.accession(t, 13, 169, 'EMAPA:', 16000 + i)
+            self.emapaTerms.append(t)
+
+        self.goEvidence = [self.term(3, code, abbreviation = code) for code in ('EXP', 'IDA', 'IMP', 'IGI', 'ISO', 'IEA', 'ND')]
+        self.mpEvidence = [self.term(2, 'experimental evidence', abbreviation = 'EE')]
+        self.doEvidence = [self.term(43, 'traceable author statement', abbreviation = 'TAS')]
+
+        for key, vocab, term in QUALIFIERS + ALLELESTATUSES + TERMS:
+            self.term(vocab, term, key = key)
+        self.goQualifiers = [615417, 615417, 615417, 615419, 615420, 615421]
+        self.mpQualifiers = [1614157] * 9 + [1614158]
+
+        self.featureTypes = {}
+        for markerType, names in ((1, ('protein coding gene', 'lncRNA gene', 'miRNA gene')), (7, ('pseudogene',)),
+                                  (2, ('DNA segment',)), (6, ('QTL',)), (10, ('complex/cluster/region',)),
+                                  (9, ('other genome feature',)), (3, ('cytogenetic marker',)), (12, ('transgene',))):
+            self.featureTypes[markerType] = [(self.term(79, name), name) for name in names]
+
+        self.alleleTypes = [self.term(38, name) for name in ('Targeted', 'Endonuclease-mediated', 'Gene trapped', 'Transgenic', 'Spontaneous')]
+        self.modes = [self.term(35, 'Recessive'), self.term(35, 'Dominant')]
+        self.transmissions = [self.term(61, 'Germline'), self.term(61, 'Cell Line')]
+        self.sexes = [self.term(74, 'Female'), self.term(74, 'Male'), self.term(74, 'Pooled')]
+        self.levels = [self.term(144, name) for name in ('Below Cutoff', 'Low', 'Medium', 'High')]
+
+    def references(self):
+
+        self.refs = []
+        for i in range(self.size('references')):
+            r = self.key('BIB_Refs')
+            year = 1980 + self.rng.randrange(45)
+            journal = self.rng.choice(('Nature', 'Genetics', 'Dev Biol', 'J Immunol', 'Mamm Genome', 'PLoS One'))
+            self.add('BIB_Refs', _Refs_key = r, _ReferenceType_key = 31576687, authors = 'Author %d A, Author %d B' % (i, i + 1),
+                    _primary = 'Author %d A' % (i), title = 'Title of reference %d' % (i), journal = journal, vol = str(i % 300),
+                    issue = str(i % 12), date = str(year), year = year, pgs = '%d-%d' % (i % 900, i % 900 + 10),
+                    abstract = None, isReviewArticle = int(i % 20 == 0), isDiscard = 0)
+            jnum = 1000 + i
+            mgi = self.key('MGI:')
+            pubmed = 10000000 + i
+            self.accession(r, 1, 1, 'MGI:', mgi)
+            self.accession(r, 1, 1, 'J:', jnum)
+            self.accession(r, 1, 29, str(pubmed), None)
+            self.accession(r, 1, 65, '10.1000/ref.%d' % (i), None)
+            self.add('BIB_Citation_Cache', _Refs_key = r, numericPart = jnum, jnumID = 'J:%d' % (jnum), mgiID = 'MGI:%d' % (mgi),
+                    pubmedID = str(pubmed), doiID = '10.1000/ref.%d' % (i), journal = journal,
+                    citation = '%s %d;%d:%d' % (journal, year, i % 300, i % 900), short_citation = 'Author %d A, %s %d;%d:%d' % (i, journal, year, i % 300, i % 900),
+                    referencetype = 'Peer Reviewed Article', _Relevance_key = 70594667, relevanceTerm = 'keep',
+                    isReviewArticle = int(i % 20 == 0), isReviewArticleString = ('No', 'Yes')[int(i % 20 == 0)])
+            self.refs.append(r)
+
+    def marker(self, organism, markerType, status, symbol, name):
+        m = self.key('MRK_Marker')
+        chromosome = self.rng.choice(CHROMOSOMES[:-1])
+        cmOffset = round(self.rng.uniform(0, 100), 2) if organism == 1 else None
+        self.add('MRK_Marker', _Marker_key = m, _Organism_key = organism, _Marker_Status_key = status, _Marker_Type_key = markerType,
+                symbol = symbol, name = name, chromosome = chromosome, cytogeneticOffset = None, cmOffset = cmOffset)
+
+        start = self.rng.randrange(3000000, 190000000)
+        self.add('MRK_Location_Cache', _Marker_key = m, _Marker_Type_key = markerType, _Organism_key = organism,
+                chromosome = chromosome, sequenceNum = CHROMOSOMES.index(chromosome) + 1, cytogeneticOffset = None, cmOffset = cmOffset,
+                genomicChromosome = chromosome, startCoordinate = start, endCoordinate = start + self.rng.randrange(500, 200000),
+                strand = self.rng.choice('+-'), mapUnits = 'bp', provider = 'NCBI Gene Model', version = 'GRCm39')
+        return m
+
+    def markers(self):
+
+        self.mouseGenes = []
+        self.humanGenes = []
+        self.otherGenes = []
+
+        official = []
+        for i in range(self.size('mouseMarkers')):
+            markerType = self.rng.choice((1, 1, 1, 1, 1, 1, 7, 7, 2, 6, 9, 10, 3, 12))
+            status = 2 if self.rng.random() < 0.08 else 1
+            symbol = 'Gm%d' % (i) if markerType != 1 else 'Mgene%d' % (i)
+            m = self.marker(1, markerType, status, symbol, 'mouse marker %d' % (i))
+            self.mgiID(m, 2)
+
+            if status == 2:
+                if official:
+                    self.add('MRK_Current', _Current_key = self.rng.choice(official), _Marker_key = m)
+                continue
+
+            official.append(m)
+            self.add('MRK_Current', _Current_key = m, _Marker_key = m)
+
+            term, feature = self.rng.choice(self.featureTypes[markerType])
+            self.add('MRK_MCV_Cache', _Marker_key = m, _MCVTerm_key = term, term = feature, qualifier = 'D', directTerms = feature)
+            self.add('VOC_Annot', _Annot_key = self.key('VOC_Annot'), _AnnotType_key = 1011, _Object_key = m, _Term_key = term, _Qualifier_key = 1614157)
+
+            for s in range(SYNONYMS):
+                self.add('MGI_Synonym', _Synonym_key = self.key('MGI_Synonym'), _Object_key = m, _MGIType_key = 2,
+                        _SynonymType_key = 1004, _Refs_key = self.rng.choice(self.refs), synonym = '%s-syn%d' % (symbol, s))
+            for r in self.rng.sample(self.refs, 2):
+                self.add('MGI_Reference_Assoc', _Assoc_key = self.key('MGI_Reference_Assoc'), _Refs_key = r, _Object_key = m,
+                        _MGIType_key = 2, _RefAssocType_key = 1018)
+
+            if markerType == 1:
+                self.mouseGenes.append(m)
+                self.sequences(m, i)
+
+        for i in range(self.size('humanMarkers')):
+            m = self.marker(2, 1, 1, 'HGENE%d' % (i), 'human gene %d' % (i))
+            self.accession(m, 2, 55, str(100000 + i), None)
+            self.accession(m, 2, 64, 'HGNC:', 1000 + i)
+            self.humanGenes.append(m)
+
+        for i in range(self.size('otherMarkers')):
+            organism = self.rng.choice((40, 84, 94))
+            m = self.marker(organism, 1, 1, 'ogene%d' % (i), 'gene %d' % (i))
+            self.accession(m, 2, 55, str(500000 + i), None)
+            self.otherGenes.append(m)
+
+    def sequences(self, m, i):
+        #
+        # sequence/protein/gene model IDs of mouse gene m
+        #
+
+        ids = [
+                (9, 'AK%06d' % (i), 'RNA'),
+                (27, 'NM_%06d' % (i), 'RNA'),
+                (27, 'NP_%06d' % (i), 'Polypeptide'),
+                (27, 'XM_%06d' % (i), 'RNA'),
+                (13, 'P%05d' % (i), 'Polypeptide'),
+                (41, 'Q%05d' % (i), 'Polypeptide'),
+                (55, str(10000 + i), None),
+                (60, 'ENSMUSG%011d' % (i), None),
+                (133, 'ENSMUST%011d' % (i), 'RNA'),
+                (134, 'ENSMUSP%011d' % (i), 'Polypeptide'),
+        ]
+        for logicalDB, accID, sequenceType in ids:
+            if logicalDB == 27:
+                prefix, number = accID.split('_')
+                self.accession(m, 2, 27, prefix + '_', int(number))
+            else:
+                self.accession(m, 2, logicalDB, accID, None)
+            if sequenceType:
+                s = self.key('SEQ_Sequence')
+                self.add('SEQ_Marker_Cache', _Cache_key = self.key('SEQ_Marker_Cache'), _Sequence_key = s, _Marker_key = m,
+                        _Organism_key = 1, _Refs_key = self.rng.choice(self.refs), _Qualifier_key = 615434, _SequenceType_key = 316346,
+                        _SequenceProvider_key = 316372, _SequenceStatus_key = 316342, _LogicalDB_key = logicalDB, _Marker_Type_key = 1,
+                        _BiotypeConflict_key = 5420769, accID = accID, rawbiotype = None, annotation_date = DATE)
+
+    def homology(self):
+        #
+        # Alliance direct clusters: most mouse genes with one human gene,
+        # some with two, some with a gene of another organism too
+        #
+
+        humans = list(self.humanGenes)
+        self.rng.shuffle(humans)
+        others = list(self.otherGenes)
+
+        for m in self.mouseGenes:
+            if not humans:
+                break
+            members = [m, humans.pop()]
+            if humans and self.rng.random() < 0.05:
+                members.append(humans.pop())
+            if others and self.rng.random() < 0.2:
+                members.append(others.pop())
+
+            c = self.key('MRK_Cluster')
+            self.add('MRK_Cluster', _Cluster_key = c, _ClusterType_key = CLUSTERTYPE, _ClusterSource_key = CLUSTERSOURCE,
+                    clusterID = str(c), version = '6.0', cluster_date = DATE)
+            for n, member in enumerate(members):
+                self.add('MRK_ClusterMember', _ClusterMember_key = self.key('MRK_ClusterMember'), _Cluster_key = c,
+                        _Marker_key = member, sequenceNum = n + 1)
+
+    def alleles(self):
+
+        self.strains = []
+        for i in range(self.size('strains')):
+            s = self.key('PRB_Strain')
+            self.add('PRB_Strain', _Strain_key = s, _Species_key = 481207, _StrainType_key = 3410535, strain = 'Strain%d/J' % (i),
+                    standard = 1, private = 0, geneticBackground = 0)
+            self.mgiID(s, 10)
+            self.strains.append(s)
+
+        self.alleleMarkers = {}
+        for i in range(self.size('alleles')):
+            a = self.key('ALL_Allele')
+            m = self.rng.choice(self.mouseGenes)
+            self.add('ALL_Allele', _Allele_key = a, _Marker_key = m, _Strain_key = self.rng.choice(self.strains),
+                    _Mode_key = self.rng.choice(self.modes), _Allele_Type_key = self.rng.choice(self.alleleTypes),
+                    _Allele_Status_key = self.rng.choice((847114, 847114, 847114, 3983021)),
+                    _Transmission_key = self.rng.choice(self.transmissions), _Collection_key = None,
+                    symbol = 'Mgene%d<tm%d>' % (m, i), name = 'targeted mutation %d' % (i), isWildType = 0, isExtinct = 0, isMixed = 0,
+                    _Refs_key = self.rng.choice(self.refs), _MarkerAllele_Status_key = 4268545, _ApprovedBy_key = USER, approval_date = DATE)
+            self.mgiID(a, 11)
+            self.alleleMarkers[a] = m
+
+        alleles = list(self.alleleMarkers)
+        self.genotypes = []
+        for i in range(self.size('genotypes')):
+            g = self.key('GXD_Genotype')
+            self.add('GXD_Genotype', _Genotype_key = g, _Strain_key = self.rng.choice(self.strains), isConditional = 0,
+                    note = None, _ExistsAs_key = 3982946)
+            self.mgiID(g, 12)
+
+            pairs = []
+            for n in range(self.rng.choice((1, 1, 1, 2))):
+                a = self.rng.choice(alleles)
+                m = self.alleleMarkers[a]
+                self.add('GXD_AllelePair', _AllelePair_key = self.key('GXD_AllelePair'), _Genotype_key = g, sequenceNum = n + 1,
+                        _Allele_key_1 = a, _Allele_key_2 = a, _Marker_key = m, _PairState_key = 847138, _Compound_key = 847167)
+                self.add('GXD_AlleleGenotype', _Genotype_key = g, _Marker_key = m, _Allele_key = a, sequenceNum = n + 1)
+                pairs.append('Mgene%d<tm%d>/Mgene%d<tm%d>' % (m, a, m, a))
+
+            self.add('MGI_Note', _Note_key = self.key('MGI_Note'), _Object_key = g, _MGIType_key = 12, _NoteType_key = 1016,
+                    note = '\n'.join(pairs) + '\n')
+            self.genotypes.append(g)
+
+    def annotate(self, annotType, objectKey, term, qualifier, evidence):
+        a = self.key('VOC_Annot')
+        self.add('VOC_Annot', _Annot_key = a, _AnnotType_key = annotType, _Object_key = objectKey, _Term_key = term, _Qualifier_key = qualifier)
+        self.add('VOC_Evidence', _AnnotEvidence_key = self.key('VOC_Evidence'), _Annot_key = a, _EvidenceTerm_key = evidence,
+                _Refs_key = self.rng.choice(self.refs), inferredFrom = None)
+
+    def annotations(self):
+
+        for m in self.mouseGenes:
+            for t in self.rng.sample(self.goTerms, GOANNOTATIONS):
+                self.annotate(1000, m, t, self.rng.choice(self.goQualifiers), self.rng.choice(self.goEvidence))
+
+        for g in self.genotypes:
+            for t in self.rng.sample(self.mpTerms, MPANNOTATIONS):
+                self.annotate(1002, g, t, self.rng.choice(self.mpQualifiers), self.mpEvidence[0])
+            if self.rng.random() < 0.2:
+                self.annotate(1020, g, self.rng.choice(self.doTerms), 1614157, self.doEvidence[0])
+
+        for m in self.humanGenes:
+            if self.rng.random() < 0.3:
+                self.annotate(1022, m, self.rng.choice(self.doTerms), 1614157, self.doEvidence[0])
+
+    def rnaSeq(self):
+        #
+        # experiments (the first is E-GEOD-22131, the one GXD_RnaSeq.py
+        # selects), their samples, sets and per-marker TPMs
+        #
+
+        markers = self.rng.sample(self.mouseGenes, min(RNASEQMARKERS, len(self.mouseGenes)))
+        markers.sort()
+
+        for e in range(self.size('experiments')):
+            eKey = self.key('GXD_HTExperiment')
+            if e == 0:
+                self.accession(eKey, 42, 189, RNASEQSET, None)
+            else:
+                self.accession(eKey, 42, 189, 'E-MTAB-%d' % (1000 + e), None)
+
+            sets = []
+            for s in range(SETS):
+                setKey = self.key('GXD_HTSample_RNASeqSet')
+                genotype = self.rng.choice(self.genotypes)
+                structure = self.rng.choice(self.emapaTerms)
+                sex = self.rng.choice(self.sexes)
+                stage = self.rng.randrange(1, 29)
+                age = 'embryonic day %d.5' % (stage // 2 + 5)
+                self.add('GXD_HTSample_RNASeqSet', _RNASeqSet_key = setKey, _Experiment_key = eKey, age = age, note = None,
+                        _Organism_key = 1, _Sex_key = sex, _Emapa_key = structure, _Stage_key = stage, _Genotype_key = genotype)
+                sets.append((setKey, genotype, structure, sex, stage, age, []))
+
+            for n in range(SAMPLES):
+                sample = self.key('GXD_HTSample')
+                setKey, genotype, structure, sex, stage, age, samples = sets[n % SETS]
+                self.add('GXD_HTSample', _Sample_key = sample, _Experiment_key = eKey, _Relevance_key = 20475450,
+                        name = 'sample %d.%d' % (e, n), age = age, ageMin = stage, ageMax = stage, _Organism_key = 1, _Sex_key = sex,
+                        _Emapa_key = structure, _Stage_key = stage, _Genotype_key = genotype, _CellType_Term_key = None,
+                        _RNASeqType_key = 114866227)
+                self.add('GXD_HTSample_RNASeqSetMember', _RNASeqSetMember_key = self.key('GXD_HTSample_RNASeqSetMember'),
+                        _RNASeqSet_key = setKey, _Sample_key = sample)
+                if n % 3 == 0:
+                    self.add('MGI_Note', _Note_key = self.key('MGI_Note'), _Object_key = sample, _MGIType_key = 43, _NoteType_key = 1048,
+                            note = 'note of sample %d' % (sample))
+                samples.append(sample)
+
+            for setKey, genotype, structure, sex, stage, age, samples in sets:
+                for m in markers:
+                    combined = self.key('GXD_HTSample_RNASeqCombined')
+                    tpms = [round(self.rng.expovariate(0.05), 2) for s in samples]
+                    average = round(sum(tpms) / max(1, len(tpms)), 2)
+                    level = self.levels[min(3, int(average // 15))]
+                    self.add('GXD_HTSample_RNASeqCombined', _RNASeqCombined_key = combined, _Marker_key = m, _RNASeqSet_key = setKey,
+                            _Level_key = level, numberOfBiologicalReplicates = len(samples), averageQuantileNormalizedTPM = average,
+                            _CreatedBy_key = RNASEQCREATEDBY)
+                    for sample, tpm in zip(samples, tpms):
+                        self.add('GXD_HTSample_RNASeq', _RNASeq_key = self.key('GXD_HTSample_RNASeq'), _Sample_key = sample,
+                                _RNASeqCombined_key = combined, _Marker_key = m, averageTPM = tpm, quantileNormalizedTPM = tpm,
+                                _CreatedBy_key = RNASEQCREATEDBY)
+
+def copyValue(value):
+    #
+    # a value in COPY text format
+    #
+
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def check(connection, replace):
+    #
+    # raise ValueError unless load() may replace schema mgd of the database:
+    # the fixture database, or, with replace, a database whose schema mgd
+    # (if any) load() created
+    #
+
+    cursor = connection.cursor()
+    cursor.execute('select current_database()')
+    database = cursor.fetchone()[0]
+    cursor.execute("select count(*) from pg_namespace where nspname = 'mgd'")
+    schema = cursor.fetchone()[0]
+    cursor.execute("select count(*) from pg_tables where schemaname = 'mgd' and tablename = %s", (MARKER,))
+    marker = cursor.fetchone()[0]
+    cursor.close()
+
+    if database == FIXTUREDB:
+        return
+
+    if not replace:
+        raise ValueError('%s is not the fixture database (%s); use --replace to load into it' % (database, FIXTUREDB))
+
+    if schema and not marker:
+        raise ValueError('schema mgd of %s was not created by mgdfixture.py (no table mgd.%s); not replacing it' % \
+            (database, MARKER))
+
+def load(connection, fixture):
+    #
+    # replace schema mgd with the fixture's tables (see check())
+    #
+
+    cursor = connection.cursor()
+    cursor.execute('drop schema if exists mgd cascade')
+    cursor.execute('create schema mgd')
+    cursor.execute('set search_path to mgd, public')
+    cursor.execute('create table %s (scale float, seed int, created timestamp default now())' % (MARKER))
+    cursor.execute('insert into %s (scale, seed) values (%%s, %%s)' % (MARKER), (fixture.scale, fixture.seed))
+
+    for table, columns in SCHEMA:
+        ddl = ',\n'.join(['%s %s' % (c, t) for c, t in columns])
+        cursor.execute('create table %s (%s)' % (table, ddl))
+
+        buffer = io.StringIO()
+        for row in fixture.rows[table]:
+            buffer.write('\t'.join([copyValue(v) for v in row]) + '\n')
+        buffer.seek(0)
+        cursor.copy_expert('copy %s from stdin' % (table), buffer)
+
+        if table not in NOKEY:
+            cursor.execute('alter table %s add primary key (%s)' % (table, columns[0][0]))
+        for column in INDEXES.get(table, []):
+            cursor.execute('create index %s_%s_idx on %s (%s)' % (table, column.strip('_'), table, column))
+        print('%s: %d rows' % (table, len(fixture.rows[table])))
+        sys.stdout.flush()
+
+    cursor.execute('analyze')
+    cursor.close()
+
+def main():
+
+    server = 'localhost'
+    database = FIXTUREDB
+    user = os.environ.get('PG_DBUSER')
+    scale = 1.0
+    seed = 1
+    replace = 0
+
+    try:
+        optlist, args = getopt.getopt(sys.argv[1:], 'S:D:U:s:r:', ['replace'])
+    except getopt.GetoptError as e:
+        sys.stderr.write('%s\n%s\n' % (e, __doc__))
+        sys.exit(1)
+
+    for opt, arg in optlist:
+        if opt == '-S':
+            server = arg
+        elif opt == '-D':
+            database = arg
+        elif opt == '-U':
+            user = arg
+        elif opt == '-s':
+            scale = float(arg)
+        elif opt == '-r':
+            seed = int(arg)
+        elif opt == '--replace':
+            replace = 1
+
+    connection = psycopg2.connect(host = server, dbname = database, user = user)
+    connection.autocommit = True
+
+    try:
+        check(connection, replace)
+    except ValueError as e:
+        sys.stderr.write('mgdfixture.py: %s\n' % (e))
+        sys.exit(1)
+
+    fixture = Fixture(scale, seed)
+    fixture.build()
+
+    load(connection, fixture)
+    connection.cursor().execute('alter database %s set search_path = mgd, public' % (database))
+    connection.close()
+
+    print('%s/%s: scale %s, seed %s' % (server, database, scale, seed))
+
+if __name__ == '__main__':
+    main()
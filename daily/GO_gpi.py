@@ -201,6 +201,24 @@ for r in results:
 # add UniProtDB:xxxx to gpi field 8
 #
 
+# uniprot id -> marker relationships (uniprotload)
+# loaded once; each goa_mouse.gpi line is resolved against this lookup
+# {uniprot id : [{'symbol' : marker symbol}, ...]}
+uniprotMarkers = {}
+results = db.sql('''
+    select a1.accid, m.symbol
+    from acc_accession a1, mrk_marker m
+    where a1._mgitype_key = 2 
+    and a1._logicaldb_key in (13,41)
+    and a1._object_key = m._marker_key
+    ''', 'auto')
+for r in results:
+        key = r['accid']
+        value = {'symbol' : r['symbol']}
+        if key not in uniprotMarkers:
+                uniprotMarkers[key] = []
+        uniprotMarkers[key].append(value)
+
 uniprotGPI = {}
 gpiFile = gzip.open(os.environ['DATADOWNLOADS'] + '/ftp.ebi.ac.uk/pub/databases/GO/goa/MOUSE/goa_mouse.gpi.gz', 'rt')
 for line in gpiFile.readlines():
@@ -214,14 +232,7 @@ for line in gpiFile.readlines():
         goaSymbol = tokens[2]
 
         # search uniprot id -> marker relationships (uniprotload)
-        results = db.sql('''
-            select m.symbol
-            from acc_accession a1, mrk_marker m
-            where a1.accid = '%s'
-            and a1._mgitype_key = 2 
-            and a1._logicaldb_key in (13,41)
-            and a1._object_key = m._marker_key
-            ''' % id, 'auto')
+        results = uniprotMarkers.get(id, [])
 
         # if 1:1, then use MGI symbol
         if len(results) == 1:
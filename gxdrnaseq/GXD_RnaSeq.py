@@ -4,6 +4,11 @@
 #
 # Generate 1 report per experiment
 #
+# Output (GXDRNASEQDIR):
+#       <exptId>.rpt.gz         1 gzip'd report per experiment, compressed as it is written
+#       gxdrnaseq.tar.gz        all <exptId>.rpt.gz; each report is appended as soon as
+#                               it is complete
+#
 # 1:  MGI Gene ID
 # 2:  Ensembl ID
 # 3:  Gene Symbol
@@ -37,7 +42,55 @@
 # 7) Strain
 # 8) Mutant Allele Pair(s) (if multiple, comma delimited and alpha sorted)
 # 9) Sample Note
-# 
+#
+# Within each report, rows are written by marker (_marker_key), then sample.
+#
+# Usage:
+#       GXD_RnaSeq.py [--per-marker] [--workers N] [--full] [--matrix]
+#
+#       default: the RNA-Seq rows of an experiment are selected for MARKERBATCH
+#       markers at a time, already ordered by marker/sample, and written as
+#       they are read (lib/reportdb.py)
+#
+#       the per-experiment queries are prepared once per session and run
+#       with the experiment/marker keys as bound parameters
+#
+#       --per-marker: the original query-per-(experiment, marker) loop;
+#       writes the same files (kept for verification)
+#
+#       --workers N: generate the experiment reports in N worker processes;
+#       each worker opens its own connection and builds its own experiments/markers
+#       temp tables and sampleNotes/alleles/markers lookups.
+#       Experiments are handed out largest (most samples) first.
+#
+#       --full: regenerate every experiment (see Incremental runs)
+#
+#       --matrix: also write <exptId>.tpm.npz (see TPM matrix)
+#
+# TPM matrix (--matrix):
+#
+#       <exptId>.tpm.npz is a NumPy .npz (numpy.load) built from the same rows:
+#
+#       marker_key, marker_mgiId, marker_ensId, marker_symbol, marker_name
+#               marker dimension (M), in report order
+#       sample_key, sample_id, sample_structure, sample_stage, sample_age,
+#       sample_sex, sample_strain, sample_alleles, sample_note, sample_set_key
+#               sample dimension (S), in sample info order
+#       avg_TPM, qnTPM, avg_qnTPM
+#               float32 [M, S]; NaN where the report column is empty
+#       tpm_level
+#               int8 [M, S]; index into tpm_level_term, -1 if none
+#
+# Incremental runs:
+#
+#       FINGERPRINTS (in GXDRNASEQDIR) records a fingerprint per experiment:
+#       sample/set/row counts and max modification dates of the experiment's
+#       GXD_HTSample, RNASeqSet, RNASeq and RNASeqCombined rows, its sample
+#       info, notes and allele pairs, the markers lookup and this script.
+#       An experiment whose fingerprint is unchanged and whose <exptId>.rpt.gz
+#       still exists is not regenerated (it is still added to the archive).
+#       Reports of experiments that no longer exist are removed.
+#
 # History:
 #
 # lec	09/11/2024
@@ -47,8 +100,18 @@
  
 import sys 
 import os
+import getopt
+import glob
+import io
+import gzip
+import tarfile
+import hashlib
+import array
+import multiprocessing
+import npzfile
 import reportlib
 import db
+import reportdb
 
 db.setTrace()
 
@@ -56,119 +119,398 @@ CRT = reportlib.CRT
 #TAB = reportlib.TAB
 TAB = "|"
 
-# distinct experiments
-db.sql('''
-select distinct s._experiment_key, a.accid as exptId
-into temp table experiments
-from GXD_HTSample s, ACC_Accession a
-where exists (select 1 from GXD_HTSample_RNASeqSetMember rna where s._sample_key = rna._sample_key)
-and s._experiment_key = a._object_key
-and a._mgitype_key = 42
-and a._logicaldb_key in (189)
---and a.accid in ('E-MTAB-9192','E-MTAB-7279')
-and a.accid in ('E-GEOD-22131')
-order by a.accid
-''', None)
-db.sql('create index eidx1 on experiments (_experiment_key);', None)
-
-# sampleNotes by sample key
+# number of markers selected per RNA-Seq query
+MARKERBATCH = 1000
+
+perMarker = 0
+workers = 1
+full = 0
+matrix = 0
+
+# experiment fingerprints of the previous run
+FINGERPRINTS = os.environ['GXDRNASEQDIR'] + '/GXD_RnaSeq.fingerprints'
+
+# archive of all experiment reports
+ARCHIVE = os.environ['GXDRNASEQDIR'] + '/gxdrnaseq.tar.gz'
+
+# gzip level of the experiment reports (same as gzip(1))
+COMPRESSLEVEL = 6
+
 sampleNotes = {}
-results = db.sql('''
-select distinct n._object_key, n.note
-from experiments e, GXD_HTSample s, MGI_Note n
-where e._experiment_key = s._experiment_key
-and s._sample_key = n._object_key
-and n._notetype_key = 1048
-and exists (select 1 from GXD_HTSample_RNASeqSetMember rna where s._sample_key = rna._sample_key)
-''', 'auto')
-for r in results:
-    key = r['_object_key']
-    value = r['note']
-    sampleNotes[key] = value
-#print(sampleNotes)
-
-# alleles by genotype
 alleles = {}
-results = db.sql('''
-select distinct s._genotype_key, n.note as alleles
-from experiments e, GXD_HTSample_RNASeqSet s, MGI_Note n
-where e._experiment_key = s._experiment_key
-and s._genotype_key = n._object_key
-and n._mgitype_key = 12
-and n._notetype_key = 1016
-and exists (select 1 from GXD_HTSample_RNASeqSetMember rna where s._rnaseqset_key = rna._rnaseqset_key)
-order by alleles
-''', 'auto')
-for r in results:
-    key = r['_genotype_key']
-    value = r['alleles'].replace('\n',',')
-    if value.endswith(","):
-        value = value[:-1]
-    alleles[key] = value
-#print(alleles)
-
-# distinct markers used in RNASeqCombined
 markers = {}
-db.sql('''
-WITH marker AS (
-select distinct m._marker_key, m.symbol, m.name
-from GXD_HTSample_RNASeqCombined rna, MRK_Marker m
-where rna._marker_key = m._marker_key
-)
-select m.*, a1.accid as mgiId, array_to_string(array_agg(distinct a2.accid),',') as ensId
-into temp table markers
-from marker m, ACC_Accession a1, ACC_Accession a2
-where m._marker_key = a1._object_key
-and a1._mgitype_key = 2
-and a1._logicaldb_key = 1
-and a1.preferred = 1
-and m._marker_key = a2._object_key
-and a2._mgitype_key = 2
-and a2._logicaldb_key = 60
-and a2.preferred = 1
-group by 1,2,3,4
-''', None)
-db.sql('create index midx1 on markers (_marker_key);', None)
-results = db.sql('select * from markers', 'auto')
-for r in results:
-    # skip marker if > 1 ensId
-    if "," in r['ensId']:
-        continue
-    key = r['_marker_key']
-    value = r
-    markers[key] = value
-#print(markers)
-
-# iterate thru one experimen at a time
-counter=1
-eresults = db.sql('select * from experiments order by _experiment_key', 'auto')
-for e in eresults:
 
-    # create 1 report per experiment
-    print(str(counter) + ':' + e['exptId'])
-    counter += 1
+# {exptId : fingerprint} of the previous run
+previous = {}
 
-    fp = reportlib.init(e['exptId'], outputdir = os.environ['GXDRNASEQDIR'], printHeading = None)
-    fp.write('MGI Gene ID' + TAB)
-    fp.write('Ensembl ID' + TAB)
-    fp.write('Gene Symbol' + TAB)
-    fp.write('Gene Name' + TAB)
-    fp.write('Experiment ID' + TAB)
-    fp.write('Anatomical Structure' + TAB)
-    fp.write('Theiler Stage' + TAB)
-    fp.write('Age' + TAB)
-    fp.write('Sex' + TAB)
-    fp.write('Strain' + TAB)
-    fp.write('Mutant Allele Pair(s)' + TAB)
-    fp.write('Notes' + TAB)
-    fp.write('Sample ID' + TAB)
-    fp.write('Number of Biological Replicates' + TAB)
-    fp.write('Bioreplicate Set Label' + TAB)
-    fp.write('Detected' + TAB)
-    fp.write('avg_TPM' + TAB)
-    fp.write('qnTPM' + TAB)
-    fp.write('avg_qnTPM' + TAB)
-    fp.write('TPM Level\n')
+# digest of this script + the markers lookup; part of every fingerprint
+markersDigest = None
+
+def initExperiments():
+    #
+    # experiments temp table
+    #
+
+    # distinct experiments
+    db.sql('''
+    select distinct s._experiment_key, a.accid as exptId
+    into temp table experiments
+    from GXD_HTSample s, ACC_Accession a
+    where exists (select 1 from GXD_HTSample_RNASeqSetMember rna where s._sample_key = rna._sample_key)
+    and s._experiment_key = a._object_key
+    and a._mgitype_key = 42
+    and a._logicaldb_key in (189)
+    --and a.accid in ('E-MTAB-9192','E-MTAB-7279')
+    and a.accid in ('E-GEOD-22131')
+    order by a.accid
+    ''', None)
+    db.sql('create index eidx1 on experiments (_experiment_key);', None)
+
+def initialize():
+    #
+    # experiments, markers temp tables
+    # sampleNotes, alleles, markers lookups
+    #
+
+    initExperiments()
+
+    # sampleNotes by sample key
+    results = db.sql('''
+    select distinct n._object_key, n.note
+    from experiments e, GXD_HTSample s, MGI_Note n
+    where e._experiment_key = s._experiment_key
+    and s._sample_key = n._object_key
+    and n._notetype_key = 1048
+    and exists (select 1 from GXD_HTSample_RNASeqSetMember rna where s._sample_key = rna._sample_key)
+    ''', 'auto')
+    for r in results:
+        key = r['_object_key']
+        value = r['note']
+        sampleNotes[key] = value
+    #print(sampleNotes)
+
+    # alleles by genotype
+    results = db.sql('''
+    select distinct s._genotype_key, n.note as alleles
+    from experiments e, GXD_HTSample_RNASeqSet s, MGI_Note n
+    where e._experiment_key = s._experiment_key
+    and s._genotype_key = n._object_key
+    and n._mgitype_key = 12
+    and n._notetype_key = 1016
+    and exists (select 1 from GXD_HTSample_RNASeqSetMember rna where s._rnaseqset_key = rna._rnaseqset_key)
+    order by alleles
+    ''', 'auto')
+    for r in results:
+        key = r['_genotype_key']
+        value = r['alleles'].replace('\n',',')
+        if value.endswith(","):
+            value = value[:-1]
+        alleles[key] = value
+    #print(alleles)
+
+    # distinct markers used in RNASeqCombined
+    db.sql('''
+    WITH marker AS (
+    select distinct m._marker_key, m.symbol, m.name
+    from GXD_HTSample_RNASeqCombined rna, MRK_Marker m
+    where rna._marker_key = m._marker_key
+    )
+    select m.*, a1.accid as mgiId, array_to_string(array_agg(distinct a2.accid),',') as ensId
+    into temp table markers
+    from marker m, ACC_Accession a1, ACC_Accession a2
+    where m._marker_key = a1._object_key
+    and a1._mgitype_key = 2
+    and a1._logicaldb_key = 1
+    and a1.preferred = 1
+    and m._marker_key = a2._object_key
+    and a2._mgitype_key = 2
+    and a2._logicaldb_key = 60
+    and a2.preferred = 1
+    group by 1,2,3,4
+    ''', None)
+    db.sql('create index midx1 on markers (_marker_key);', None)
+    results = db.sql('select * from markers order by _marker_key', 'auto')
+    for r in results:
+        # skip marker if > 1 ensId
+        if "," in r['ensId']:
+            continue
+        key = r['_marker_key']
+        value = r
+        markers[key] = value
+    #print(markers)
+
+    global markersDigest
+    digest = hashlib.sha1(open(os.path.abspath(__file__), 'rb').read())
+    for mKey in markers:
+        r = markers[mKey]
+        digest.update(('%s|%s|%s|%s|%s\n' % (mKey, r['mgiId'], r['ensId'], r['symbol'], r['name'])).encode())
+    markersDigest = digest.hexdigest()
+
+#
+# RNA-Seq rows of an experiment for a list of markers, ordered by marker, sample
+# params: (experiment key, [marker key], experiment key, [marker key])
+#
+rnaSeqQuery = '''
+   select distinct rna._marker_key, rna._sample_key,
+        rna.averagetpm, rna.quantilenormalizedtpm,
+        rnaC._level_key, rnaC.numberofbiologicalreplicates, rnaC.averagequantilenormalizedtpm,
+        rnaC._rnaseqset_key,
+        s1.term as tpmLevel
+    from experiments e, GXD_HTSample s, GXD_HTSample_RNASeq rna, GXD_HTSample_RNASeqCombined rnaC, voc_term s1
+    where e._experiment_key = %s
+    and e._experiment_key = s._experiment_key
+    and s._sample_key = rna._sample_key
+    and rna._marker_key = any(%s)
+    and rna._rnaseqcombined_key = rnaC._rnaseqcombined_key
+    and rnaC._level_key = s1._term_key
+    and rnaC._createdby_key = 1613
+    union
+    select distinct rnaC._marker_key, rna._sample_key,
+        -1, -1,
+        rnaC._level_key, rnaC.numberofbiologicalreplicates, rnaC.averagequantilenormalizedtpm,
+        rnaC._rnaseqset_key,
+        s1.term as tpmLevel
+    from experiments e, GXD_HTSample s, GXD_HTSample_RNASeqSetMember rna, GXD_HTSample_RNASeqCombined rnaC, voc_term s1
+    where e._experiment_key = %s
+    and e._experiment_key = s._experiment_key
+    and s._sample_key = rna._sample_key
+    and rna._rnaseqset_key = rnaC._rnaseqset_key
+    and rnaC._level_key = s1._term_key
+    and rnaC._marker_key = any(%s)
+    and rnaC._createdby_key = 1673
+    order by 1, 2, 3, 4, 5, 6, 7, 8, 9
+'''
+
+def writeRow(fp, mKey, r, sampleByExpt):
+    #
+    # write one experiment/marker/sample row
+    #
+
+    sKey = r['_sample_key']
+    #print('sKey: ', sKey)
+
+    # 1:  MGI Gene ID
+    # 2:  Ensembl ID
+    # 3:  Gene Symbol
+    # 4:  Gene Name
+    # 5:  Experiment ID
+    fp.write(markers[mKey]['mgiId'] + TAB)
+    fp.write(markers[mKey]['ensId'] + TAB)
+    fp.write(markers[mKey]['symbol'] + TAB)
+    fp.write(markers[mKey]['name'] + TAB)
+    fp.write(sampleByExpt[sKey]['exptId'] + TAB)
+
+    # 6:  Anatomical Structure [gxd_htsample._emapa_key]
+    # 7:  Theiler Stage [gxd_htsample._stage_key]
+    # 8:  Age [gxd_htsample.age]
+    # 9:  Sex [gxd_htsample._sex_key]
+    # 10: Strain [gxd_htsample._genotype_key -> gxd_genotype -> prb_strain]
+    fp.write(sampleByExpt[sKey]['termStruct'] + TAB)
+    fp.write(str(sampleByExpt[sKey]['_stage_key']) + TAB)
+    fp.write(sampleByExpt[sKey]['age'] + TAB)
+    fp.write(sampleByExpt[sKey]['termSex'] + TAB)
+    fp.write(sampleByExpt[sKey]['strain'] + TAB)
+
+    # may/may not exist
+    # 11: Mutant Allele Pair(s) (comma delimited, if multiple)
+    gKey = sampleByExpt[sKey]['_genotype_key']
+    if gKey in alleles:
+        fp.write(alleles[gKey])
+    fp.write(TAB)
+
+    # 12: Notes (RNA-Seq) [htsample note _notetype_key = 1048]
+    if sKey in sampleNotes:
+        fp.write(sampleNotes[sKey])
+    fp.write(TAB)
+
+    # 13: Sample ID (name)
+    fp.write(sampleByExpt[sKey]['name'] + TAB)
+
+    # 14: Number of Biological Replicates
+    fp.write(str(r['numberofbiologicalreplicates']) + TAB)
+
+    # 15: Bioreplicate Set Label
+    fp.write(sampleByExpt[sKey]['termStruct'] + '_' + sampleByExpt[sKey]['exptId'] + '_' + str(r['_rnaseqset_key']) + TAB)
+
+    # 16: Detected
+    if r['tpmLevel'] == 'Below Cutoff':
+        fp.write('No' + TAB)
+    else:
+        fp.write('Yes' + TAB)
+
+    # 17: avg_TPM
+    # 18: qnTPM
+    # 19: avg_qnTPM
+    # 20: TPM Level
+
+    if r['averagetpm'] >= 0:
+        fp.write(str(r['averagetpm']))
+    fp.write(TAB)
+
+    if r['quantilenormalizedtpm'] >= 0:
+        fp.write(str(r['quantilenormalizedtpm']))
+    fp.write(TAB)
+
+    fp.write(str(r['averagequantilenormalizedtpm']) + TAB)
+    fp.write(r['tpmLevel'] + CRT)
+
+class TpmMatrix:
+    # marker x sample TPM matrices of one experiment (--matrix)
+
+    def __init__(self, sampleByExpt):
+        self.sampleKeys = list(sampleByExpt)
+        self.sampleIndex = {}
+        for sKey in self.sampleKeys:
+            self.sampleIndex[sKey] = len(self.sampleIndex)
+        self.sampleByExpt = sampleByExpt
+
+        self.markerKeys = []
+        self.markerIndex = {}
+
+        self.avgTPM = array.array('f')
+        self.qnTPM = array.array('f')
+        self.avgQnTPM = array.array('f')
+        self.level = array.array('b')
+        self.levelTerms = []
+
+    def add(self, mKey, r):
+        #
+        # add one experiment/marker/sample row
+        #
+
+        nSamples = len(self.sampleKeys)
+
+        if mKey not in self.markerIndex:
+            self.markerIndex[mKey] = len(self.markerKeys)
+            self.markerKeys.append(mKey)
+            for values in (self.avgTPM, self.qnTPM, self.avgQnTPM):
+                values.extend([float('nan')] * nSamples)
+            self.level.extend([-1] * nSamples)
+
+        i = self.markerIndex[mKey] * nSamples + self.sampleIndex[r['_sample_key']]
+
+        if r['averagetpm'] >= 0:
+            self.avgTPM[i] = float(r['averagetpm'])
+        if r['quantilenormalizedtpm'] >= 0:
+            self.qnTPM[i] = float(r['quantilenormalizedtpm'])
+        self.avgQnTPM[i] = float(r['averagequantilenormalizedtpm'])
+
+        if r['tpmLevel'] not in self.levelTerms:
+            self.levelTerms.append(r['tpmLevel'])
+        self.level[i] = self.levelTerms.index(r['tpmLevel'])
+
+    def save(self, fileName):
+
+        shape = (len(self.markerKeys), len(self.sampleKeys))
+        samples = [self.sampleByExpt[sKey] for sKey in self.sampleKeys]
+
+        npzfile.save(fileName, {
+            'marker_key' : npzfile.intArray(self.markerKeys),
+            'marker_mgiId' : npzfile.stringArray([markers[mKey]['mgiId'] for mKey in self.markerKeys]),
+            'marker_ensId' : npzfile.stringArray([markers[mKey]['ensId'] for mKey in self.markerKeys]),
+            'marker_symbol' : npzfile.stringArray([markers[mKey]['symbol'] for mKey in self.markerKeys]),
+            'marker_name' : npzfile.stringArray([markers[mKey]['name'] for mKey in self.markerKeys]),
+            'sample_key' : npzfile.intArray(self.sampleKeys),
+            'sample_id' : npzfile.stringArray([r['name'] for r in samples]),
+            'sample_structure' : npzfile.stringArray([r['termStruct'] for r in samples]),
+            'sample_stage' : npzfile.intArray([r['_stage_key'] for r in samples]),
+            'sample_age' : npzfile.stringArray([r['age'] for r in samples]),
+            'sample_sex' : npzfile.stringArray([r['termSex'] for r in samples]),
+            'sample_strain' : npzfile.stringArray([r['strain'] for r in samples]),
+            'sample_alleles' : npzfile.stringArray([alleles.get(r['_genotype_key']) for r in samples]),
+            'sample_note' : npzfile.stringArray([sampleNotes.get(r['_sample_key']) for r in samples]),
+            'sample_set_key' : npzfile.intArray([r['_rnaseqset_key'] for r in samples]),
+            'avg_TPM' : npzfile.floatArray(self.avgTPM, shape),
+            'qnTPM' : npzfile.floatArray(self.qnTPM, shape),
+            'avg_qnTPM' : npzfile.floatArray(self.avgQnTPM, shape),
+            'tpm_level' : ('|i1', shape, self.level.tobytes()),
+            'tpm_level_term' : npzfile.stringArray(self.levelTerms),
+        })
+
+def writeByMarker(fp, eKey, sampleByExpt, tpm):
+    #
+    # one query per experiment/marker
+    #
+
+    for mKey in markers:
+
+        #print('mKey: ', mKey)
+
+        # sample info of given experiment/marker
+        results = reportdb.stream(rnaSeqQuery, params = (eKey, [mKey], eKey, [mKey]))
+
+        # iterate thru each experiment/sample result
+        for r in results:
+            writeRow(fp, mKey, r, sampleByExpt)
+            if tpm:
+                tpm.add(mKey, r)
+
+def writeByBatch(fp, eKey, sampleByExpt, tpm):
+    #
+    # one query per experiment/MARKERBATCH markers
+    # rows arrive ordered by marker, sample
+    #
+
+    mKeys = list(markers)
+
+    for i in range(0, len(mKeys), MARKERBATCH):
+
+        batch = mKeys[i:i + MARKERBATCH]
+        results = reportdb.stream(rnaSeqQuery, params = (eKey, batch, eKey, batch))
+
+        for r in results:
+            writeRow(fp, r['_marker_key'], r, sampleByExpt)
+            if tpm:
+                tpm.add(r['_marker_key'], r)
+
+def fingerprint(eKey, sampleByExpt):
+    #
+    # fingerprint of everything the report of experiment eKey is built from
+    #
+
+    digest = hashlib.sha1(markersDigest.encode())
+
+    results = reportdb.rows('''
+    select 1 as part, count(distinct s._sample_key) as samples, max(s.modification_date) as sdate,
+        count(distinct ss._rnaseqset_key) as sets, max(ss.modification_date) as ssdate
+    from GXD_HTSample s, GXD_HTSample_RNASeqSetMember sm, GXD_HTSample_RNASeqSet ss
+    where s._experiment_key = %s
+    and s._sample_key = sm._sample_key
+    and sm._rnaseqset_key = ss._rnaseqset_key
+    union all
+    select 2, count(*), max(rna.modification_date), 0, null
+    from GXD_HTSample s, GXD_HTSample_RNASeq rna
+    where s._experiment_key = %s
+    and s._sample_key = rna._sample_key
+    union all
+    select 3, count(*), max(rnaC.modification_date), 0, null
+    from GXD_HTSample_RNASeqSet ss, GXD_HTSample_RNASeqCombined rnaC
+    where ss._experiment_key = %s
+    and ss._rnaseqset_key = rnaC._rnaseqset_key
+    order by part
+    ''', params = (eKey, eKey, eKey))
+    for r in results:
+        digest.update(('%s|%s|%s|%s\n' % (r['samples'], r['sdate'], r['sets'], r['ssdate'])).encode())
+
+    for sKey in sorted(sampleByExpt):
+        r = sampleByExpt[sKey]
+        digest.update(('%s|%s|%s|%s|%s|%s|%s|%s|%s|%s\n' % (sKey, r['name'], r['_rnaseqset_key'], r['termStruct'], \
+                r['_stage_key'], r['age'], r['termSex'], r['strain'], \
+                alleles.get(r['_genotype_key']), sampleNotes.get(sKey))).encode())
+
+    return digest.hexdigest()
+
+def reportFile(exptId):
+    return os.environ['GXDRNASEQDIR'] + '/' + exptId + '.rpt.gz'
+
+def matrixFile(exptId):
+    return os.environ['GXDRNASEQDIR'] + '/' + exptId + '.tpm.npz'
+
+def processExperiment(e):
+    #
+    # create 1 report per experiment
+    # returns (exptId, fingerprint, 1 if the report was (re)generated else 0)
+    #
 
     eKey = e['_experiment_key']
 
@@ -195,114 +537,201 @@ for e in eresults:
         sampleByExpt[key] = value
     #print(sampleByExpt)
 
-    for mKey in markers:
+    eFingerprint = fingerprint(eKey, sampleByExpt)
 
-        #print('mKey: ', mKey)
+    rptFile = reportFile(e['exptId'])
 
-        # sample info of given experiment/marker
-        results = db.sql('''
-           select distinct rna._sample_key,
-                rna.averagetpm, rna.quantilenormalizedtpm,
-                rnaC._level_key, rnaC.numberofbiologicalreplicates, rnaC.averagequantilenormalizedtpm,
-                rnaC._rnaseqset_key,
-                s1.term as tpmLevel
-            from experiments e, GXD_HTSample s, GXD_HTSample_RNASeq rna, GXD_HTSample_RNASeqCombined rnaC, voc_term s1
-            where e._experiment_key = %s
-            and e._experiment_key = s._experiment_key
-            and s._sample_key = rna._sample_key
-            and rna._marker_key = %s
-            and rna._rnaseqcombined_key = rnaC._rnaseqcombined_key
-            and rnaC._level_key = s1._term_key
-            and rnaC._createdby_key = 1613
-            union
-            select distinct rna._sample_key,
-                -1, -1,
-                rnaC._level_key, rnaC.numberofbiologicalreplicates, rnaC.averagequantilenormalizedtpm,
-                rnaC._rnaseqset_key,
-                s1.term as tpmLevel
-            from experiments e, GXD_HTSample s, GXD_HTSample_RNASeqSetMember rna, GXD_HTSample_RNASeqCombined rnaC, voc_term s1
-            where e._experiment_key = %s
-            and e._experiment_key = s._experiment_key
-            and s._sample_key = rna._sample_key
-            and rna._rnaseqset_key = rnaC._rnaseqset_key
-            and rnaC._level_key = s1._term_key
-            and rnaC._marker_key = %s
-            and rnaC._createdby_key = 1673
-        ''' % (e['_experiment_key'], mKey, e['_experiment_key'], mKey), 'auto')
+    # unchanged since the previous run
+    if not full and previous.get(e['exptId']) == eFingerprint and os.path.exists(rptFile) \
+        and (not matrix or os.path.exists(matrixFile(e['exptId']))):
+        return (e['exptId'], eFingerprint, 0)
 
-        # iterate thru each experiment/sample result
-        for r in results:
+    if matrix:
+        tpm = TpmMatrix(sampleByExpt)
+    else:
+        tpm = None
 
-            sKey = r['_sample_key']
-            #print('sKey: ', sKey)
-
-            # 1:  MGI Gene ID
-            # 2:  Ensembl ID
-            # 3:  Gene Symbol
-            # 4:  Gene Name
-            # 5:  Experiment ID
-            fp.write(markers[mKey]['mgiId'] + TAB)
-            fp.write(markers[mKey]['ensId'] + TAB)
-            fp.write(markers[mKey]['symbol'] + TAB)
-            fp.write(markers[mKey]['name'] + TAB)
-            fp.write(sampleByExpt[sKey]['exptId'] + TAB)
-
-            # 6:  Anatomical Structure [gxd_htsample._emapa_key]
-            # 7:  Theiler Stage [gxd_htsample._stage_key]
-            # 8:  Age [gxd_htsample.age]
-            # 9:  Sex [gxd_htsample._sex_key]
-            # 10: Strain [gxd_htsample._genotype_key -> gxd_genotype -> prb_strain]
-            fp.write(sampleByExpt[sKey]['termStruct'] + TAB)
-            fp.write(str(sampleByExpt[sKey]['_stage_key']) + TAB)
-            fp.write(sampleByExpt[sKey]['age'] + TAB)
-            fp.write(sampleByExpt[sKey]['termSex'] + TAB)
-            fp.write(sampleByExpt[sKey]['strain'] + TAB)
-
-            # may/may not exist
-            # 11: Mutant Allele Pair(s) (comma delimited, if multiple)
-            gKey = sampleByExpt[sKey]['_genotype_key']
-            if gKey in alleles:
-                fp.write(alleles[gKey])
-            fp.write(TAB)
-
-            # 12: Notes (RNA-Seq) [htsample note _notetype_key = 1048]
-            if sKey in sampleNotes:
-                fp.write(sampleNotes[sKey])
-            fp.write(TAB)
-
-            # 13: Sample ID (name)
-            fp.write(sampleByExpt[sKey]['name'] + TAB)
-
-            # 14: Number of Biological Replicates
-            fp.write(str(r['numberofbiologicalreplicates']) + TAB)
-
-            # 15: Bioreplicate Set Label
-            fp.write(sampleByExpt[sKey]['termStruct'] + '_' + sampleByExpt[sKey]['exptId'] + '_' + str(r['_rnaseqset_key']) + TAB)
-
-            # 16: Detected
-            if r['tpmLevel'] == 'Below Cutoff':
-                fp.write('No' + TAB)
-            else:
-                fp.write('Yes' + TAB)
-
-            # 17: avg_TPM
-            # 18: qnTPM
-            # 19: avg_qnTPM
-            # 20: TPM Level
-
-            if r['averagetpm'] >= 0:
-                fp.write(str(r['averagetpm']))
-            fp.write(TAB)
-
-            if r['quantilenormalizedtpm'] >= 0:
-                fp.write(str(r['quantilenormalizedtpm']))
-            fp.write(TAB)
-
-            fp.write(str(r['averagequantilenormalizedtpm']) + TAB)
-            fp.write(r['tpmLevel'] + CRT)
+    # compressed while it is written; renamed when complete
+    # (the gzip header names the final file, as gunzip -N restores it)
+    rawfp = open(rptFile + '.new', 'wb')
+    fp = io.TextIOWrapper(gzip.GzipFile(filename = os.path.basename(rptFile)[:-3], mode = 'wb',
+        compresslevel = COMPRESSLEVEL, fileobj = rawfp))
+    fp.write('MGI Gene ID' + TAB)
+    fp.write('Ensembl ID' + TAB)
+    fp.write('Gene Symbol' + TAB)
+    fp.write('Gene Name' + TAB)
+    fp.write('Experiment ID' + TAB)
+    fp.write('Anatomical Structure' + TAB)
+    fp.write('Theiler Stage' + TAB)
+    fp.write('Age' + TAB)
+    fp.write('Sex' + TAB)
+    fp.write('Strain' + TAB)
+    fp.write('Mutant Allele Pair(s)' + TAB)
+    fp.write('Notes' + TAB)
+    fp.write('Sample ID' + TAB)
+    fp.write('Number of Biological Replicates' + TAB)
+    fp.write('Bioreplicate Set Label' + TAB)
+    fp.write('Detected' + TAB)
+    fp.write('avg_TPM' + TAB)
+    fp.write('qnTPM' + TAB)
+    fp.write('avg_qnTPM' + TAB)
+    fp.write('TPM Level\n')
+
+    if perMarker:
+        writeByMarker(fp, eKey, sampleByExpt, tpm)
+    else:
+        writeByBatch(fp, eKey, sampleByExpt, tpm)
     
-    reportlib.finish_nonps(fp)	# non-postscript file
+    fp.close()
+    rawfp.close()
+    os.rename(rptFile + '.new', rptFile)
+
+    if tpm:
+        tpm.save(matrixFile(e['exptId']) + '.new')
+        os.rename(matrixFile(e['exptId']) + '.new', matrixFile(e['exptId']))
     sys.stdout.flush()
 
-# end for e in eresults:
+    return (e['exptId'], eFingerprint, 1)
+
+def readFingerprints():
+    #
+    # fingerprints of the previous run
+    #
+
+    if not os.path.exists(FINGERPRINTS):
+        return
+
+    fp = open(FINGERPRINTS, 'r')
+    for line in fp.readlines():
+        tokens = line[:-1].split(TAB)
+        previous[tokens[0]] = tokens[1]
+    fp.close()
+
+def writeFingerprints(fingerprints):
+    #
+    # fingerprints of this run;
+    # remove the reports of experiments that no longer exist
+    #
+
+    fp = open(FINGERPRINTS + '.new', 'w')
+    for exptId in sorted(fingerprints):
+        fp.write(exptId + TAB + fingerprints[exptId] + CRT)
+    fp.close()
+    os.rename(FINGERPRINTS + '.new', FINGERPRINTS)
+
+    for exptId in previous:
+        if exptId not in fingerprints:
+            for f in (exptId + '.rpt', exptId + '.rpt.gz', exptId + '.tpm.npz'):
+                if os.path.exists(os.environ['GXDRNASEQDIR'] + '/' + f):
+                    print('removed: ' + f)
+                    os.remove(os.environ['GXDRNASEQDIR'] + '/' + f)
+
+def removePlainReports():
+    #
+    # the uncompressed <exptId>.rpt files of the runs before the reports
+    # were gzip'd are no longer written or removed by anything else
+    #
+
+    for f in glob.glob(os.environ['GXDRNASEQDIR'] + '/*.rpt'):
+        print('removed: ' + os.path.basename(f))
+        os.remove(f)
+
+def report(counter, result, fingerprints, archive):
+    #
+    # log the result of one experiment, add its report to the archive
+    #
+
+    exptId, eFingerprint, regenerated = result
+    fingerprints[exptId] = eFingerprint
+    archive.add(reportFile(exptId), arcname = os.path.basename(reportFile(exptId)))
+    if regenerated:
+        print(str(counter) + ':' + exptId)
+    else:
+        print(str(counter) + ':' + exptId + ' (unchanged)')
+    sys.stdout.flush()
+
+def workerInit(options, previousRun):
+    #
+    # each worker process has its own connection, temp tables and lookups;
+    # the options and previous fingerprints come from main() (initargs),
+    # not from globals inherited through fork, so the workers also run
+    # with the right settings under the spawn/forkserver start methods
+    #
+
+    global perMarker, full, matrix
+
+    perMarker, full, matrix = options
+    previous.update(previousRun)
+
+    reportdb.init()
+    initialize()
+
+def main():
+
+    global perMarker, workers, full, matrix
+
+    optlist, args = getopt.getopt(sys.argv[1:], '', ['per-marker', 'workers=', 'full', 'matrix'])
+    for opt, arg in optlist:
+        if opt == '--per-marker':
+            perMarker = 1
+        elif opt == '--workers':
+            workers = int(arg)
+        elif opt == '--full':
+            full = 1
+        elif opt == '--matrix':
+            matrix = 1
+
+    removePlainReports()
+    readFingerprints()
+
+    # {exptId : fingerprint} of this run
+    fingerprints = {}
+
+    # renamed to ARCHIVE when every experiment is in it
+    archive = tarfile.open(ARCHIVE + '.new', 'w:gz')
+
+    reportdb.init()
+
+    # iterate thru one experimen at a time
+    counter=1
+
+    if workers <= 1:
+        initialize()
+        eresults = db.sql('select * from experiments order by _experiment_key', 'auto')
+        for e in eresults:
+            report(counter, processExperiment(e), fingerprints, archive)
+            counter += 1
+        archive.close()
+        os.rename(ARCHIVE + '.new', ARCHIVE)
+        writeFingerprints(fingerprints)
+        return
+
+    # largest experiments first, so that they do not finish last
+    initExperiments()
+    eresults = db.sql('''
+        select e._experiment_key, e.exptId, count(sm._sample_key) as numSamples
+        from experiments e, GXD_HTSample s, GXD_HTSample_RNASeqSetMember sm
+        where e._experiment_key = s._experiment_key
+        and s._sample_key = sm._sample_key
+        group by 1, 2
+        order by numSamples desc, _experiment_key
+        ''', 'auto')
+    eresults = [{'_experiment_key' : e['_experiment_key'], 'exptId' : e['exptId']} for e in eresults]
+
+    # the workers open their own connections; do not hand them this one
+    db.useOneConnection(0)
+
+    pool = multiprocessing.Pool(workers, initializer = workerInit,
+        initargs = ((perMarker, full, matrix), previous))
+    for result in pool.imap_unordered(processExperiment, eresults, chunksize = 1):
+        report(counter, result, fingerprints, archive)
+        counter += 1
+    pool.close()
+    pool.join()
+
+    archive.close()
+    os.rename(ARCHIVE + '.new', ARCHIVE)
+    writeFingerprints(fingerprints)
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+'''
+#
+# accessioncache.py
+#
+# Batched, memoized accession id lookups.
+#
+# Reports build {object key : [accID]} dicts from ACC_Accession with the
+# same few filters over and over.  A request is
+#
+#       (_MGIType_key, _LogicalDB_key, prefixPart, preferred)
+#
+# where prefixPart/preferred may be None (any).  All pending requests of
+# one _MGIType_key are answered by a single ACC_Accession query, and the
+# answers are kept for the life of the process, so the next report run by
+# the same lib/reportrunner.py worker gets them without a query.
+#
+# Usage:
+#       import accessioncache
+#
+#       MGIID = (2, 1, 'MGI:', 1)
+#       ENTREZ = (2, 55, None, None)
+#
+#       ids = accessioncache.resolve([MGIID, ENTREZ])
+#       ids[MGIID][markerKey]           # ['MGI:...']
+#
+#       mgiID = accessioncache.ids(2, 1, 'MGI:', 1)
+#
+#       the returned dicts are shared; do not modify them
+#
+#       # only the objects of a query (e.g. of the report's temp table)
+#       ids = accessioncache.resolve([MGIID, ENTREZ], objects = 'select _Marker_key from markers')
+#
+#       a restricted lookup reads only the accession ids of those objects;
+#       it is one query per call and is not kept (the query may name a
+#       temp table of the report)
+#
+'''
+
+import db
+
+# {request : {object key : [accID]}} resolved by this process
+resolved = {}
+
+def resolve(requests, objects = None):
+    #
+    # requests: iterable of (mgiType, logicalDB, prefix, preferred)
+    # objects: None, or a query of the object keys to restrict the lookup to
+    # returns {request : {object key : [accID]}}
+    #
+
+    requests = [tuple(r) for r in requests]
+
+    if objects is None:
+        answers = resolved
+        restriction = ''
+    else:
+        answers = {}
+        restriction = 'and _Object_key in (%s)' % (objects)
+
+    # requests not resolved yet, by _MGIType_key
+    pending = {}
+    for r in requests:
+        if r not in answers:
+            if r[0] not in pending:
+                pending[r[0]] = []
+            if r not in pending[r[0]]:
+                pending[r[0]].append(r)
+
+    for mgiType in pending:
+
+        # the requests that want each _LogicalDB_key
+        byLogicalDB = {}
+        maps = {}
+        for r in pending[mgiType]:
+            if r[1] not in byLogicalDB:
+                byLogicalDB[r[1]] = []
+            byLogicalDB[r[1]].append(r)
+            maps[r] = {}
+
+        results = db.sql('''
+                select _Object_key, accID, _LogicalDB_key, prefixPart, preferred
+                from ACC_Accession
+                where _MGIType_key = %s
+                and _LogicalDB_key in (%s)
+                %s
+                ''' % (mgiType, ','.join([str(k) for k in sorted(byLogicalDB)]), restriction), 'auto')
+
+        for row in results:
+            for r in byLogicalDB[row['_LogicalDB_key']]:
+                if r[2] is not None and row['prefixPart'] != r[2]:
+                    continue
+                if r[3] is not None and row['preferred'] != r[3]:
+                    continue
+                key = row['_Object_key']
+                if key not in maps[r]:
+                    maps[r][key] = []
+                maps[r][key].append(row['accID'])
+
+        answers.update(maps)
+
+    return dict([(r, answers[r]) for r in requests])
+
+def ids(mgiType, logicalDB, prefix = None, preferred = None):
+    #
+    # {object key : [accID]} for one request
+    #
+
+    r = (mgiType, logicalDB, prefix, preferred)
+    return resolve([r])[r]
@@ -0,0 +1,132 @@
+'''
+#
+# columnfile.py
+#
+# Memory-mapped files of named arrays, for the run-scoped report caches
+# (lib/markercache.py, lib/homologycache.py).
+#
+# A file is MAGIC, the start of the data (8 bytes, little-endian), a JSON
+# header, then the arrays, 8-byte aligned, in native byte order.
+# The header holds the layout plus any JSON-able "info" of the writer.
+#
+# Usage:
+#       import columnfile
+#
+#       columnfile.write('x.snapshot', {
+#               'keys' : array.array('i', keys),
+#               'blob' : bytearray(...),            # typecode 'B'
+#       }, {'count' : len(keys)})
+#
+#       info, arrays = columnfile.load('x.snapshot')
+#       arrays['keys']                              # memoryview, cast to 'i'
+#
+#       column(values, typecode) / stringColumn(values) build the arrays;
+#       string(arrays, name, i) reads row i of a stringColumn
+#
+'''
+
+import sys
+import os
+import array
+import json
+import mmap
+
+MAGIC = b'MGICOL1\n'
+
+# a None string
+NULL = '\0'
+
+def column(values, typecode, null = -1):
+    #
+    # array.array of values; None is stored as null
+    #
+
+    return array.array(typecode, [null if v is None else v for v in values])
+
+def stringColumn(values):
+    #
+    # (offsets, blob) of a list of strings: string i is
+    # blob[offsets[i]:offsets[i + 1]], UTF-8; None is stored as NULL
+    #
+
+    offsets = array.array('I', [0])
+    blob = bytearray()
+    for value in values:
+        if value is None:
+            value = NULL
+        blob.extend(value.encode('utf-8'))
+        offsets.append(len(blob))
+
+    return offsets, blob
+
+def string(arrays, name, i):
+    #
+    # row i of the stringColumn stored as name + '.offsets', name + '.blob'
+    #
+
+    offsets = arrays[name + '.offsets']
+    value = bytes(arrays[name + '.blob'][offsets[i]:offsets[i + 1]]).decode('utf-8')
+    if value == NULL:
+        return None
+    return value
+
+def write(fileName, arrays, info):
+    #
+    # write {name : array.array or bytes} and info to fileName, atomically;
+    # each process writes its own temporary file, so processes building
+    # the same file at the same time cannot interleave their writes
+    #
+
+    tmpFile = '%s.%d.new' % (fileName, os.getpid())
+
+    layout = {}
+    position = 0
+    for name in arrays:
+        data = arrays[name]
+        typecode = getattr(data, 'typecode', 'B')
+        length = len(data) * getattr(data, 'itemsize', 1)
+        layout[name] = [typecode, position, length]
+        position = position + length + (-length % 8)
+
+    header = json.dumps({'byteorder' : sys.byteorder, 'arrays' : layout, 'info' : info}).encode('utf-8')
+    start = len(MAGIC) + 8 + len(header)
+    start = start + (-start % 8)
+
+    fp = open(tmpFile, 'wb')
+    fp.write(MAGIC)
+    fp.write(start.to_bytes(8, 'little'))
+    fp.write(header)
+    fp.write(b'\0' * (start - len(MAGIC) - 8 - len(header)))
+    for name in arrays:
+        data = bytes(arrays[name])
+        fp.write(data)
+        fp.write(b'\0' * (-len(data) % 8))
+    fp.close()
+
+    os.rename(tmpFile, fileName)
+
+def load(fileName):
+    #
+    # returns (info, {name : memoryview}) of fileName, memory-mapped
+    #
+
+    fp = open(fileName, 'rb')
+    map = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+    fp.close()
+
+    if map[:len(MAGIC)] != MAGIC:
+        raise ValueError('%s: not a column file' % (fileName))
+
+    start = int.from_bytes(map[len(MAGIC):len(MAGIC) + 8], 'little')
+    header = json.loads(map[len(MAGIC) + 8:start].rstrip(b'\0').decode('utf-8'))
+
+    if header['byteorder'] != sys.byteorder:
+        raise ValueError('%s: written on a %s-endian host' % (fileName, header['byteorder']))
+
+    view = memoryview(map)
+    arrays = {}
+    for name in header['arrays']:
+        typecode, position, length = header['arrays'][name]
+        arrays[name] = view[start + position:start + position + length].cast(typecode)
+
+    return header['info'], arrays
@@ -0,0 +1,78 @@
+'''
+#
+# copyrows.py
+#
+# The rows of COPY ... TO STDOUT (format csv), as reportdb.export() writes
+# them to a report.
+#
+# export() has postgres write the rows of its query with
+#
+#       copy (query) to stdout with (format csv, delimiter E'\t', quote E'\x01', null '')
+#
+# csv has no backslash escapes, so a value is written as it is, except
+# that COPY quotes (with QUOTE) an empty string and a value that holds a
+# TAB, a CRT or a carriage return; a NULL is an empty field.
+#
+#       writer = copyrows.RowWriter(fp)
+#       cursor.copy_expert(copy, writer)
+#       writer.finish()
+#
+# RowWriter removes the quotes and calls fp.write() once per row, with the
+# complete row: a CRT inside a quoted value does not end the row, and the
+# chunks COPY hands to write() may end anywhere.
+#
+# This module does not use the database; lib/test_copyrows.py tests it.
+#
+'''
+
+import io
+
+# the CSV quote of export(); no MGI value holds it
+QUOTE = '\x01'
+
+class RowWriter(io.TextIOBase):
+    #
+    # passes the rows of COPY, decoded and without quotes, to fp.write(),
+    # one complete row per call; a CRT inside a quoted value (a value that
+    # holds a line break) does not end the row
+    #
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.pending = []
+        self.quotes = 0
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        parts = s.split('\n')
+        for i, part in enumerate(parts):
+            self.pending.append(part)
+            self.quotes = self.quotes + part.count(QUOTE)
+            if i == len(parts) - 1:
+                break
+            if self.quotes % 2:
+                # inside a quoted value
+                self.pending.append('\n')
+            else:
+                self.fp.write(''.join(self.pending).replace(QUOTE, '') + '\n')
+                self.pending = []
+                self.quotes = 0
+        return len(s)
+
+    def finish(self):
+        rest = ''.join(self.pending)
+        if rest:
+            self.fp.write(rest.replace(QUOTE, ''))
+            self.pending = []
+            self.quotes = 0
+
+class RowCollector:
+    # the rows export() writes, for reportdb.check()
+
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
@@ -0,0 +1,295 @@
+'''
+#
+# homologycache.py
+#
+# Run-scoped index of the Alliance direct homology clusters
+# (_ClusterType_key = 9272150, _ClusterSource_key = 75885739).
+#
+# The clusters are read once per run and written to a lib/columnfile.py
+# file that the reports memory-map, instead of each report joining
+# MRK_Cluster/MRK_ClusterMember/MRK_Marker again.
+#
+# Usage:
+#       homologycache.py [index file]
+#               (re)build the index
+#               (default: ${REPORTCACHEDIR}/homology.snapshot)
+#
+#       run_weekly.graph builds it before the weekly reports run.
+#
+# Python:
+#       import homologycache
+#
+#       homology = homologycache.load()
+#
+#       homology.clusters(markerKey)            # [_Cluster_key]
+#       homology.members(clusterKey, 2)         # human marker keys of the cluster
+#       homology.homologs(markerKey)            # markers of other organisms in the
+#                                               # marker's clusters
+#       homology.homologs(markerKey, 2)         # ... of organism 2 (human) only
+#       homology.oneToOne(mouseKey)             # human key, or None
+#       homology.pairs()                        # [(mouse key, human key)] one-to-one
+#
+#       load() builds the index if it does not exist yet, and rebuilds it if
+#       the clusters changed since it was built: the index records the number
+#       of cluster members and the latest cluster modification_date, like
+#       lib/markercache.py.
+#
+# One-to-one:
+#       a mouse marker (_Marker_Status_key in (1,3)) and a human marker that
+#       share a cluster, where the mouse marker has no other human homolog
+#       and the human marker has no other mouse homolog
+#       (the MGI statistic used by HOM_ProteinCoding.py)
+#
+# Arrays:
+#       members.cluster/marker/organism   cluster members, by cluster, organism, marker
+#       clusters.key/start                each cluster and its first member
+#       markers.key/cluster               (marker, cluster), by marker
+#       pairs.mouse/human                 one-to-one pairs, by mouse marker
+#
+'''
+
+import sys
+import os
+import array
+import bisect
+import columnfile
+
+MOUSE = 1
+HUMAN = 2
+
+def defaultFile():
+    return os.path.join(os.environ['REPORTCACHEDIR'], 'homology.snapshot')
+
+def generation():
+    #
+    # [cluster members, latest cluster modification_date] of the Alliance clusters
+    #
+
+    import db
+
+    r = db.sql('''
+        select count(*) as members, max(c.modification_date)::text as clusterdate
+        from MRK_Cluster c, MRK_ClusterMember cm
+        where c._ClusterType_key = 9272150
+        and c._ClusterSource_key = 75885739
+        and c._Cluster_key = cm._Cluster_key
+        ''', 'auto')[0]
+
+    return [r['members'], r['clusterdate']]
+
+def build(fileName = None):
+    #
+    # query the clusters and write the index
+    #
+
+    import db
+
+    if fileName is None:
+        fileName = defaultFile()
+
+    current = generation()
+
+    results = db.sql('''
+        select c._Cluster_key, cm._Marker_key, m._Organism_key, m._Marker_Status_key
+        from MRK_Cluster c, MRK_ClusterMember cm, MRK_Marker m
+        where c._ClusterType_key = 9272150
+        and c._ClusterSource_key = 75885739
+        and c._Cluster_key = cm._Cluster_key
+        and cm._Marker_key = m._Marker_key
+        order by c._Cluster_key, m._Organism_key, cm._Marker_key
+        ''', 'auto')
+
+    write(fileName, results, current)
+
+    return len(results)
+
+def write(fileName, rows, current = None):
+    #
+    # rows: dicts of _Cluster_key, _Marker_key, _Organism_key, _Marker_Status_key
+    # ordered by _Cluster_key, _Organism_key, _Marker_key
+    #
+
+    arrays = {}
+    arrays['members.cluster'] = array.array('i', [r['_Cluster_key'] for r in rows])
+    arrays['members.marker'] = array.array('i', [r['_Marker_key'] for r in rows])
+    arrays['members.organism'] = array.array('i', [r['_Organism_key'] for r in rows])
+
+    clusterKeys = array.array('i')
+    clusterStarts = array.array('I')
+    for i, r in enumerate(rows):
+        if not clusterKeys or clusterKeys[-1] != r['_Cluster_key']:
+            clusterKeys.append(r['_Cluster_key'])
+            clusterStarts.append(i)
+    clusterStarts.append(len(rows))
+    arrays['clusters.key'] = clusterKeys
+    arrays['clusters.start'] = clusterStarts
+
+    byMarker = sorted(set([(r['_Marker_key'], r['_Cluster_key']) for r in rows]))
+    arrays['markers.key'] = array.array('i', [m for m, c in byMarker])
+    arrays['markers.cluster'] = array.array('i', [c for m, c in byMarker])
+
+    # one-to-one mouse/human pairs
+    mice = {}
+    humans = {}
+    clusterMembers = {}
+    for r in rows:
+        if r['_Cluster_key'] not in clusterMembers:
+            clusterMembers[r['_Cluster_key']] = ([], [])
+        if r['_Organism_key'] == MOUSE and r['_Marker_Status_key'] in (1, 3):
+            clusterMembers[r['_Cluster_key']][0].append(r['_Marker_key'])
+        elif r['_Organism_key'] == HUMAN:
+            clusterMembers[r['_Cluster_key']][1].append(r['_Marker_key'])
+
+    allPairs = set()
+    for mouseList, humanList in clusterMembers.values():
+        for m in mouseList:
+            for h in humanList:
+                allPairs.add((m, h))
+
+    for m, h in allPairs:
+        mice[m] = mice.get(m, 0) + 1
+        humans[h] = humans.get(h, 0) + 1
+
+    pairs = sorted([(m, h) for m, h in allPairs if mice[m] == 1 and humans[h] == 1])
+    arrays['pairs.mouse'] = array.array('i', [m for m, h in pairs])
+    arrays['pairs.human'] = array.array('i', [h for m, h in pairs])
+
+    columnfile.write(fileName, arrays, {'members' : len(rows), 'clusters' : len(clusterKeys),
+        'generation' : current})
+
+class HomologyIndex:
+
+    def __init__(self, fileName):
+
+        info, self.arrays = columnfile.load(fileName)
+        self.fileName = fileName
+        self.generation = info.get('generation')
+
+    def span(self, keys, key):
+        #
+        # (first, last + 1) positions of key in the sorted array keys
+        #
+
+        return bisect.bisect_left(keys, key), bisect.bisect_right(keys, key)
+
+    def clusters(self, markerKey):
+        #
+        # the clusters of markerKey
+        #
+
+        first, last = self.span(self.arrays['markers.key'], markerKey)
+        return self.arrays['markers.cluster'][first:last].tolist()
+
+    def memberOrganisms(self, clusterKey):
+        #
+        # [(marker key, organism key)] of the cluster
+        #
+
+        first, last = self.span(self.arrays['clusters.key'], clusterKey)
+        if first == last:
+            return []
+
+        starts = self.arrays['clusters.start']
+        start, end = starts[first], starts[first + 1]
+        return list(zip(self.arrays['members.marker'][start:end].tolist(),
+                        self.arrays['members.organism'][start:end].tolist()))
+
+    def members(self, clusterKey, organism = None):
+        #
+        # marker keys of the cluster, of organism (a key, a list of keys,
+        # or None for all)
+        #
+
+        if isinstance(organism, int):
+            organism = (organism,)
+
+        return [m for m, o in self.memberOrganisms(clusterKey) if organism is None or o in organism]
+
+    def homologs(self, markerKey, organism = None):
+        #
+        # the markers that share a cluster with markerKey:
+        # of organism (a key or a list of keys), or, if organism is None,
+        # of every organism other than markerKey's own
+        #
+
+        if isinstance(organism, int):
+            organism = (organism,)
+
+        # list: in cluster order; set: each marker once
+        homologs = []
+        seen = set()
+        for clusterKey in self.clusters(markerKey):
+            members = self.memberOrganisms(clusterKey)
+            if organism is None:
+                own = dict(members)[markerKey]
+                wanted = [m for m, o in members if o != own]
+            else:
+                wanted = [m for m, o in members if o in organism and m != markerKey]
+            for m in wanted:
+                if m not in seen:
+                    seen.add(m)
+                    homologs.append(m)
+
+        return homologs
+
+    def oneToOne(self, mouseKey):
+        #
+        # the human marker of a one-to-one mouse/human pair; None if there is none
+        #
+
+        first, last = self.span(self.arrays['pairs.mouse'], mouseKey)
+        if first == last:
+            return None
+        return self.arrays['pairs.human'][first]
+
+    def pairs(self):
+        return list(zip(self.arrays['pairs.mouse'].tolist(), self.arrays['pairs.human'].tolist()))
+
+# {file name : (mtime, HomologyIndex)} loaded by this process
+loaded = {}
+
+def index(fileName):
+    #
+    # the HomologyIndex of fileName, mapped once per version of the file
+    #
+
+    mtime = os.stat(fileName).st_mtime
+    if fileName not in loaded or loaded[fileName][0] != mtime:
+        loaded[fileName] = (mtime, HomologyIndex(fileName))
+
+    return loaded[fileName][1]
+
+def load(fileName = None):
+    #
+    # the index in fileName (default: ${REPORTCACHEDIR}/homology.snapshot),
+    # built first if it does not exist or is older than the database
+    #
+
+    if fileName is None:
+        fileName = defaultFile()
+
+    if not os.path.exists(fileName) or index(fileName).generation != generation():
+        build(fileName)
+
+    return index(fileName)
+
+def main():
+
+    import db
+
+    db.setTrace()
+
+    if len(sys.argv) > 1:
+        fileName = sys.argv[1]
+    else:
+        fileName = defaultFile()
+
+    directory = os.path.dirname(os.path.abspath(fileName))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    count = build(fileName)
+    print('%s: %d cluster members' % (fileName, count))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+'''
+#
+# imsrcache.py
+#
+# The IMSR allStrains.csv file (${IMSR_STRAINS_CSV}), parsed once.
+#
+# The csv is parsed into the lookups the reports need, which are written
+# to a pickle in ${REPORTCACHEDIR}.  The pickle is keyed on the size and
+# modification time of the csv: it is used as long as the csv is unchanged,
+# and rebuilt by the first load() after the csv changes.
+#
+# Usage:
+#       imsrcache.py
+#               (re)build the index; run_weekly.graph runs this before the
+#               reports that use it
+#
+# Python:
+#       import imsrcache
+#
+#       imsr = imsrcache.load()
+#
+#       imsr.esProviders[id]            # allele or marker ID : sorted providers
+#                                       # holding es cells
+#       imsr.strainProviders[id]        # allele or marker ID : sorted providers
+#                                       # holding any other strain state
+#       imsr.markerProviders[id]        # marker ID : sorted providers
+#       imsr.alleleRepositories[id]     # allele ID : [strain ID]
+#       imsr.markerRepositories[id]     # marker ID : [strain ID]
+#       imsr.alleleStrains[id]          # allele ID : [strain name]
+#
+#       the lookups are shared; do not modify them
+#
+# allStrains.csv columns:
+#       0: allele IDs, 1: marker IDs, 2: strain name, 3: provider,
+#       4: strain states, 5: strain ID (all lists are comma-separated)
+#
+'''
+
+import os
+import csv
+import pickle
+
+LOOKUPS = ['esProviders', 'strainProviders', 'markerProviders',
+        'alleleRepositories', 'markerRepositories', 'alleleStrains']
+
+def defaultFile():
+    return os.path.join(os.environ['REPORTCACHEDIR'], 'imsr.pickle')
+
+def csvKey(csvFile):
+    #
+    # (size, mtime) of the csv
+    #
+
+    st = os.stat(csvFile)
+    return (st.st_size, st.st_mtime_ns)
+
+def sortedUnique(lookup):
+    for id in lookup:
+        lookup[id] = sorted(set(lookup[id]))
+
+def parse(csvFile):
+    #
+    # parse the csv into {lookup name : {id : [values]}}
+    #
+
+    esProviders = {}
+    strainProviders = {}
+    markerProviders = {}
+    alleleRepositories = {}
+    markerRepositories = {}
+    alleleStrains = {}
+
+    csvfile = open(csvFile, 'r')
+    for row in csv.reader(csvfile):
+        allele_ids = row[0]
+        marker_ids = row[1]
+        strain_name = row[2]
+        provider = row[3]
+        strain_states = row[4]
+        strain_id = row[5].replace(':EuMMCR', 'EuMMCR')
+
+        # providers of es cells/other strain states, by allele and marker ID
+        if strain_states:
+            for strain_state in strain_states.split(','):
+                if strain_state.lower() == 'es cell':
+                    facilityMap = esProviders
+                else:
+                    facilityMap = strainProviders
+                if allele_ids:
+                    for id in allele_ids.split(','):
+                        facilityMap.setdefault(id, []).append(provider)
+                if marker_ids:
+                    for id in marker_ids.split(','):
+                        facilityMap.setdefault(id, []).append(provider)
+
+        # repositories (MGI_DiseaseModel.py)
+        for id in allele_ids.split(','):
+            alleleRepositories.setdefault(id, []).append(strain_id)
+        for id in marker_ids.split(','):
+            markerProviders.setdefault(id, []).append(provider)
+            markerRepositories.setdefault(id, []).append(strain_id)
+
+        # strain names (MGI_Recombinase_Full.py)
+        if allele_ids and strain_name:
+            for id in allele_ids.split(','):
+                alleleStrains.setdefault(id, []).append(strain_name)
+    csvfile.close()
+
+    sortedUnique(esProviders)
+    sortedUnique(strainProviders)
+    sortedUnique(markerProviders)
+
+    return {
+        'esProviders' : esProviders,
+        'strainProviders' : strainProviders,
+        'markerProviders' : markerProviders,
+        'alleleRepositories' : alleleRepositories,
+        'markerRepositories' : markerRepositories,
+        'alleleStrains' : alleleStrains,
+    }
+
+def build(csvFile = None, fileName = None):
+    #
+    # parse the csv and write the index; returns the lookups
+    #
+
+    if csvFile is None:
+        csvFile = os.environ['IMSR_STRAINS_CSV']
+    if fileName is None:
+        fileName = defaultFile()
+
+    key = csvKey(csvFile)
+    lookups = parse(csvFile)
+
+    # a temporary file of its own: reports may build it at the same time
+    tmpFile = '%s.%d.new' % (fileName, os.getpid())
+    fp = open(tmpFile, 'wb')
+    pickle.dump((csvFile, key), fp, pickle.HIGHEST_PROTOCOL)
+    pickle.dump(lookups, fp, pickle.HIGHEST_PROTOCOL)
+    fp.close()
+    os.rename(tmpFile, fileName)
+
+    return lookups
+
+class IMSRIndex:
+
+    def __init__(self, lookups):
+        for name in LOOKUPS:
+            setattr(self, name, lookups[name])
+
+# {csv file : ((size, mtime), IMSRIndex)} loaded by this process
+loaded = {}
+
+def load(csvFile = None, fileName = None):
+    #
+    # the index of the csv (default: ${IMSR_STRAINS_CSV}); parsed and
+    # written first if the index is missing or the csv has changed
+    #
+
+    if csvFile is None:
+        csvFile = os.environ['IMSR_STRAINS_CSV']
+    if fileName is None:
+        fileName = defaultFile()
+
+    key = csvKey(csvFile)
+
+    if csvFile in loaded and loaded[csvFile][0] == key:
+        return loaded[csvFile][1]
+
+    lookups = None
+    if os.path.exists(fileName):
+        fp = open(fileName, 'rb')
+        if pickle.load(fp) == (csvFile, key):
+            lookups = pickle.load(fp)
+        fp.close()
+
+    if lookups is None:
+        lookups = build(csvFile, fileName)
+
+    loaded[csvFile] = (key, IMSRIndex(lookups))
+
+    return loaded[csvFile][1]
+
+def main():
+
+    fileName = defaultFile()
+
+    directory = os.path.dirname(os.path.abspath(fileName))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    imsr = load(fileName = fileName)
+    print('%s: %d alleles, %d markers' % (fileName, len(imsr.alleleRepositories), len(imsr.markerRepositories)))
+
+if __name__ == '__main__':
+    main()
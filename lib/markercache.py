@@ -0,0 +1,304 @@
+'''
+#
+# markercache.py
+#
+# Run-scoped snapshot of the marker dimension.
+#
+# Every MRK_Marker row (all organisms), with its preferred MGI id, status,
+# type, chromosome and cM offset, is written once per run to a compact
+# column file that any report can memory-map and use in milliseconds,
+# instead of building its own "markers" temp table.
+#
+# Usage:
+#       markercache.py [snapshot file]
+#               (re)build the snapshot
+#               (default: ${REPORTCACHEDIR}/markers.snapshot)
+#
+#       run_weekly.graph builds it before the weekly reports run.
+#
+# Python:
+#       import markercache
+#
+#       markers = markercache.load()
+#
+#       r = markers.get(markerKey)              # dict, or None
+#       r['symbol'], r['mgiID'], r['status'], ...
+#
+#       for r in markers.select(organism = 1, status = 1, markerType = (1, 7)):
+#               ...                             # in _Marker_key order
+#
+#       sorted(keys, key = markers.symbolOrder) # the database's "order by symbol"
+#
+#       load() builds the snapshot if it does not exist yet, and rebuilds it
+#       if the database changed since it was built (see Generation).
+#
+# Generation:
+#       the snapshot records the number of MRK_Marker rows and the latest
+#       modification_date of MRK_Marker and MRK_Location_Cache when it was
+#       built; load() reads them again (one small query) and rebuilds a
+#       snapshot whose generation differs, so a report run on its own never
+#       reads last week's markers.
+#
+# Columns (the keys of every row):
+#       _Marker_key, _Organism_key, _Marker_Status_key, _Marker_Type_key,
+#       symbol, name, chromosome, genomicChromosome, cmoffset, mgiID,
+#       status, markerType, symbolOrder
+#
+# File:
+#       a lib/columnfile.py file with one array per column; rows are sorted
+#       by _Marker_key.  integer columns: int32 (None is -1);
+#       cmoffset: float64 (None is NaN); strings: columnfile.stringColumn()
+#
+'''
+
+import sys
+import os
+import bisect
+import math
+import columnfile
+
+# (column, type): i = int32, d = float64, s = string
+COLUMNS = [
+        ('_Marker_key', 'i'),
+        ('_Organism_key', 'i'),
+        ('_Marker_Status_key', 'i'),
+        ('_Marker_Type_key', 'i'),
+        ('symbol', 's'),
+        ('name', 's'),
+        ('chromosome', 's'),
+        ('genomicChromosome', 's'),
+        ('cmoffset', 'd'),
+        ('mgiID', 's'),
+        ('symbolOrder', 'i'),
+]
+
+def defaultFile():
+    return os.path.join(os.environ['REPORTCACHEDIR'], 'markers.snapshot')
+
+def generation():
+    #
+    # [MRK_Marker rows, latest MRK_Marker/MRK_Location_Cache modification_date]
+    #
+
+    import db
+
+    r = db.sql('''
+        select (select count(*) from MRK_Marker) as markers,
+                (select max(modification_date) from MRK_Marker)::text as markerdate,
+                (select max(modification_date) from MRK_Location_Cache)::text as locationdate
+        ''', 'auto')[0]
+
+    return [r['markers'], r['markerdate'], r['locationdate']]
+
+def build(fileName = None):
+    #
+    # query the marker dimension and write the snapshot
+    #
+
+    import db
+
+    if fileName is None:
+        fileName = defaultFile()
+
+    # before the query: a change made while it runs makes the snapshot stale
+    current = generation()
+
+    statuses = {}
+    for r in db.sql('select _Marker_Status_key, status from MRK_Status', 'auto'):
+        statuses[str(r['_Marker_Status_key'])] = r['status']
+
+    types = {}
+    for r in db.sql('select _Marker_Type_key, name from MRK_Types', 'auto'):
+        types[str(r['_Marker_Type_key'])] = r['name']
+
+    results = db.sql('''
+        select m._Marker_key, m._Organism_key, m._Marker_Status_key, m._Marker_Type_key,
+                m.symbol, m.name, m.chromosome, mlc.genomicChromosome, m.cmoffset,
+                a.accID as mgiID,
+                row_number() over (order by m.symbol) as symbolOrder
+        from MRK_Marker m
+                left outer join MRK_Location_Cache mlc on (m._Marker_key = mlc._Marker_key)
+                left outer join ACC_Accession a on (m._Marker_key = a._Object_key
+                        and a._MGIType_key = 2
+                        and a._LogicalDB_key = 1
+                        and a.prefixPart = 'MGI:'
+                        and a.preferred = 1)
+        order by m._Marker_key
+        ''', 'auto')
+
+    write(fileName, results, statuses, types, current)
+
+    return len(results)
+
+def write(fileName, rows, statuses, types, current = None):
+    #
+    # write rows (dicts with the keys of COLUMNS, sorted by _Marker_key)
+    # to fileName
+    #
+
+    arrays = {}
+    for column, type in COLUMNS:
+        values = [r[column] for r in rows]
+        if type == 's':
+            arrays[column + '.offsets'], arrays[column + '.blob'] = columnfile.stringColumn(values)
+        elif type == 'd':
+            arrays[column] = columnfile.column(values, 'd', float('nan'))
+        else:
+            arrays[column] = columnfile.column(values, 'i')
+
+    columnfile.write(fileName, arrays, {'count' : len(rows), 'statuses' : statuses, 'types' : types,
+        'generation' : current})
+
+class MarkerSnapshot:
+
+    def __init__(self, fileName):
+
+        info, self.arrays = columnfile.load(fileName)
+
+        self.fileName = fileName
+        self.count = info['count']
+        self.statuses = info['statuses']
+        self.types = info['types']
+        self.generation = info.get('generation')
+        self.keyColumn = self.arrays['_Marker_key']
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self.index(key) >= 0
+
+    def index(self, key):
+        #
+        # row number of _Marker_key "key"; -1 if it is not in the snapshot
+        #
+
+        i = bisect.bisect_left(self.keyColumn, key)
+        if i < self.count and self.keyColumn[i] == key:
+            return i
+        return -1
+
+    def value(self, column, i):
+        #
+        # value of "column" in row i
+        #
+
+        if column == 'status':
+            return self.statuses.get(str(self.arrays['_Marker_Status_key'][i]))
+        if column == 'markerType':
+            return self.types.get(str(self.arrays['_Marker_Type_key'][i]))
+
+        if column + '.offsets' in self.arrays:
+            return columnfile.string(self.arrays, column, i)
+
+        value = self.arrays[column][i]
+        if column == 'cmoffset':
+            if math.isnan(value):
+                return None
+        elif value == -1:
+            return None
+        return value
+
+    def row(self, i):
+        r = {}
+        for column, type in COLUMNS:
+            r[column] = self.value(column, i)
+        r['status'] = self.value('status', i)
+        r['markerType'] = self.value('markerType', i)
+        return r
+
+    def get(self, key, default = None):
+        #
+        # the row of _Marker_key "key"
+        #
+
+        i = self.index(key)
+        if i < 0:
+            return default
+        return self.row(i)
+
+    def keys(self):
+        return self.keyColumn.tolist()
+
+    def symbolOrder(self, key):
+        #
+        # sort key: position of the marker in "order by symbol"
+        # raises KeyError if the marker is not in the snapshot
+        #
+
+        i = self.index(key)
+        if i < 0:
+            raise KeyError(key)
+        return self.value('symbolOrder', i)
+
+    def select(self, organism = None, status = None, markerType = None):
+        #
+        # rows matching the filters, in _Marker_key order
+        # each filter is a key or a list/tuple/set of keys; None matches all
+        #
+
+        filters = []
+        for column, wanted in (('_Organism_key', organism),
+                               ('_Marker_Status_key', status),
+                               ('_Marker_Type_key', markerType)):
+            if wanted is None:
+                continue
+            if isinstance(wanted, int):
+                wanted = (wanted,)
+            filters.append((self.arrays[column], set(wanted)))
+
+        for i in range(self.count):
+            for values, wanted in filters:
+                if values[i] not in wanted:
+                    break
+            else:
+                yield self.row(i)
+
+# {file name : (mtime, MarkerSnapshot)} loaded by this process
+loaded = {}
+
+def snapshot(fileName):
+    #
+    # the MarkerSnapshot of fileName, mapped once per version of the file
+    #
+
+    mtime = os.stat(fileName).st_mtime
+    if fileName not in loaded or loaded[fileName][0] != mtime:
+        loaded[fileName] = (mtime, MarkerSnapshot(fileName))
+
+    return loaded[fileName][1]
+
+def load(fileName = None):
+    #
+    # the snapshot in fileName (default: ${REPORTCACHEDIR}/markers.snapshot),
+    # built first if it does not exist or is older than the database
+    #
+
+    if fileName is None:
+        fileName = defaultFile()
+
+    if not os.path.exists(fileName) or snapshot(fileName).generation != generation():
+        build(fileName)
+
+    return snapshot(fileName)
+
+def main():
+
+    import db
+
+    db.setTrace()
+
+    if len(sys.argv) > 1:
+        fileName = sys.argv[1]
+    else:
+        fileName = defaultFile()
+
+    directory = os.path.dirname(os.path.abspath(fileName))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    count = build(fileName)
+    print('%s: %d markers' % (fileName, count))
+
+if __name__ == '__main__':
+    main()
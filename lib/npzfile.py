@@ -0,0 +1,101 @@
+'''
+#
+# npzfile.py
+#
+# Write NumPy .npz files (a zip of .npy arrays) without requiring NumPy.
+#
+# The files load with numpy.load(); arrays are little-endian, C order.
+#
+# Usage:
+#       import npzfile
+#
+#       npzfile.save('E-GEOD-22131.tpm.npz', {
+#               'marker_key' : npzfile.intArray(keys),
+#               'marker_symbol' : npzfile.stringArray(symbols),
+#               'avg_TPM' : npzfile.floatArray(values, (len(keys), len(samples))),
+#       })
+#
+'''
+
+import sys
+import array
+import zipfile
+
+MAGIC = b'\x93NUMPY\x01\x00'
+
+def littleEndian(values):
+    #
+    # bytes of an array.array in little-endian order
+    #
+
+    if sys.byteorder != 'little':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+def floatArray(values, shape = None):
+    #
+    # float32 array; values is an array.array('f') or a list of floats
+    #
+
+    if not isinstance(values, array.array) or values.typecode != 'f':
+        values = array.array('f', values)
+
+    if shape is None:
+        shape = (len(values),)
+
+    return ('<f4', shape, littleEndian(values))
+
+def intArray(values, shape = None):
+    #
+    # int32 array
+    #
+
+    values = array.array('i', values)
+
+    if shape is None:
+        shape = (len(values),)
+
+    return ('<i4', shape, littleEndian(values))
+
+def stringArray(values):
+    #
+    # fixed-width unicode array; None is stored as ''
+    #
+
+    values = ['' if v is None else str(v) for v in values]
+    width = max([len(v) for v in values] + [1])
+
+    data = b''.join([v.encode('utf-32-le').ljust(width * 4, b'\0') for v in values])
+
+    return ('<U%d' % (width), (len(values),), data)
+
+def npy(descr, shape, data):
+    #
+    # .npy (version 1.0) bytes of one array
+    #
+
+    if len(shape) == 1:
+        shapeStr = '(%d,)' % (shape[0])
+    else:
+        shapeStr = '(%s)' % (', '.join([str(n) for n in shape]))
+
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': %s, }" % (descr, shapeStr)
+
+    # magic + header length + header + '\n' is padded to a multiple of 64
+    padding = 64 - (len(MAGIC) + 2 + len(header) + 1) % 64
+    header = header + ' ' * (padding % 64) + '\n'
+
+    return MAGIC + len(header).to_bytes(2, 'little') + header.encode('latin1') + data
+
+def save(fileName, arrays):
+    #
+    # write {name : xxxArray(...)} to fileName
+    #
+
+    fp = zipfile.ZipFile(fileName, 'w', zipfile.ZIP_DEFLATED)
+    for name in arrays:
+        descr, shape, data = arrays[name]
+        fp.writestr(name + '.npy', npy(descr, shape, data))
+    fp.close()
@@ -0,0 +1,282 @@
+'''
+#
+# querytrace.py
+#
+# Per-query trace of a report: wall time, rows, bytes and, optionally,
+# the plan of every query the report runs through db.sql() or lib/reportdb.py.
+#
+# One JSON object per query is appended to the trace file:
+#
+#       {"report": "MRK_List.py", "call": "db.sql", "start": 1700000000.0,
+#        "seconds": 12.3, "rows": 81234, "bytes": 5123456,
+#        "sql": "select ...", "plan": [...]}
+#
+#       rows/bytes: rows returned and the size of their values (text length,
+#       8 per number/date); null for commands that return no rows
+#
+#       plan: EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) of a plain select that
+#       took more than ${REPORTQUERYEXPLAIN} seconds (not set/0: never).
+#       The select is run a second time to get it, so a select that writes
+#       (select into, a with of insert/update/delete/merge, for update/share)
+#       is never explained.
+#
+# lib/reportrunner.py writes <log directory>/<report>.queries.jsonl for every
+# report with -q (or when ${REPORTQUERYTRACE} is 1; it is 0 by default) and logs the slowest
+# queries of the run (summary()).  A single report is traced with
+# "lib/reportbootstrap.py -q trace file report.py".
+#
+# Usage:
+#       querytrace.py [-n N] trace file ...
+#               print the N (default: ${REPORTQUERYTOP}, else 20) slowest queries
+#
+# Python:
+#       import querytrace
+#
+#       querytrace.install()                    # once per process
+#       querytrace.start('trace file', 'MRK_List.py')
+#       ...
+#       querytrace.stop()
+#
+'''
+
+import sys
+import os
+import re
+import json
+import time
+import getopt
+
+# seconds above which a select is explained; 0 = never
+EXPLAINSECONDS = float(os.environ.get('REPORTQUERYEXPLAIN', 0) or 0)
+
+# queries listed by summary()
+TOP = int(os.environ.get('REPORTQUERYTOP', 20))
+
+# the open trace file and the report it traces
+traceFile = None
+report = None
+
+# the untraced functions, once install() has run
+original = {}
+
+whitespace = re.compile(r'\s+')
+plainSelect = re.compile(r'^\s*(\(\s*)*(select|with)\b', re.IGNORECASE)
+selectInto = re.compile(r'\binto\s+(temporary|temp|unlogged|table)\b', re.IGNORECASE)
+# data-modifying with (with x as (delete ...) select ...), row locks
+modifies = re.compile(r'\b(insert|update|delete|merge|for\s+(no\s+key\s+)?(update|share|key\s+share))\b', re.IGNORECASE)
+
+def valueBytes(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    return 8
+
+def resultSize(results):
+    #
+    # (rows, bytes) of a db.sql() result; (None, None) if it has no rows
+    #
+
+    if not isinstance(results, list):
+        return None, None
+
+    size = 0
+    for r in results:
+        if isinstance(r, dict):
+            for value in r.values():
+                size = size + valueBytes(value)
+        else:
+            return None, None
+
+    return len(results), size
+
+def explain(sql):
+    #
+    # EXPLAIN ANALYZE of a plain select, or None
+    #
+
+    # EXPLAIN ANALYZE runs the statement again: only a select that does not
+    # write; a prepared query (%s placeholders) cannot be explained without
+    # its values
+    if not plainSelect.match(sql) or selectInto.search(sql) or modifies.search(sql) or '%s' in sql:
+        return None
+
+    try:
+        results = original['db.sql']('explain (analyze, buffers, format json) %s' % (sql), 'auto')
+        plan = list(results[0].values())[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan
+    except Exception as e:
+        return 'explain failed: %s' % (e)
+
+def record(call, sql, startTime, seconds, rows, size):
+    #
+    # append one query to the trace file
+    #
+
+    if traceFile is None:
+        return
+
+    sql = whitespace.sub(' ', sql).strip()
+
+    entry = {
+        'report' : report,
+        'call' : call,
+        'start' : round(startTime, 3),
+        'seconds' : round(seconds, 4),
+        'rows' : rows,
+        'bytes' : size,
+        'sql' : sql,
+    }
+
+    if EXPLAINSECONDS and seconds > EXPLAINSECONDS:
+        plan = explain(sql)
+        if plan is not None:
+            entry['plan'] = plan
+
+    traceFile.write(json.dumps(entry) + '\n')
+    traceFile.flush()
+
+def tracedSql(cmd, parser = 'auto', **kwargs):
+    startTime = time.time()
+    results = original['db.sql'](cmd, parser, **kwargs)
+    seconds = time.time() - startTime
+
+    if isinstance(cmd, list):
+        sql = '; '.join(cmd)
+        rows, size = None, None
+    else:
+        sql = cmd
+        rows, size = resultSize(results)
+
+    record('db.sql', sql, startTime, seconds, rows, size)
+
+    return results
+
+def tracedFetch(query, batchSize = None, params = None):
+    startTime = time.time()
+    seconds = 0
+    rows = 0
+    size = 0
+
+    # the time spent in the report between batches is not the query's
+    batchStart = startTime
+    try:
+        for names, batch in original['reportdb.fetch'](query, batchSize, params):
+            seconds = seconds + time.time() - batchStart
+            rows = rows + len(batch)
+            for row in batch:
+                for value in row:
+                    size = size + valueBytes(value)
+            yield names, batch
+            batchStart = time.time()
+        seconds = seconds + time.time() - batchStart
+    finally:
+        record('reportdb.fetch', query, startTime, seconds, rows, size)
+
+class CountingWriter:
+    # counts what export() writes to fp
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.size = 0
+
+    def write(self, s):
+        self.size = self.size + len(s)
+        return self.fp.write(s)
+
+def tracedExport(fp, query):
+    startTime = time.time()
+    counter = CountingWriter(fp)
+    count = original['reportdb.export'](counter, query)
+    record('reportdb.export', query, startTime, time.time() - startTime, count, counter.size)
+    return count
+
+def install():
+    #
+    # trace db.sql() and lib/reportdb.py in this process
+    #
+
+    import db
+
+    if 'db.sql' not in original:
+        original['db.sql'] = db.sql
+        db.sql = tracedSql
+
+    try:
+        import reportdb
+    except ImportError:
+        return
+
+    if 'reportdb.fetch' not in original:
+        original['reportdb.fetch'] = reportdb.fetch
+        original['reportdb.export'] = reportdb.export
+        reportdb.fetch = tracedFetch
+        reportdb.export = tracedExport
+
+def start(fileName, name):
+    #
+    # trace the queries of report "name" to fileName
+    #
+
+    global traceFile, report
+
+    stop()
+    traceFile = open(fileName, 'w')
+    report = name
+
+def stop():
+
+    global traceFile, report
+
+    if traceFile is not None:
+        traceFile.close()
+    traceFile = None
+    report = None
+
+def summary(fileNames, top = None):
+    #
+    # the "top" slowest queries of the trace files, as lines of text
+    #
+
+    if top is None:
+        top = TOP
+
+    entries = []
+    for fileName in fileNames:
+        fp = open(fileName, 'r')
+        for line in fp:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        fp.close()
+
+    entries.sort(key = lambda e: e['seconds'], reverse = True)
+
+    lines = ['%d queries in %d reports; %.1f seconds in all; slowest %d:' % \
+        (len(entries), len(set([e['report'] for e in entries])), sum([e['seconds'] for e in entries]), min(top, len(entries)))]
+    for e in entries[:top]:
+        lines.append('%10.1fs %10s rows  %s  %s' % (e['seconds'], e['rows'] if e['rows'] is not None else '-', e['report'], e['sql'][:160]))
+
+    return lines
+
+def main():
+
+    try:
+        optlist, args = getopt.getopt(sys.argv[1:], 'n:')
+    except getopt.GetoptError as e:
+        sys.stderr.write('%s\n%s\n' % (e, __doc__))
+        sys.exit(1)
+
+    top = None
+    for opt, arg in optlist:
+        if opt == '-n':
+            top = int(arg)
+
+    for line in summary(args, top):
+        print(line)
+
+if __name__ == '__main__':
+    main()
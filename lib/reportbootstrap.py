@@ -0,0 +1,97 @@
+'''
+#
+# reportbootstrap.py
+#
+# Run one report script with the hooks of lib/reportrunner.py, as
+# "${PYTHON} report.py" would run it.
+#
+# lib/reportrunner.py runs every report through this script (and, in
+# in-process mode, installs the same hooks in its workers).
+#
+# Usage:
+#       reportbootstrap.py [-o outputs file] [-q trace file] [-p mode] [-l directory]
+#               report.py [arguments]
+#
+#       -o      write the files the report opened with reportlib.init()
+#               to outputs file (a JSON list; lib/reporttelemetry.py)
+#       -q      trace the report's queries to trace file (lib/querytrace.py)
+#       -p      profile the report: sample or cprofile (lib/reportprofile.py)
+#               (default: ${REPORTPROFILE})
+#       -l      directory of the profile files
+#               (default: ${REPORTLOGSDIR}, else the current directory)
+#
+# To profile one report in production conditions:
+#
+#       cd ${PUBWEEKLY}
+#       ${PYTHON} ../lib/reportbootstrap.py -p cprofile MGI_iphone_app.py
+#
+'''
+
+import sys
+import os
+import json
+import getopt
+import runpy
+import reportprofile
+
+def main():
+
+    outputsFile = None
+    traceFile = None
+    profileMode = reportprofile.mode()
+    profileDir = os.environ.get('REPORTLOGSDIR', '.')
+
+    try:
+        optlist, args = getopt.getopt(sys.argv[1:], 'o:q:p:l:')
+    except getopt.GetoptError as e:
+        sys.stderr.write('%s\n%s\n' % (e, __doc__))
+        sys.exit(1)
+
+    for opt, arg in optlist:
+        if opt == '-o':
+            outputsFile = arg
+        elif opt == '-q':
+            traceFile = arg
+        elif opt == '-p':
+            profileMode = arg
+        elif opt == '-l':
+            profileDir = arg
+
+    if len(args) < 1:
+        sys.stderr.write(__doc__)
+        sys.exit(1)
+
+    script = args[0]
+    name = os.path.basename(script)
+
+    # run the report as "${PYTHON} report.py arguments" would
+    sys.argv = args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+
+    if outputsFile:
+        import reporttelemetry
+        reporttelemetry.install()
+
+    if traceFile:
+        import querytrace
+        querytrace.install()
+        querytrace.start(traceFile, name)
+
+    if profileMode:
+        profiler = reportprofile.Profiler(profileMode)
+        profiler.start()
+
+    try:
+        runpy.run_path(script, run_name = '__main__')
+    finally:
+        if profileMode:
+            profiler.stop(os.path.join(profileDir, name))
+        if traceFile:
+            querytrace.stop()
+        if outputsFile:
+            fp = open(outputsFile, 'w')
+            json.dump(reporttelemetry.outputs, fp)
+            fp.close()
+
+if __name__ == '__main__':
+    main()
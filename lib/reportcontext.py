@@ -0,0 +1,102 @@
+'''
+#
+# reportcontext.py
+#
+# Temp tables that reports build identically, created once per database
+# session.
+#
+#       import reportcontext
+#
+#       deletedIDs = reportcontext.current().table('deletedIDs')
+#
+# context.table(name) creates temp table shared_<name> (SHARED below) if
+# the session does not have it yet, and returns its name.  A report run
+# stand-alone always creates it; a report run by a lib/reportrunner.py -i
+# worker reuses the table when the report before it, in the same worker,
+# left its session open (the runner does not keep sessions open itself).
+#
+# Shared temp tables:
+#
+#       today only deletedIDs, used by MRK_Sequence.py.
+#
+#       A table belongs in SHARED only when a report uses exactly that
+#       definition; the homology/marker temp tables the reports build each
+#       differ (cluster source, organism, status, columns), so they stay in
+#       the reports.
+#
+#       shared tables are named "shared_<name>" so they never collide with
+#       the report's own temp tables (markers, homology, etc.), which
+#       the runner drops after each report.
+#
+'''
+
+import db
+
+SHARED_PREFIX = 'shared_'
+
+#
+# name : list of sql commands that create temp table shared_<name>
+#
+SHARED = {
+
+    #
+    # accession ids of deleted sequences (_SequenceStatus_key = 316343)
+    #
+    'deletedIDs' : [
+        '''
+        select a.accID, a._LogicalDB_key
+        into temporary table shared_deletedIDs
+        from SEQ_Sequence s, ACC_Accession a
+        where s._SequenceStatus_key = 316343
+        and s._Sequence_key = a._Object_key
+        and a._MGIType_key = 19
+        ''',
+        'create index shared_deletedIDs_idx1 on shared_deletedIDs(accID)',
+        'create index shared_deletedIDs_idx2 on shared_deletedIDs(_LogicalDB_key)',
+    ],
+}
+
+class Context:
+
+    def exists(self, tableName):
+        #
+        # 1 if the session has temp table tableName
+        #
+
+        results = db.sql('''
+            select 1 from pg_class
+            where relnamespace = pg_my_temp_schema()
+            and relname = '%s'
+            ''' % (tableName.lower()), 'auto')
+
+        return len(results) > 0
+
+    def table(self, name):
+        #
+        # return the name of shared temp table "name", creating it if
+        # it does not exist yet in this session
+        #
+
+        tableName = SHARED_PREFIX + name
+
+        if not self.exists(tableName):
+            for cmd in SHARED[name]:
+                db.sql(cmd, None)
+
+        return tableName
+
+# the context of the running report
+currentContext = None
+
+def current():
+    #
+    # return the context of the running report
+    # (a new one when run stand-alone)
+    #
+
+    global currentContext
+
+    if currentContext is None:
+        currentContext = Context()
+
+    return currentContext
@@ -0,0 +1,566 @@
+'''
+#
+# reportdb.py
+#
+# Database access the db module does not provide, on the same session.
+#
+# stream():
+#
+#       db.sql(query, 'auto') fetches the whole result into a list of dicts
+#       before the first row can be written.  stream() reads the result
+#       through a server-side cursor, REPORTSTREAMBATCH rows at a time, so a
+#       report holds one batch of rows instead of the result, and postgres
+#       computes the next rows while the report writes the last ones.
+#
+#       The cursor is declared WITH HOLD inside a transaction that stream()
+#       opens on the shared session and commits when the last open stream
+#       is done, so postgres computes the rows as they are fetched.
+#       Queries the report runs while it reads a stream (db.sql()) run in
+#       that transaction; if one of them commits it (a write, e.g. a
+#       select into a temp table), the cursor survives the commit, but
+#       postgres then computes the rest of its rows at once.
+#
+#       import reportdb
+#
+#       for r in reportdb.stream(query):
+#               fp.write(r['symbol'] + ...)
+#
+#       the rows are dicts, keyed like the rows of db.sql(query, 'auto'):
+#       a column may be read as it is spelled in the query (r['_Marker_key'])
+#       or as postgres names it (r['_marker_key'])
+#
+# rows(), listLookup(), valueLookup():
+#
+#       lookups built from a query, without a dict per row.
+#
+#       rows = reportdb.rows(query)             # [TupleRow]
+#       r['startC'], r.startC, r[2]             # a TupleRow is a tuple whose
+#                                               # columns may also be read by name
+#                                               # (any case), like a db.sql row
+#
+#       # {_Marker_key : [accID]}
+#       ids = reportdb.listLookup(query, '_Marker_key', 'accID')
+#
+#       # {_Marker_key : [TupleRow]}
+#       coords = reportdb.listLookup(query, '_Marker_key')
+#
+#       # {_Object_key : note} (the last row of a key wins)
+#       notes = reportdb.valueLookup(query, '_Object_key', 'note')
+#
+#       # keys of several columns are tuples
+#       refs = reportdb.listLookup(query, ('_Object_key', '_Term_key'), 'jnum')
+#
+#       lists keep the order of the query's rows
+#
+#       reading a TupleRow column (by name or position) is a Python call,
+#       several times the cost of a dict lookup: a loop over many rows
+#       names the columns it writes as the lookup's value, which stores
+#       plain tuples, or unpacks the rows
+#
+#       # {_Marker_key : [(startC, endC, strand)]}
+#       coords = reportdb.listLookup(query, '_Marker_key', ('startC', 'endC', 'strand'))
+#       for key, ldb, accID in reportdb.rows(query):
+#
+# Parameters:
+#
+#       stream(), rows(), listLookup() and valueLookup() take the values of
+#       the query's %s placeholders as "params" instead of formatted SQL:
+#
+#       query = 'select ... where e._experiment_key = %s and rna._marker_key = any(%s)'
+#       for r in reportdb.stream(query, params = (eKey, mKeys)):
+#
+#       values are bound, never pasted into the SQL (a list is an array).
+#       Each distinct query is PREPAREd once per session and every call
+#       EXECUTEs it, so a query run in a loop is parsed and planned once.
+#       A prepared query's rows are fetched by an ordinary cursor, not a
+#       server-side one: use it for results that fit in memory.
+#       In the query, % must be written %%.
+#
+# export():
+#
+#       a report that is one query written as TAB-separated, CRT-terminated
+#       rows can hand the query to postgres:
+#
+#       fp = reportlib.init(...)
+#       fp.write(header)
+#       reportdb.export(fp, query)
+#       reportlib.finish_nonps(fp)
+#
+#       COPY (query) TO STDOUT writes the rows; no Python row is made.
+#       The output is the same as fp.write(TAB.join(...) + CRT) of
+#       every row when every column is text or an integer: a NULL is written
+#       as '' (like mgi_utils.prvalue()), and values are written as they are,
+#       without quotes or escapes.
+#       fp may be a file or any object with write(); write() is called once
+#       per row, with the complete row (a value may hold a line break).
+#
+#       With ${REPORTEXPORTCHECK} set to 1, export() also reads the query's
+#       rows the Python way and raises ValueError at the first row whose bytes
+#       differ from COPY's; run a report once that way against the production
+#       database before converting it.  A report whose values may be NULL and
+#       that wrote them with str() (None) must not be converted.
+#
+# Session:
+#
+#       a report that uses reportdb calls
+#
+#       reportdb.init()
+#
+#       which turns on db's shared session (db.useOneConnection(1)) and
+#       takes its connection (db.sharedConnection), so that the cursors,
+#       prepared statements and COPY of reportdb see the report's temp
+#       tables.  Without init(), if db does not expose the connection, or
+#       once the report closed the session, every query goes through
+#       db.sql() instead: the same rows and output, without streaming,
+#       PREPARE or COPY.
+#
+'''
+
+import os
+import re
+import operator
+import db
+import psycopg2
+import psycopg2.extensions
+import copyrows
+
+# rows fetched per round trip by stream()
+BATCHSIZE = int(os.environ.get('REPORTSTREAMBATCH', 10000))
+
+# names of the server-side cursors
+cursorCount = 0
+
+# streams open in the transaction begun by fetch()
+openStreams = 0
+
+# the connection of db's shared session, taken by init()
+session = None
+
+identifier = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+# {query : prepared statement name} of preparedConnection
+prepared = {}
+preparedConnection = None
+
+class Row(dict):
+    #
+    # a result row; keys may be read in any case
+    #
+
+    def __missing__(self, key):
+        lower = key.lower()
+        for name in self.keys():
+            if name.lower() == lower:
+                return dict.__getitem__(self, name)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if dict.__contains__(self, key):
+            return True
+        lower = key.lower()
+        for name in self.keys():
+            if name.lower() == lower:
+                return True
+        return False
+
+    def get(self, key, default = None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+class TupleRow(tuple):
+    #
+    # a result row stored as a tuple; see rowType()
+    #
+
+    __slots__ = ()
+
+    # column names, and {lowercase column name : position}, of the row type
+    names = ()
+    columns = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return tuple.__getitem__(self, self.columns[key.lower()])
+            except KeyError:
+                raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __contains__(self, key):
+        return key.lower() in self.columns
+
+    def get(self, key, default = None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self.names)
+
+# {column names : TupleRow class}
+rowTypes = {}
+
+def rowType(names):
+    #
+    # the TupleRow class of a result with columns "names"
+    #
+
+    names = tuple(names)
+
+    if names not in rowTypes:
+        columns = {}
+        for i, name in enumerate(names):
+            columns[name.lower()] = i
+        rowTypes[names] = type('TupleRow', (TupleRow,), {'__slots__' : (), 'names' : names, 'columns' : columns})
+
+    return rowTypes[names]
+
+def init():
+    #
+    # use db's shared session; returns 1 if reportdb has its connection,
+    # 0 if the queries go through db.sql()
+    #
+
+    global session, openStreams
+
+    db.useOneConnection(1)
+    session = getattr(db, 'sharedConnection', None)
+    openStreams = 0
+
+    return int(session is not None)
+
+def connection():
+    #
+    # the connection of db's shared session (see init()), or None
+    #
+
+    if session is None or session.closed:
+        return None
+
+    return session
+
+def literal(value):
+    #
+    # value as an SQL literal, for a query run by db.sql()
+    #
+
+    if isinstance(value, str):
+        return "'%s'" % (value.replace("'", "''"))
+
+    if isinstance(value, list):
+        if not value:
+            return "'{}'"
+        return 'array[%s]' % (','.join([literal(v) for v in value]))
+
+    return psycopg2.extensions.adapt(value).getquoted().decode()
+
+def fetchSql(query, params, batchSize):
+    #
+    # generator of (column names, [tuple]) of query, run by db.sql()
+    #
+
+    if params is not None:
+        query = query % tuple([literal(p) for p in params])
+
+    results = db.sql(query, 'auto')
+
+    if not results:
+        return
+
+    names = columnNames(query, [(name,) for name in results[0].keys()])
+    for i in range(0, len(results), batchSize):
+        yield names, [tuple(r.values()) for r in results[i:i + batchSize]]
+
+def columnNames(query, description):
+    #
+    # the column names of description, spelled as in query
+    #
+
+    spelling = {}
+    for word in identifier.findall(query):
+        lower = word.lower()
+        if lower not in spelling:
+            spelling[lower] = word
+
+    return [spelling.get(d[0], d[0]) for d in description]
+
+def prepare(cursor, query):
+    #
+    # the name of the prepared statement of query (%s placeholders) on
+    # cursor's connection, prepared first if this session has not yet
+    # returns (name, number of parameters)
+    #
+
+    global preparedConnection
+
+    if cursor.connection is not preparedConnection:
+        prepared.clear()
+        preparedConnection = cursor.connection
+
+    parts = query.split('%%')
+    count = sum([p.count('%s') for p in parts])
+
+    if query not in prepared:
+        # %s -> $1, $2, ...; %% -> %
+        n = 0
+        statement = []
+        for p in parts:
+            pieces = p.split('%s')
+            for i in range(1, len(pieces)):
+                n = n + 1
+                pieces[i] = '$%d%s' % (n, pieces[i])
+            statement.append(''.join(pieces))
+        name = 'reportdb_stmt_%d' % (len(prepared) + 1)
+        cursor.execute('prepare %s as %s' % (name, '%'.join(statement)))
+        prepared[query] = name
+
+    return prepared[query], count
+
+def fetchPrepared(query, params, batchSize):
+    #
+    # generator of (column names, [tuple]) of the prepared query
+    #
+
+    cursor = connection().cursor()
+
+    try:
+        name, count = prepare(cursor, query)
+        if count:
+            cursor.execute('execute %s (%s)' % (name, ','.join(['%s'] * count)), tuple(params))
+        else:
+            cursor.execute('execute %s' % (name))
+        names = None
+        while True:
+            rows = cursor.fetchmany(batchSize)
+            if not rows:
+                break
+            if names is None:
+                names = columnNames(query, cursor.description)
+            yield names, rows
+    finally:
+        cursor.close()
+
+def beginStream(cursor):
+    #
+    # open the transaction of the streams, unless one is open
+    # (a db.sql() of the report may have committed it)
+    #
+
+    global openStreams
+
+    if cursor.connection.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        cursor.execute('begin')
+    openStreams = openStreams + 1
+
+def endStream(cursor, name):
+    #
+    # close server-side cursor "name"; the last open stream ends the
+    # transaction (rolled back if a query in it failed)
+    #
+
+    global openStreams
+
+    openStreams = openStreams - 1
+
+    if cursor.connection.closed:
+        openStreams = 0
+        return
+
+    status = cursor.connection.get_transaction_status()
+    failed = status == psycopg2.extensions.TRANSACTION_STATUS_INERROR
+
+    if not failed:
+        cursor.execute('close %s' % (name))
+
+    # the transaction may have been committed by a db.sql() of the report
+    if openStreams == 0:
+        if failed:
+            cursor.execute('rollback')
+        elif status == psycopg2.extensions.TRANSACTION_STATUS_INTRANS:
+            cursor.execute('commit')
+
+def fetch(query, batchSize = None, params = None):
+    #
+    # generator of (column names, [tuple]) of query, batchSize rows at a time,
+    # through a server-side cursor; or, with params, of the prepared query
+    #
+
+    global cursorCount
+
+    if batchSize is None:
+        batchSize = BATCHSIZE
+
+    if connection() is None:
+        for names, rows in fetchSql(query, params, batchSize):
+            yield names, rows
+        return
+
+    if params is not None:
+        for names, rows in fetchPrepared(query, params, batchSize):
+            yield names, rows
+        return
+
+    cursorCount = cursorCount + 1
+    name = 'reportdb_%s' % (cursorCount)
+
+    # the shared connection is in autocommit mode: the cursor lives in a
+    # transaction of our own (see stream() above)
+    cursor = connection().cursor()
+    beginStream(cursor)
+
+    try:
+        cursor.execute('declare %s no scroll cursor with hold for %s' % (name, query))
+        names = None
+        while True:
+            cursor.execute('fetch forward %d from %s' % (batchSize, name))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            if names is None:
+                names = columnNames(query, cursor.description)
+            yield names, rows
+    finally:
+        endStream(cursor, name)
+        cursor.close()
+
+def stream(query, batchSize = None, params = None):
+    #
+    # generator of the rows (Row) of query
+    #
+
+    for names, rows in fetch(query, batchSize, params):
+        for row in rows:
+            yield Row(zip(names, row))
+
+def rows(query, params = None):
+    #
+    # the rows (TupleRow) of query
+    #
+
+    results = []
+    for names, batch in fetch(query, params = params):
+        rowClass = rowType(names)
+        results.extend(map(rowClass, batch))
+    return results
+
+def getter(names, column):
+    #
+    # function of a result tuple that returns column (a name), or the tuple
+    # of columns (a list/tuple of names), or, if column is None, the TupleRow
+    #
+
+    if column is None:
+        return rowType(names)
+
+    positions = {}
+    for i, name in enumerate(names):
+        positions[name.lower()] = i
+
+    if isinstance(column, str):
+        return operator.itemgetter(positions[column.lower()])
+
+    return operator.itemgetter(*[positions[c.lower()] for c in column])
+
+def listLookup(query, key, value = None, params = None):
+    #
+    # {key : [value]} of the rows of query
+    # key/value: a column, or a list/tuple of columns; value None: the TupleRow
+    #
+
+    lookup = {}
+    keyOf = None
+    for names, batch in fetch(query, params = params):
+        if keyOf is None:
+            keyOf = getter(names, key)
+            valueOf = getter(names, value)
+        for row in batch:
+            k = keyOf(row)
+            if k not in lookup:
+                lookup[k] = []
+            lookup[k].append(valueOf(row))
+    return lookup
+
+def valueLookup(query, key, value = None, params = None):
+    #
+    # {key : value} of the rows of query; the last row of a key wins
+    # key/value: a column, or a list/tuple of columns; value None: the TupleRow
+    #
+
+    lookup = {}
+    keyOf = None
+    for names, batch in fetch(query, params = params):
+        if keyOf is None:
+            keyOf = getter(names, key)
+            valueOf = getter(names, value)
+        for row in batch:
+            lookup[keyOf(row)] = valueOf(row)
+    return lookup
+
+# 1: export() checks its output against the Python writer (see check())
+CHECK = int(os.environ.get('REPORTEXPORTCHECK', 0) or 0)
+
+def check(query, written):
+    #
+    # raise ValueError unless "written" (the rows of COPY) is, byte for byte,
+    # fp.write(TAB.join(values) + CRT) of the rows of query, with '' for NULL
+    # (the rows of a query without "order by" may come in another order)
+    #
+
+    expected = []
+    for names, batch in fetch(query):
+        for row in batch:
+            expected.append('\t'.join(['' if v is None else str(v) for v in row]) + '\n')
+
+    if written == expected or sorted(written) == sorted(expected):
+        return
+
+    for i in range(max(len(written), len(expected))):
+        copyRow = written[i] if i < len(written) else None
+        pythonRow = expected[i] if i < len(expected) else None
+        if copyRow != pythonRow:
+            raise ValueError('export: row %d differs from the Python writer\n  copy:   %r\n  python: %r\n  query: %s' % \
+                (i + 1, copyRow, pythonRow, query))
+
+def export(fp, query):
+    #
+    # write the rows of query to fp, TAB-separated, one per line, with COPY
+    # returns the number of rows
+    #
+
+    if connection() is None:
+        count = 0
+        for names, batch in fetch(query):
+            for row in batch:
+                fp.write('\t'.join(['' if v is None else str(v) for v in row]) + '\n')
+            count = count + len(batch)
+        return count
+
+    if CHECK:
+        collector = copyrows.RowCollector()
+        writer = copyrows.RowWriter(collector)
+    else:
+        writer = copyrows.RowWriter(fp)
+
+    cursor = connection().cursor()
+    # csv format: no backslash escapes; the QUOTEs it adds (around '' and
+    # around values holding a TAB or CRT) are removed by copyrows.RowWriter
+    cursor.copy_expert('''copy (%s) to stdout with (format csv, delimiter E'\\t', quote E'\\x01', null '')''' % (query), writer)
+    writer.finish()
+    count = cursor.rowcount
+    cursor.close()
+
+    if CHECK:
+        check(query, collector.rows)
+        for row in collector.rows:
+            fp.write(row)
+
+    return count
@@ -0,0 +1,136 @@
+'''
+#
+# reportprofile.py
+#
+# Profile a report while it runs, without editing it.
+#
+# Modes (${REPORTPROFILE}, lib/reportrunner.py -p, lib/reportbootstrap.py -p):
+#
+#       sample          a thread samples the report's Python stack every
+#                       ${REPORTPROFILEINTERVAL} seconds (default 0.005);
+#                       low overhead, wall clock (time spent waiting for
+#                       the database shows up under the line that waits)
+#
+#       cprofile        cProfile (every call, more overhead) and the sampler
+#
+# Files, next to the report log:
+#
+#       <report>.prof           cprofile: pstats file
+#                               (python -m pstats <report>.prof, snakeviz, ...)
+#       <report>.collapsed      the sampled stacks in the "collapsed" format of
+#                               flamegraph.pl/speedscope: one line per stack,
+#                               "file:function;file:function;... count"
+#
+# Python:
+#       import reportprofile
+#
+#       profiler = reportprofile.Profiler('cprofile')
+#       profiler.start()
+#       ...
+#       profiler.stop('/logs/weekly/MGI_iphone_app.py')  # writes .prof/.collapsed
+#
+'''
+
+import sys
+import os
+import threading
+import cProfile
+
+MODES = ('sample', 'cprofile')
+
+# seconds between samples
+INTERVAL = float(os.environ.get('REPORTPROFILEINTERVAL', 0.005))
+
+def frameName(frame):
+    code = frame.f_code
+    return '%s:%s' % (os.path.basename(code.co_filename), code.co_name)
+
+class Sampler(threading.Thread):
+    #
+    # samples the stack of thread "threadId" every "interval" seconds,
+    # up to (not including) frame "base"
+    #
+
+    def __init__(self, threadId, base = None, interval = None):
+        threading.Thread.__init__(self, name = 'reportprofile')
+        self.daemon = True
+        self.threadId = threadId
+        self.base = base
+        self.interval = interval or INTERVAL
+        self.stopped = threading.Event()
+
+        # {stack (root first) : samples}
+        self.stacks = {}
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.threadId)
+            stack = []
+            while frame is not None and frame is not self.base:
+                stack.append(frameName(frame))
+                frame = frame.f_back
+            if stack:
+                stack = ';'.join(reversed(stack))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write(self, fileName):
+        fp = open(fileName, 'w')
+        for stack in sorted(self.stacks):
+            fp.write('%s %d\n' % (stack, self.stacks[stack]))
+        fp.close()
+
+class Profiler:
+    #
+    # profiles the calling thread from start() to stop(); the sampled stacks
+    # start below the function that called start()
+    #
+
+    def __init__(self, mode):
+        if mode not in MODES:
+            raise ValueError('unknown profile mode: %s (%s)' % (mode, ', '.join(MODES)))
+        self.mode = mode
+        self.sampler = None
+        self.profile = None
+
+    def start(self):
+        self.sampler = Sampler(threading.get_ident(), sys._getframe(1))
+        self.sampler.start()
+        if self.mode == 'cprofile':
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self, prefix):
+        #
+        # stop profiling; write prefix.prof/prefix.collapsed
+        # returns the files written
+        #
+
+        files = []
+
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(prefix + '.prof')
+            files.append(prefix + '.prof')
+            self.profile = None
+
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler.write(prefix + '.collapsed')
+            files.append(prefix + '.collapsed')
+            self.sampler = None
+
+        return files
+
+def mode():
+    #
+    # the profile mode of ${REPORTPROFILE}, or None
+    #
+
+    value = os.environ.get('REPORTPROFILE', '')
+    if value in ('', '0'):
+        return None
+    return value
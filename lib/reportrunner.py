@@ -0,0 +1,514 @@
+'''
+#
+# reportrunner.py
+#
+# Run a directory of public report scripts (weekly/, daily/) on a
+# bounded pool of processes, honoring a declared dependency graph.
+#
+# Replaces the serial "foreach i (*.py)" loop of run_weekly.csh/run_daily.csh.
+#
+# Usage:
+#       reportrunner.py -d directory [-g graph file] [-j jobs] [-l log directory] [-i] [-q]
+#               [-p mode]
+#
+#       -d      directory of report scripts; every *.py is a report
+#       -g      dependency graph file (see below)
+#       -j      maximum number of tasks run at the same time
+#               (default: ${REPORTJOBS}, else 4)
+#       -l      directory of the per-task log files
+#               (default: ${REPORTLOGSDIR}/<basename of directory>)
+#       -i      run the reports in-process (see below) instead of one
+#               ${PYTHON} process per report
+#       -q      trace every query of every report (lib/querytrace.py)
+#               (default: off; on if ${REPORTQUERYTRACE} is 1)
+#       -p      profile every report: sample or cprofile (lib/reportprofile.py);
+#               <report>.prof/<report>.collapsed are written to the log directory
+#               (default: ${REPORTPROFILE})
+#
+# Graph file:
+#
+#       # comment
+#       name = shell command
+#               declares a non-report step (run by /bin/sh, environment expanded)
+#
+#       target : prerequisite prerequisite ...
+#               target may not start until every prerequisite has finished
+#               target/prerequisite is a report (MRK_List.py) or a step name;
+#               "*" stands for every report in the directory
+#
+# Each task writes stdout/stderr to its own <task>.log in the log directory;
+# the runner itself only writes one start/end/status line per task to stdout.
+#
+# Telemetry:
+#
+#       the end line of a task gives its wall/CPU time, peak RSS and the
+#       size of the files it wrote, and their line count if they are
+#       small and uncompressed (lib/reporttelemetry.py).
+#       Every run is appended to ${REPORTHISTORY}, and reports whose time
+#       or memory jumped compared to their earlier runs are logged.
+#       Reports run through lib/reportbootstrap.py, which installs the hooks.
+#
+# In-process mode (-i):
+#
+#       "jobs" long-lived worker processes import db/reportlib/mgi_utils once
+#       and run the reports as modules (sys.argv[0] is set to the script name,
+#       as if it were run by ${PYTHON}), saving the interpreter start and the
+#       imports of every report.  db is not changed: a report opens and
+#       closes its session as it does stand-alone.
+#
+#       After each report its own temp tables are dropped (the shared_ ones,
+#       lib/reportcontext.py, are kept) in case it left its session open,
+#       so that the next report may create tables of the same name; after a
+#       failed report the session is closed.
+#       Steps declared in the graph file are still run by /bin/sh.
+#
+# Query trace (-q):
+#
+#       the queries of each report are written to <report>.queries.jsonl in
+#       the log directory, and the ${REPORTQUERYTOP} slowest queries of the
+#       run are logged at the end.
+#
+# A task whose prerequisite failed is not run (status "skipped").
+#
+# Exit Codes:
+#       0:  all tasks completed successfully
+#       1:  one or more tasks failed or were skipped
+#
+'''
+
+import sys
+import os
+import getopt
+import glob
+import subprocess
+import time
+import json
+import traceback
+import importlib.util
+import concurrent.futures
+import reporttelemetry
+import reportprofile
+
+ALL = '*'
+
+# trace the queries of the reports (-q)
+queryTrace = 0
+
+# profile the reports (-p): None, or a lib/reportprofile.py mode
+profileMode = None
+
+class Task:
+    # a report script or a declared shell step
+
+    def __init__(self, name, command, cwd):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.requires = set()
+        self.status = None
+        self.telemetry = None
+
+    def isReport(self):
+        return self.name.endswith('.py')
+
+def discover(directory):
+    #
+    # every *.py in directory is a report, in glob order
+    #
+
+    return sorted([os.path.basename(f) for f in glob.glob(os.path.join(directory, '*.py'))])
+
+def readGraph(graphFile, directory, reports):
+    #
+    # read the graph file; return {name : Task} for every report and step
+    #
+
+    python = os.environ.get('PYTHON', sys.executable)
+
+    tasks = {}
+    for r in reports:
+        tasks[r] = Task(r, [python, r], directory)
+
+    if graphFile is None:
+        return tasks
+
+    edges = []
+    fp = open(graphFile, 'r')
+    for line in fp.readlines():
+        line = line.strip()
+        if line == '' or line[0] == '#':
+            continue
+
+        if '=' in line and (':' not in line or line.find('=') < line.find(':')):
+            name, command = line.split('=', 1)
+            name = name.strip()
+            tasks[name] = Task(name, os.path.expandvars(command.strip()), directory)
+        elif ':' in line:
+            target, requires = line.split(':', 1)
+            edges.append((target.strip(), requires.split()))
+        else:
+            raise ValueError('%s: cannot parse line: %s' % (graphFile, line))
+    fp.close()
+
+    for target, requires in edges:
+
+        if target == ALL:
+            targets = reports
+        else:
+            targets = [target]
+
+        for t in targets:
+            if t not in tasks:
+                raise ValueError('%s: unknown task: %s' % (graphFile, t))
+            for r in requires:
+                if r == ALL:
+                    tasks[t].requires.update([x for x in reports if x != t])
+                elif r not in tasks:
+                    raise ValueError('%s: unknown task: %s' % (graphFile, r))
+                elif r != t:
+                    tasks[t].requires.add(r)
+
+    checkCycles(tasks)
+
+    return tasks
+
+def checkCycles(tasks):
+    #
+    # raise ValueError if the graph is not a DAG
+    #
+
+    state = {}
+
+    def visit(name, path):
+        if state.get(name) == 1:
+            raise ValueError('dependency cycle: %s' % (' -> '.join(path + [name])))
+        if state.get(name) == 2:
+            return
+        state[name] = 1
+        for r in sorted(tasks[name].requires):
+            visit(r, path + [name])
+        state[name] = 2
+
+    for name in tasks:
+        visit(name, [])
+
+def traceFile(logDir, name):
+    return os.path.join(logDir, name + '.queries.jsonl')
+
+def runTask(task, logDir):
+    #
+    # run one task; its output goes to logDir/<task>.log
+    # returns (name, exit status, seconds, telemetry)
+    #
+
+    startTime = time.time()
+    fp = open(os.path.join(logDir, task.name + '.log'), 'w')
+    fp.write('%s: Start %s\n' % (time.ctime(startTime), task.name))
+    fp.flush()
+
+    outputsFile = os.path.join(logDir, task.name + '.outputs')
+
+    if task.isReport():
+        bootstrap = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reportbootstrap.py')
+        command = [task.command[0], bootstrap, '-o', outputsFile]
+        if queryTrace:
+            command = command + ['-q', traceFile(logDir, task.name)]
+        if profileMode:
+            command = command + ['-p', profileMode, '-l', logDir]
+        process = subprocess.Popen(command + task.command[1:], cwd = task.cwd, stdout = fp, stderr = subprocess.STDOUT)
+    else:
+        process = subprocess.Popen(task.command, shell = True, cwd = task.cwd, stdout = fp, stderr = subprocess.STDOUT)
+
+    # wait4: the resource use of the task (and of its own children)
+    pid, waitStatus, usage = os.wait4(process.pid, 0)
+    status = process.returncode = os.waitstatus_to_exitcode(waitStatus)
+
+    endTime = time.time()
+    fp.write('%s: End %s (status %s)\n' % (time.ctime(endTime), task.name, status))
+    fp.close()
+
+    outputs = []
+    if os.path.exists(outputsFile):
+        ofp = open(outputsFile, 'r')
+        outputs = json.load(ofp)
+        ofp.close()
+        os.remove(outputsFile)
+
+    telemetry = reporttelemetry.record(task.name, status, endTime - startTime,
+        usage.ru_utime + usage.ru_stime, usage.ru_maxrss, outputs)
+
+    return (task.name, status, endTime - startTime, telemetry)
+
+#
+# in-process workers
+#
+
+def workerInit():
+    #
+    # runs once in each worker process: import the report libraries
+    #
+
+    import db
+    import reportlib
+    import mgi_utils
+
+    reporttelemetry.install()
+
+def dropTempTables():
+    #
+    # drop the temp tables the last report left in the session,
+    # keeping the shared ones (lib/reportcontext.py)
+    #
+
+    import db
+    import reportcontext
+
+    results = db.sql('''
+        select c.relname
+        from pg_class c
+        where c.relnamespace = pg_my_temp_schema()
+        and c.relkind = 'r'
+        ''', 'auto')
+    for r in results:
+        if not r['relname'].startswith(reportcontext.SHARED_PREFIX.lower()):
+            db.sql('drop table if exists %s' % (r['relname']), None)
+
+def workerRun(name, cwd, logDir, trace = 0, profile = None):
+    #
+    # run report "name" inside this worker process
+    # trace: trace its queries (lib/querytrace.py)
+    # profile: profile it (a lib/reportprofile.py mode)
+    # returns (name, exit status, seconds, telemetry)
+    #
+
+    import db
+    import querytrace
+
+    startTime = time.time()
+    fp = open(os.path.join(logDir, name + '.log'), 'w')
+    fp.write('%s: Start %s (in-process, pid %s)\n' % (time.ctime(startTime), name, os.getpid()))
+    fp.flush()
+
+    savedStdout, savedStderr, savedArgv = sys.stdout, sys.stderr, sys.argv
+    sys.stdout = sys.stderr = fp
+    sys.argv = [name]
+    os.chdir(cwd)
+
+    reporttelemetry.reset()
+    reporttelemetry.resetPeakRss()
+    startCpu = reporttelemetry.cpuSeconds()
+
+    if trace:
+        querytrace.install()
+        querytrace.start(traceFile(logDir, name), name)
+
+    if profile:
+        profiler = reportprofile.Profiler(profile)
+        profiler.start()
+
+    status = 0
+    try:
+        spec = importlib.util.spec_from_file_location('report_' + name[:-3], os.path.join(cwd, name))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            status = 1
+    except Exception:
+        traceback.print_exc()
+        status = 1
+
+    querytrace.stop()
+
+    if profile:
+        profiler.stop(os.path.join(logDir, name))
+
+    cpu = reporttelemetry.cpuSeconds() - startCpu
+    maxrss = reporttelemetry.peakRss()
+    outputs = list(reporttelemetry.outputs)
+
+    try:
+        if status == 0:
+            dropTempTables()
+        else:
+            # the next report starts with a new session
+            db.useOneConnection(0)
+    except Exception:
+        traceback.print_exc()
+
+    sys.stdout.flush()
+    sys.stdout, sys.stderr, sys.argv = savedStdout, savedStderr, savedArgv
+
+    endTime = time.time()
+    fp.write('%s: End %s (status %s)\n' % (time.ctime(endTime), name, status))
+    fp.close()
+
+    telemetry = reporttelemetry.record(name, status, endTime - startTime, cpu, maxrss, outputs)
+
+    return (name, status, endTime - startTime, telemetry)
+
+def inProcess(jobs):
+    #
+    # returns (worker pool, runTask function for run())
+    #
+
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers = jobs, initializer = workerInit)
+
+    def runInProcess(task, logDir):
+        if task.isReport():
+            return pool.submit(workerRun, task.name, task.cwd, logDir, queryTrace, profileMode).result()
+        return runTask(task, logDir)
+
+    return pool, runInProcess
+
+def log(message):
+    print('%s: %s' % (time.ctime(), message))
+    sys.stdout.flush()
+
+def run(tasks, jobs, logDir, runTask = runTask):
+    #
+    # run tasks on at most "jobs" workers, each as soon as all of its
+    # prerequisites have completed successfully
+    # returns the number of tasks that failed or were skipped
+    #
+
+    if not os.path.isdir(logDir):
+        os.makedirs(logDir)
+
+    waiting = dict(tasks)
+    running = {}
+
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers = jobs)
+
+    while waiting or running:
+
+        # skip anything downstream of a failure
+        changed = 1
+        while changed:
+            changed = 0
+            for name in list(waiting):
+                task = waiting[name]
+                failed = [r for r in task.requires if tasks[r].status not in (None, 0)]
+                if failed:
+                    task.status = 'skipped'
+                    del waiting[name]
+                    log('%s skipped (failed: %s)' % (name, ', '.join(sorted(failed))))
+                    changed = 1
+
+        # submit everything whose prerequisites are done, in name order
+        for name in sorted(waiting):
+            task = waiting[name]
+            if all(tasks[r].status == 0 for r in task.requires):
+                del waiting[name]
+                log('%s' % (name))
+                running[pool.submit(runTask, task, logDir)] = task
+
+        if not running:
+            break
+
+        done, notDone = concurrent.futures.wait(running, return_when = concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            task = running.pop(future)
+            try:
+                name, status, seconds, task.telemetry = future.result()
+                log('%s done (%s)' % (task.name, reporttelemetry.describe(task.telemetry)))
+            except Exception as e:
+                status, seconds = str(e), 0
+                log('%s done (status %s, %.1f seconds)' % (task.name, status, seconds))
+            task.status = status
+
+    pool.shutdown()
+
+    return len([t for t in tasks.values() if t.status != 0])
+
+def traceSummary(tasks, logDir):
+    #
+    # log the slowest queries of the reports' trace files
+    #
+
+    import querytrace
+
+    fileNames = []
+    for name in sorted(tasks):
+        if tasks[name].isReport() and os.path.exists(traceFile(logDir, name)):
+            fileNames.append(traceFile(logDir, name))
+
+    for line in querytrace.summary(fileNames):
+        log(line)
+
+def history(tasks, directory, runTime):
+    #
+    # append the telemetry of the run to the history file and
+    # log the reports that regressed
+    #
+
+    historyFile = reporttelemetry.defaultFile()
+    records = [tasks[name].telemetry for name in sorted(tasks) if tasks[name].telemetry is not None]
+    directory = os.path.basename(directory)
+
+    for line in reporttelemetry.regressions(reporttelemetry.read(historyFile), directory, records):
+        log('regression %s' % (line))
+
+    reporttelemetry.append(historyFile, runTime, directory, records)
+
+def main():
+
+    global queryTrace, profileMode
+
+    directory = None
+    graphFile = None
+    jobs = int(os.environ.get('REPORTJOBS', 4))
+    logDir = None
+    inprocess = 0
+    queryTrace = int(os.environ.get('REPORTQUERYTRACE', 0) or 0)
+    profileMode = reportprofile.mode()
+
+    try:
+        optlist, args = getopt.getopt(sys.argv[1:], 'd:g:j:l:iqp:')
+    except getopt.GetoptError as e:
+        sys.stderr.write('%s\n%s\n' % (e, __doc__))
+        sys.exit(1)
+
+    for opt, arg in optlist:
+        if opt == '-d':
+            directory = os.path.abspath(arg)
+        elif opt == '-g':
+            graphFile = arg
+        elif opt == '-j':
+            jobs = int(arg)
+        elif opt == '-l':
+            logDir = os.path.abspath(arg)
+        elif opt == '-i':
+            inprocess = 1
+        elif opt == '-q':
+            queryTrace = 1
+        elif opt == '-p':
+            profileMode = arg
+
+    if directory is None or (profileMode and profileMode not in reportprofile.MODES):
+        sys.stderr.write(__doc__)
+        sys.exit(1)
+
+    if logDir is None:
+        logDir = os.path.join(os.environ['REPORTLOGSDIR'], os.path.basename(directory))
+
+    tasks = readGraph(graphFile, directory, discover(directory))
+
+    runTime = time.time()
+    log('Start %s (%d tasks, %d jobs, logs in %s)' % (directory, len(tasks), jobs, logDir))
+    if inprocess:
+        pool, runInProcess = inProcess(jobs)
+        failures = run(tasks, jobs, logDir, runInProcess)
+        pool.shutdown()
+    else:
+        failures = run(tasks, jobs, logDir)
+    if queryTrace:
+        traceSummary(tasks, logDir)
+    history(tasks, directory, runTime)
+    log('End %s (%d failed/skipped)' % (directory, failures))
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+'''
+#
+# reporttelemetry.py
+#
+# Resource use of the reports run by lib/reportrunner.py, kept across runs.
+#
+# For every task the runner records:
+#
+#       seconds         wall time
+#       cpu             user + system CPU seconds (the report and its children)
+#       maxrss          peak resident set size, KB
+#       outputs         the files the report opened with reportlib.init()
+#       bytes, lines    their total size (os.stat), and their number of
+#                       lines: counted only if every output is uncompressed
+#                       and at most ${REPORTLINECOUNTMAX} bytes, else None
+#       status          exit status
+#
+# Each run appends one JSON line per task to the history file
+# (${REPORTHISTORY}), and is checked against it: a report whose wall time
+# or peak RSS is more than ${REPORTREGRESSIONFACTOR} times the median of its
+# last ${REPORTHISTORYWINDOW} successful runs is logged as a regression.
+#
+# Usage:
+#       reporttelemetry.py [-f history file] [-n N]
+#               print the last N (default 1) runs of every report in the
+#               history and the regressions of the last run
+#
+'''
+
+import sys
+import os
+import json
+import time
+import getopt
+import resource
+
+# a report is flagged if its time/memory is more than FACTOR times its median
+FACTOR = float(os.environ.get('REPORTREGRESSIONFACTOR', 1.5))
+
+# successful runs the median is taken over; fewer than MINRUNS: no check
+WINDOW = int(os.environ.get('REPORTHISTORYWINDOW', 10))
+MINRUNS = 3
+
+# reports faster than this (median) are not checked for time
+MINSECONDS = 10
+
+# outputs larger than this (bytes) are not read to count their lines
+LINECOUNTMAX = int(os.environ.get('REPORTLINECOUNTMAX', 16 << 20))
+
+# the files opened by reportlib.init() since reset()
+outputs = []
+
+def defaultFile():
+    if 'REPORTHISTORY' in os.environ:
+        return os.environ['REPORTHISTORY']
+    return os.path.join(os.environ['REPORTLOGSDIR'], 'reporthistory.jsonl')
+
+def install():
+    #
+    # remember the file of every reportlib.init() in this process
+    #
+
+    import reportlib
+
+    if getattr(reportlib.init, 'telemetry', 0):
+        return
+
+    init = reportlib.init
+
+    def trackedInit(*args, **kwargs):
+        fp = init(*args, **kwargs)
+        name = getattr(fp, 'name', None)
+        if isinstance(name, str) and os.path.abspath(name) not in outputs:
+            outputs.append(os.path.abspath(name))
+        return fp
+
+    trackedInit.telemetry = 1
+    reportlib.init = trackedInit
+
+def reset():
+    del outputs[:]
+
+def outputStats(fileNames):
+    #
+    # (bytes, lines) of the files; lines is None unless every file is
+    # uncompressed and at most LINECOUNTMAX bytes (no output is read
+    # back or decompressed to count it)
+    #
+
+    size = 0
+    counted = []
+    for fileName in fileNames:
+        try:
+            fileSize = os.stat(fileName).st_size
+        except OSError:
+            continue
+        size = size + fileSize
+        if counted is not None:
+            if fileName.endswith('.gz') or fileSize > LINECOUNTMAX:
+                counted = None
+            else:
+                counted.append(fileName)
+
+    if counted is None:
+        return size, None
+
+    lines = 0
+    for fileName in counted:
+        fp = open(fileName, 'rb')
+        while True:
+            block = fp.read(1 << 20)
+            if not block:
+                break
+            lines = lines + block.count(b'\n')
+        fp.close()
+
+    return size, lines
+
+def cpuSeconds():
+    #
+    # CPU seconds used so far by this process and its waited-for children
+    #
+
+    me = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return me.ru_utime + me.ru_stime + children.ru_utime + children.ru_stime
+
+def resetPeakRss():
+    #
+    # start a new peak RSS for this process (Linux); 0 if it cannot
+    #
+
+    try:
+        fp = open('/proc/self/clear_refs', 'w')
+        fp.write('5')
+        fp.close()
+        return 1
+    except (IOError, OSError):
+        return 0
+
+def peakRss():
+    #
+    # peak RSS of this process, KB: since resetPeakRss() if that worked,
+    # else since the process started
+    #
+
+    try:
+        fp = open('/proc/self/status', 'r')
+        for line in fp:
+            if line.startswith('VmHWM:'):
+                fp.close()
+                return int(line.split()[1])
+        fp.close()
+    except (IOError, OSError):
+        pass
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def record(name, status, seconds, cpu, maxrss, fileNames):
+    #
+    # the telemetry of one task
+    #
+
+    size, lines = outputStats(fileNames)
+
+    return {
+        'task' : name,
+        'status' : status,
+        'seconds' : round(seconds, 3),
+        'cpu' : round(cpu, 3),
+        'maxrss' : maxrss,
+        'outputs' : fileNames,
+        'bytes' : size,
+        'lines' : lines,
+    }
+
+def describe(r):
+    #
+    # one line of text
+    #
+
+    text = 'status %s, %.1f seconds, cpu %.1f, rss %.0f MB, %d files, %d bytes' % \
+        (r['status'], r['seconds'], r['cpu'], r['maxrss'] / 1024.0, len(r['outputs']), r['bytes'])
+    if r.get('lines') is not None:
+        text = text + ', %d lines' % (r['lines'])
+    return text
+
+def append(fileName, run, directory, records):
+    #
+    # append the records of a run to the history file
+    #
+
+    fp = open(fileName, 'a')
+    for r in records:
+        entry = dict(r)
+        entry['run'] = run
+        entry['directory'] = directory
+        fp.write(json.dumps(entry) + '\n')
+    fp.close()
+
+def read(fileName):
+    #
+    # the entries of the history file, oldest first
+    #
+
+    entries = []
+
+    if not os.path.exists(fileName):
+        return entries
+
+    fp = open(fileName, 'r')
+    for line in fp:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    fp.close()
+
+    return entries
+
+def median(values):
+    values = sorted(values)
+    n = len(values)
+    if n % 2:
+        return values[n // 2]
+    return (values[n // 2 - 1] + values[n // 2]) / 2.0
+
+def regressions(history, directory, records, factor = None, window = None):
+    #
+    # lines of text, one per record whose time or peak RSS is more than
+    # factor times the median of the task's last "window" successful runs
+    # in history (entries of earlier runs)
+    #
+
+    if factor is None:
+        factor = FACTOR
+    if window is None:
+        window = WINDOW
+
+    previous = {}
+    for e in history:
+        if e.get('directory') != directory or e.get('status') != 0:
+            continue
+        if e['task'] not in previous:
+            previous[e['task']] = []
+        previous[e['task']].append(e)
+
+    lines = []
+    for r in records:
+        if r['status'] != 0:
+            continue
+        runs = previous.get(r['task'], [])[-window:]
+        if len(runs) < MINRUNS:
+            continue
+
+        seconds = median([e['seconds'] for e in runs])
+        if seconds >= MINSECONDS and r['seconds'] > factor * seconds:
+            lines.append('%s: %.1f seconds, median %.1f (x%.1f)' % (r['task'], r['seconds'], seconds, r['seconds'] / seconds))
+
+        maxrss = median([e['maxrss'] for e in runs])
+        if maxrss and r['maxrss'] > factor * maxrss:
+            lines.append('%s: rss %.0f MB, median %.0f MB (x%.1f)' % (r['task'], r['maxrss'] / 1024.0, maxrss / 1024.0, r['maxrss'] / float(maxrss)))
+
+    return lines
+
+def main():
+
+    fileName = None
+    last = 1
+
+    try:
+        optlist, args = getopt.getopt(sys.argv[1:], 'f:n:')
+    except getopt.GetoptError as e:
+        sys.stderr.write('%s\n%s\n' % (e, __doc__))
+        sys.exit(1)
+
+    for opt, arg in optlist:
+        if opt == '-f':
+            fileName = arg
+        elif opt == '-n':
+            last = int(arg)
+
+    if fileName is None:
+        fileName = defaultFile()
+
+    history = read(fileName)
+
+    # runs, in order, by directory
+    runs = {}
+    for e in history:
+        key = e['directory']
+        if key not in runs:
+            runs[key] = []
+        if e['run'] not in runs[key]:
+            runs[key].append(e['run'])
+
+    for directory in sorted(runs):
+        for run in runs[directory][-last:]:
+            print('%s %s' % (directory, time.ctime(run)))
+            for e in history:
+                if e['directory'] == directory and e['run'] == run:
+                    print('    %s: %s' % (e['task'], describe(e)))
+
+        run = runs[directory][-1]
+        earlier = [e for e in history if e['directory'] != directory or e['run'] < run]
+        latest = [e for e in history if e['directory'] == directory and e['run'] == run]
+        for line in regressions(earlier, directory, latest):
+            print('    regression %s' % (line))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+'''
+#
+# test_copyrows.py
+#
+# copyrows.RowWriter turns the output of COPY (format csv, quote \x01,
+# null '') into the bytes fp.write(TAB.join(...) + CRT) writes for the same
+# rows, one complete row per write(), however COPY splits its output.
+# No database is needed.
+#
+# Usage:
+#       python -m unittest lib/test_copyrows.py
+#
+'''
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import copyrows
+
+# COPY's output for the rows
+#       (-6, ',', ' trailing '), (1, 'plain', 'x'), (2, null, ''),
+#       (3, 'tab<TAB>in', 'line<CRT>break'), (4, 'back\slash', '\.'),
+#       (5, '"quoted"', 'Pax6é'), (7, 'cr<CR>here', null)
+COPY = '-6\t,\t trailing \n' + \
+        '1\tplain\tx\n' + \
+        '2\t\t\x01\x01\n' + \
+        '3\t\x01tab\tin\x01\t\x01line\nbreak\x01\n' + \
+        '4\tback\\slash\t\\.\n' + \
+        '5\t"quoted"\tPax6\xe9\n' + \
+        '7\t\x01cr\rhere\x01\t\n'
+
+# fp.write(TAB.join(...) + CRT) of the same rows, with '' for NULL
+ROWS = [
+        b'-6\t,\t trailing \n',
+        b'1\tplain\tx\n',
+        b'2\t\t\n',
+        b'3\ttab\tin\tline\nbreak\n',
+        b'4\tback\\slash\t\\.\n',
+        b'5\t"quoted"\tPax6\xc3\xa9\n',
+        b'7\tcr\rhere\t\n',
+        ]
+
+class Rows:
+    # the write() calls
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, s):
+        self.writes.append(s)
+
+class RowWriterTest(unittest.TestCase):
+
+    def rows(self, chunks):
+        rows = Rows()
+        writer = copyrows.RowWriter(rows)
+        for chunk in chunks:
+            writer.write(chunk)
+        writer.finish()
+        return [row.encode('utf-8') for row in rows.writes]
+
+    def test_rows(self):
+        self.assertEqual(self.rows([COPY]), ROWS)
+
+    def test_chunks(self):
+        # COPY's chunks may end anywhere, also between the two quotes of ''
+        for i in range(1, len(COPY)):
+            self.assertEqual(self.rows([COPY[:i], COPY[i:]]), ROWS)
+        self.assertEqual(self.rows(list(COPY)), ROWS)
+
+    def test_unterminated(self):
+        # a last row without its CRT is written as it is, by finish()
+        self.assertEqual(self.rows(['a\t\x01\x01\n', 'b\t\x01c\td\x01']), [b'a\t\n', b'b\tc\td'])
+        self.assertEqual(self.rows([]), [])
+
+    def test_collector(self):
+        collector = copyrows.RowCollector()
+        writer = copyrows.RowWriter(collector)
+        writer.write(COPY)
+        writer.finish()
+        self.assertEqual([row.encode('utf-8') for row in collector.rows], ROWS)
+
+if __name__ == '__main__':
+    unittest.main()
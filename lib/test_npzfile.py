@@ -0,0 +1,100 @@
+'''
+#
+# test_npzfile.py
+#
+# The files of lib/npzfile.py load with numpy.load() and give back
+# the arrays that were saved.  The numpy checks are skipped where numpy
+# is not installed.
+#
+# Usage:
+#       python -m unittest lib/test_npzfile.py
+#
+'''
+
+import os
+import sys
+import array
+import zipfile
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import npzfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class NpyHeaderTest(unittest.TestCase):
+
+    def test_header(self):
+        data = npzfile.npy(*npzfile.intArray([1, 2, 3]))
+        self.assertEqual(data[:8], npzfile.MAGIC)
+        headerLength = int.from_bytes(data[8:10], 'little')
+        self.assertEqual((10 + headerLength) % 64, 0)
+        self.assertEqual(data[10 + headerLength - 1:10 + headerLength], b'\n')
+        self.assertEqual(len(data), 10 + headerLength + 3 * 4)
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class NumpyLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.fileName = tempfile.mkstemp(suffix = '.npz')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.fileName)
+
+    def test_roundtrip(self):
+        markers = [101, 102, 103]
+        samples = [7, 8]
+        values = array.array('f', [0.5, 1.0, float('nan'), 2.25, 1e6, 0.0])
+        levels = array.array('b', [0, 1, -1, 2, 3, 0])
+
+        npzfile.save(self.fileName, {
+            'marker_key' : npzfile.intArray(markers),
+            'marker_symbol' : npzfile.stringArray(['Kit', None, 'Pax6é']),
+            'avg_TPM' : npzfile.floatArray(values, (len(markers), len(samples))),
+            'tpm_level' : ('|i1', (len(markers), len(samples)), levels.tobytes()),
+        })
+
+        self.assertEqual(sorted(zipfile.ZipFile(self.fileName).namelist()),
+            ['avg_TPM.npy', 'marker_key.npy', 'marker_symbol.npy', 'tpm_level.npy'])
+
+        loaded = numpy.load(self.fileName)
+
+        self.assertEqual(loaded['marker_key'].dtype, numpy.dtype('<i4'))
+        self.assertEqual(loaded['marker_key'].tolist(), markers)
+
+        self.assertEqual(loaded['marker_symbol'].dtype, numpy.dtype('<U5'))
+        self.assertEqual(loaded['marker_symbol'].tolist(), ['Kit', '', 'Pax6é'])
+
+        tpm = loaded['avg_TPM']
+        self.assertEqual(tpm.dtype, numpy.dtype('<f4'))
+        self.assertEqual(tpm.shape, (3, 2))
+        self.assertFalse(numpy.isfortran(tpm))
+        expected = numpy.array(values.tolist(), dtype = '<f4').reshape(3, 2)
+        self.assertTrue(numpy.array_equal(tpm, expected, equal_nan = True))
+
+        self.assertEqual(loaded['tpm_level'].dtype, numpy.dtype('i1'))
+        self.assertEqual(loaded['tpm_level'].tolist(), [[0, 1], [-1, 2], [3, 0]])
+
+        loaded.close()
+
+    def test_empty(self):
+        npzfile.save(self.fileName, {
+            'marker_key' : npzfile.intArray([]),
+            'marker_symbol' : npzfile.stringArray([]),
+            'avg_TPM' : npzfile.floatArray([], (0, 4)),
+        })
+
+        loaded = numpy.load(self.fileName)
+        self.assertEqual(loaded['marker_key'].shape, (0,))
+        self.assertEqual(loaded['marker_symbol'].shape, (0,))
+        self.assertEqual(loaded['avg_TPM'].shape, (0, 4))
+        loaded.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+'''
+#
+# test_reportdb.py
+#
+# reportdb.export() writes, byte for byte, what fp.write(TAB.join(...) + CRT)
+# writes, one complete row per write(); a stream survives the commits of
+# the db.sql() calls made while it is read; without the shared session the
+# queries give the same rows through db.sql().  The database checks run
+# against the postgres of ${REPORTDB_TEST_DSN} (e.g. "host=localhost
+# dbname=test") and are skipped without it.
+#
+# Usage:
+#       python -m unittest lib/test_reportdb.py
+#
+'''
+
+import os
+import sys
+import types
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+DSN = os.environ.get('REPORTDB_TEST_DSN')
+
+def sql(cmd, parser = 'auto'):
+    #
+    # db.sql() of the test db module: dict rows on the shared connection;
+    # like pg_db, a command that returns no rows is committed
+    #
+
+    cursor = sys.modules['db'].sharedConnection.cursor()
+    cursor.execute(cmd)
+    results = None
+    if cursor.description is not None:
+        names = [d[0] for d in cursor.description]
+        results = [dict(zip(names, row)) for row in cursor.fetchall()]
+    elif cursor.connection.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INTRANS:
+        cursor.execute('commit')
+    cursor.close()
+    return results
+
+if 'db' not in sys.modules and psycopg2 is not None and DSN:
+    # the shared connection of db, on the test database
+    import psycopg2.extensions
+    db = types.ModuleType('db')
+    db.sharedConnection = psycopg2.connect(DSN)
+    db.sharedConnection.autocommit = True
+    db.useOneConnection = lambda flag: None
+    db.sql = sql
+    sys.modules['db'] = db
+
+# reportdb needs psycopg2 and MGI's db module (or the test database)
+try:
+    import reportdb
+except ImportError:
+    reportdb = None
+
+class Rows:
+    # the write() calls
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, s):
+        self.writes.append(s)
+
+@unittest.skipIf(reportdb is None or not DSN, 'no test database (REPORTDB_TEST_DSN)')
+class ExportTest(unittest.TestCase):
+
+    query = '''
+        select * from (values
+            (1, 'plain', 'x'),
+            (2, null, ''),
+            (3, 'tab\tin', 'line
+break'),
+            (4, 'back\\slash', E'\\\\.'),
+            (5, '"quoted"', 'Pax6é'),
+            (-6, ',', ' trailing ')
+        ) as v(k, a, b)
+        order by k
+        '''
+
+    def setUp(self):
+        reportdb.init()
+
+    def python(self):
+        lines = []
+        for r in reportdb.rows(self.query):
+            lines.append('\t'.join(['' if v is None else str(v) for v in r]) + '\n')
+        return lines
+
+    def test_export(self):
+        rows = Rows()
+        count = reportdb.export(rows, self.query)
+        self.assertEqual(count, 6)
+        self.assertEqual(rows.writes, self.python())
+
+    def test_check(self):
+        reportdb.check(self.query, self.python())
+        self.assertRaises(ValueError, reportdb.check, self.query, self.python()[1:])
+        self.assertRaises(ValueError, reportdb.check, 'select 1, null::text', ['1\tNone\n'])
+
+@unittest.skipIf(reportdb is None or not DSN, 'no test database (REPORTDB_TEST_DSN)')
+class SessionTest(unittest.TestCase):
+
+    query = 'select g as k, g * 2 as twice from generate_series(1, 5000) g order by g'
+
+    def setUp(self):
+        reportdb.init()
+        sql('drop table if exists reportdb_test', None)
+
+    def tearDown(self):
+        reportdb.init()
+
+    def test_commit_inside_stream(self):
+        keys = []
+        for r in reportdb.stream(self.query, batchSize = 100):
+            keys.append(r['k'])
+            if r['k'] == 150:
+                # committed by db.sql(), with the cursor open
+                sql('create temp table reportdb_test as select 1 as x', None)
+                inner = [i['k'] for i in reportdb.stream('select 1 as k union select 2 order by 1')]
+                self.assertEqual(inner, [1, 2])
+        self.assertEqual(keys, list(range(1, 5001)))
+        self.assertEqual(reportdb.connection().get_transaction_status(), psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+        self.assertEqual(sql('select x from reportdb_test'), [{'x' : 1}])
+
+    def test_without_session(self):
+        expected = reportdb.rows(self.query)
+        withParams = reportdb.rows('select %s::text as s, k from (values (1), (2)) v(k) where k = any(%s)',
+            params = ("it's 100%", [2]))
+        exported = Rows()
+        reportdb.export(exported, self.query)
+
+        reportdb.session = None
+        self.assertIsNone(reportdb.connection())
+        self.assertEqual(reportdb.rows(self.query), expected)
+        self.assertEqual([r['twice'] for r in reportdb.stream(self.query, batchSize = 7)], [r.twice for r in expected])
+        self.assertEqual(reportdb.rows('select %s::text as s, k from (values (1), (2)) v(k) where k = any(%s)',
+            params = ("it's 100%", [2])), withParams)
+        fallback = Rows()
+        self.assertEqual(reportdb.export(fallback, self.query), 5000)
+        self.assertEqual(fallback.writes, exported.writes)
+
+if __name__ == '__main__':
+    unittest.main()
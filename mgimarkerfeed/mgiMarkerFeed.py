@@ -71,9 +71,32 @@
 #       49. mgi_relationship_category
 #       50. mgi_relationship_property
 #       51: accession_do.bcp
+#       52. deletions.bcp (--since only)
 #
 # Usage:
-#       mgiMarkerFeed.py
+#       mgiMarkerFeed.py [--sections section,section,...] [--jobs N] [--archive file]
+#               [--since timestamp|last]
+#
+#       --sections      run only the named sections (default: all), e.g.
+#                       --sections strains,genotypes
+#                       sections: vocabs, alleles, markers, strains, genotypes,
+#                       references, humando, mgi_relationship
+#       --jobs          run the sections on N worker processes, each with its
+#                       own connection (default: 1, all sections in sequence)
+#
+#       --archive       write the bcp files as members of the gzip'd tar file
+#                       (e.g. mgimarkerfeed.tar.gz) instead of to OUTPUTDIR
+#
+#       --since         delta feed: write only the rows created or modified at
+#                       or after timestamp ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'),
+#                       plus the rows that were not in the previous delta feed,
+#                       and deletions.bcp; "last" is the start of the last
+#                       complete delta feed (STATEFILE), or, if there is none,
+#                       a full feed that starts the series
+#
+#       every section writes its own bcp files; the temp tables a section
+#       reads (markers, alleles, strains, genotypes) are built by the process
+#       that runs it
 #
 # History:
 #
@@ -175,9 +198,18 @@
  
 import sys
 import os
+import getopt
+import gzip
+import locale
+import functools
+import tarfile
+import tempfile
+import time
+import multiprocessing
 import reportlib
 import mgi_utils
 import db
+import reportdb
 
 db.setTrace()
 
@@ -189,6 +221,25 @@ LINEDELIM = "\n#=#"
 
 OUTPUTDIR = os.environ['REPORTOUTPUTDIR'] + '/mgimarkerfeed/'
 
+#
+# VOC_Term vocabularies exported by vocabs()
+# (_Vocab_key, bcp file)
+#
+VOCABS = [
+        (38, 'allele_type.bcp'),
+        (35, 'allele_inheritance_mode.bcp'),
+        (39, 'allele_pairstate.bcp'),
+        (61, 'allele_transmission.bcp'),
+        (92, 'allele_collection.bcp'),
+        (93, 'allele_subtype.bcp'),
+        (62, 'allele_creator.bcp'),
+        (63, 'allele_celllinetype.bcp'),
+        (72, 'allele_vector.bcp'),
+        (64, 'allele_vectortype.bcp'),
+        (60, 'genotype_existsas.bcp'),
+        (27, 'strain_type.bcp'),
+]
+
 # sc - tested this in 3.7 python interpreter
 def strip_newline(s):
 
@@ -219,281 +270,465 @@ def mgi_status(status):
 
         return ''
 
-def vocabs():
+#
+# delta feed
+#
+# a delta feed (--since) keeps a key manifest of each bcp file
+# (MANIFESTDIR/<bcp file>.keys.gz); the key of a row is its first
+# DELTAKEYS[bcp file] columns (default: every column but the dates).
+# a full feed (no --since) writes the bcp files as they are and keeps no
+# manifest.
+#
+# a row is written if its creation or modification date (the last two
+# columns) is at or after the timestamp, or if its key is not in the
+# previous manifest; keys of the previous manifest that are gone are
+# written to deletions.bcp as "bcp file<TAB>key".  A bcp file that has no
+# previous manifest is written in full.
+#
+# the keys are streamed to <bcp file>.keys.gz.new as the rows are written
+# (unsorted, not held in memory) and the manifests are renamed when the
+# whole feed is done, so a failed run leaves the previous ones in place;
+# its leftover .new files are removed by the next run.
+#
+# a delta feed of every section records the database time at which it
+# started in STATEFILE, for --since last.
+#
+
+MANIFESTDIR = os.environ['REPORTOUTPUTDIR'] + '/mgimarkerfeed.manifest/'
+STATEFILE = os.environ['REPORTOUTPUTDIR'] + '/mgimarkerfeed.state'
+
+DELTAKEYS = {
+        'marker_type.bcp' : 1,
+        'species.bcp' : 1,
+        'mp_term.bcp' : 1,
+        'marker.bcp' : 1,
+        'accession_marker.bcp' : 3,
+        'allele_cellline.bcp' : 1,
+        'accession_allele_cellline.bcp' : 3,
+        'allele_derivation.bcp' : 1,
+        'allele.bcp' : 1,
+        'allele_allele_cellline.bcp' : 1,
+        'allele_note.bcp' : 2,
+        'accession_allele.bcp' : 3,
+        'strain.bcp' : 1,
+        'strain_synonym.bcp' : 1,
+        'accession_strain.bcp' : 3,
+        'strain_species.bcp' : 1,
+        'genotype.bcp' : 1,
+        'genotype_mpt.bcp' : 1,
+        'allele_pair.bcp' : 1,
+        'reference.bcp' : 1,
+        'accession_reference.bcp' : 3,
+        'accession_do.bcp' : 3,
+        'mgi_relationship.bcp' : 1,
+        'mgi_relationship_category.bcp' : 1,
+        'mgi_relationship_property.bcp' : 1,
+        'mgi_relationship_terms.bcp' : 2,
+}
+for vocabKey, bcpFile in VOCABS:
+        DELTAKEYS[bcpFile] = 1
+
+# 1 for a delta feed (--since)
+delta = 0
+
+# --since, as 'YYYY-MM-DD HH:MM'; None for a full feed or the first delta feed
+since = None
+
+# (bcp file, key) of the rows deleted since the previous feed
+deleted = []
+
+# bcp files whose manifest was written by this process
+manifests = []
+
+@functools.lru_cache(maxsize = 4096)
+def sortableDate(s):
+    #
+    # 'Mon DD YYYY HH:MIAM' (to_char) as 'YYYY-MM-DD HH:MM'; None if s is not a date
+    #
+
+    if not s[:1].isalpha():
+        return None
+
+    try:
+        return time.strftime('%Y-%m-%d %H:%M', time.strptime(s, '%b %d %Y %I:%M%p'))
+    except ValueError:
+        return None
+
+def readManifest(name):
+    #
+    # set of keys of bcp file "name" in the previous feed; None if there is none
+    #
+
+    manifestFile = MANIFESTDIR + name + '.keys.gz'
+
+    if not os.path.exists(manifestFile):
+        return None
+
+    fp = gzip.open(manifestFile, 'rt')
+    keys = set(fp.read().split(CRT))
+    fp.close()
+    keys.discard('')
+
+    return keys
 
+def removeNewManifests():
     #
-    # marker_type
+    # remove the .new manifests left by a run that did not finish
     #
 
-    fp = open(OUTPUTDIR + 'marker_type.bcp', 'w')
-
-    results = db.sql('''
-            select _Marker_Type_key, name, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from MRK_Types
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Marker_Type_key']) + TAB + \
-                     r['name'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+    for f in os.listdir(MANIFESTDIR):
+        if f.endswith('.keys.gz.new'):
+            os.remove(MANIFESTDIR + f)
 
+def commitManifests(names):
     #
-    # species
+    # make the manifests of bcp files "names", written by this run, current
     #
 
-    fp = open(OUTPUTDIR + 'species.bcp', 'w')
+    for name in names:
+        os.rename(MANIFESTDIR + name + '.keys.gz.new', MANIFESTDIR + name + '.keys.gz')
 
-    results = db.sql('''
-            select _Organism_key, commonName, latinName, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from MGI_Organism_Marker_View
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Organism_key']) + TAB + \
-                     r['commonName'] + TAB + \
-                     r['latinName'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+class FeedFile:
+    # a bcp file of a delta feed: writes only the rows that are new or
+    # changed, and streams the key of every row to the new manifest
 
-    #
-    # allele_type
-    #
+    def __init__(self, name, fp):
+        self.name = name
+        self.fp = fp
+        self.nkeys = DELTAKEYS.get(name)
+        self.previous = readManifest(name)
+        self.manifestFile = MANIFESTDIR + name + '.keys.gz.new'
+        self.manifest = gzip.open(self.manifestFile, 'wt', compresslevel = 1)
 
-    fp = open(OUTPUTDIR + 'allele_type.bcp', 'w')
+    def write(self, row):
+        #
+        # row is one complete row, as written by the sections;
+        # only the key columns and the two date columns are split off
+        #
 
-    results = db.sql('''
-            select _Term_key, term, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 38
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+        if row.endswith(LINEDELIM):
+            delim = COLDELIM
+            body = row[:-len(LINEDELIM)]
+        else:
+            delim = TAB
+            body = row[:-len(CRT)]
+
+        changed = None
+        head = body
+        tail = body.rsplit(delim, 2)
+        if len(tail) == 3:
+            rowDates = [sortableDate(c) for c in tail[1:]]
+            if rowDates[0] or rowDates[1]:
+                changed = max([d or '' for d in rowDates])
+                head = tail[0]
+
+        if self.nkeys is None:
+            key = head.replace(delim, TAB)
+        else:
+            key = TAB.join(body.split(delim, self.nkeys)[:self.nkeys])
+
+        self.manifest.write(key + CRT)
+
+        # no previous manifest: nothing to compare with, write every row
+        if since is None \
+                or self.previous is None \
+                or (changed is not None and changed >= since) \
+                or key not in self.previous:
+            self.fp.write(row)
+
+    def close(self):
+        self.fp.close()
+        self.manifest.close()
+        manifests.append(self.name)
+
+        if self.previous is not None:
+            # the keys still in the feed, read back from the new manifest
+            fp = gzip.open(self.manifestFile, 'rt')
+            for key in fp:
+                self.previous.discard(key[:-len(CRT)])
+            fp.close()
+            for key in sorted(self.previous):
+                deleted.append((self.name, key))
+            self.previous = None
 
-    #
-    # allele_inheritance_mode
-    #
-    
-    fp = open(OUTPUTDIR + 'allele_inheritance_mode.bcp', 'w')
+#
+# bcp file sink
+#
+# by default every bcp file is written to OUTPUTDIR.
+#
+# with --archive the bcp files go straight into the gzip'd tar file:
+# a bcp file is spooled (in memory, or in a temporary file in OUTPUTDIR
+# once it outgrows SPOOLSIZE) while its rows are written, and becomes an
+# archive member, compressed on the fly, when it is closed.
+# with --jobs the workers spool each bcp file to a temporary file, and the
+# parent process, which owns the archive, adds it as soon as the section is done.
+#
 
-    results = db.sql('''
-            select _Term_key, term, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 35
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+SPOOLSIZE = 32 * 1024 * 1024
+COMPRESSLEVEL = 6
+
+# encoding of the archive members; the same as open(OUTPUTDIR + name, 'w')
+ENCODING = locale.getpreferredencoding(False)
+
+# 1 if the bcp files go to an archive
+archiveMode = 0
+
+# the open tarfile (parent process only)
+archive = None
+
+# (bcp file, temporary file) spooled by the running section (workers only)
+spooled = []
+
+class ArchiveMember:
+    # a bcp file being written to the archive
+    # (the spool holds bytes: a SpooledTemporaryFile cannot be wrapped in
+    # io.TextIOWrapper before python 3.11)
+
+    def __init__(self, name):
+        self.name = name
+        if archive is None:
+            self.buffer = tempfile.NamedTemporaryFile(dir = OUTPUTDIR, prefix = '.' + name + '.', delete = False)
+        else:
+            self.buffer = tempfile.SpooledTemporaryFile(max_size = SPOOLSIZE, dir = OUTPUTDIR)
 
+    def write(self, s):
+        self.buffer.write(s.encode(ENCODING))
+
+    def close(self):
+        self.buffer.flush()
+        if archive is None:
+            spooled.append((self.name, self.buffer.name))
+        else:
+            addMember(self.name, self.buffer)
+        self.buffer.close()
+
+def openbcp(name):
     #
-    # allele_pairstate
+    # open bcp file "name" for writing, in OUTPUTDIR or in the archive
     #
-    
-    fp = open(OUTPUTDIR + 'allele_pairstate.bcp', 'w')
 
-    results = db.sql('''
-            select _Term_key, term, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 39
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+    if archiveMode:
+        return ArchiveMember(name)
 
+    return open(OUTPUTDIR + name, 'w')
+
+def bcpfile(name):
     #
-    # allele_transmission.bcp
+    # open bcp file "name" of the feed for writing
     #
 
-    fp = open(OUTPUTDIR + 'allele_transmission.bcp', 'w')
+    if delta:
+        return FeedFile(name, openbcp(name))
 
-    results = db.sql('''
-            select _Term_key, term, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 61
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+    return openbcp(name)
 
+def addMember(name, fp):
     #
-    # allele_collection.bcp
+    # add the contents of fp to the archive as "name"
     #
 
-    fp = open(OUTPUTDIR + 'allele_collection.bcp', 'w')
+    info = tarfile.TarInfo(name)
+    info.size = fp.seek(0, os.SEEK_END)
+    info.mtime = time.time()
+    info.mode = 0o664
+    fp.seek(0)
+    archive.addfile(info, fp)
 
-    results = db.sql('''
-            select _Term_key, term, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 92
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+#
+# temp tables shared by the sections
+#
+# each section asks for the temp tables it reads with temptable(name);
+# a table is built the first time it is asked for on this connection,
+# so a section run by itself (--sections) or in its own worker (--jobs)
+# builds exactly what it needs
+#
+
+# temp tables that exist on this connection
+tables = set()
+
+def temptable(name):
+
+    if name not in tables:
+        TEMPTABLES[name]()
+        tables.add(name)
+
+def markerTable():
 
     #
-    # allele_subtype.bcp
+    # select all mouse markers which have a preferred MGI Accession ID.
+    # this will include any splits (since the MGI Acc ID stays with 
+    # the split symbol).
     #
 
-    fp = open(OUTPUTDIR + 'allele_subtype.bcp', 'w')
+    db.sql('''select m._Marker_key, m._Organism_key, m.symbol, m.name 
+            into temporary table markers 
+            from MRK_Marker m 
+            where m._Organism_key = 1 
+            and m._Marker_Status_key in (1,2)
+            and exists (select 1 from ACC_Accession a 
+            where m._Marker_key = a._Object_key 
+            and a._MGIType_key = 2 
+            and a.prefixPart = 'MGI:' 
+            and a._LogicalDB_key = 1 
+            and a.preferred = 1) 
+            union 
+            select m._Marker_key, m._Organism_key, m.symbol, m.name 
+            from MRK_Marker m 
+            where m._Organism_key != 1
+            ''', None)
 
-    results = db.sql('''
-            select _Term_key, term, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 93
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+    db.sql('create index markers_idx1 on markers(_Marker_key)', None)
+
+def alleleTable():
 
     #
-    # allele_creator.bcp
+    # select all alleles with a status of 'approved' or 'autoload'
+    # all other statuses are private/confidential alleles
     #
 
-    fp = open(OUTPUTDIR + 'allele_creator.bcp', 'w')
+    db.sql('''
+        select m._Allele_key into temporary table alleles 
+        from ALL_Allele m, VOC_Term t 
+        where m._Allele_Status_key = t._Term_key 
+        and t.term in ('Approved', 'Autoload') 
+        ''', None)
+    db.sql('create index alleles_idx1 on alleles(_Allele_key)', None)
 
-    results = db.sql('''
-            select _Term_key, term, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 62
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+def strainTable():
 
     #
-    # allele_celllinetype.bcp
+    # select all strains which have a Jax Registry ID or MMRRC ID
+    # plus all strains which are cross-referenced by Allele or Allele CellLine
     #
 
-    fp = open(OUTPUTDIR + 'allele_celllinetype.bcp', 'w')
+    db.sql('''
+          select distinct s._Strain_key, s._Species_key, s._StrainType_key, s.strain, s.private, 
+                to_char(s.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
+                to_char(s.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
+          into temporary table strains 
+          from PRB_Strain s, ACC_Accession a 
+          where s._Strain_key = a._Object_key 
+          and a._MGIType_key = 10 
+          and a._LogicalDB_key in (22, 38) 
+          union 
+          select distinct s._Strain_key, s._Species_key, s._StrainType_key, s.strain, s.private, 
+                to_char(s.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
+                to_char(s.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
+          from PRB_Strain s, ALL_Allele a 
+          where s._Strain_key = a._Strain_key 
+          union 
+          select distinct s._Strain_key, s._Species_key, s._StrainType_key, s.strain, s.private, 
+                to_char(s.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
+                to_char(s.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
+          from PRB_Strain s, ALL_CellLine a 
+          where s._Strain_key = a._Strain_key
+          ''', None)
 
-    results = db.sql('''
-            select _Term_key, term, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 63
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+    db.sql('create index strains_idx1 on strains(_Strain_key)', None)
+
+def genotypeTable():
+
+    temptable('strains')
 
     #
-    # allele_vector.bcp
+    # MP/Genotype annotations (1002)
+    # DO/Genotype annotations (1020)
     #
 
-    fp = open(OUTPUTDIR + 'allele_vector.bcp', 'w')
+    db.sql('''
+           select distinct g._Genotype_key 
+           into temporary table genotypes 
+           from strains s, GXD_Genotype g, VOC_Annot a 
+           where s._Strain_key = g._Strain_key 
+           and g._Genotype_key = a._Object_key 
+           and a._AnnotType_key in (1002,1020) 
+           union 
+           select distinct g._Genotype_key 
+           from strains s, PRB_Strain_Genotype g 
+           where s._Strain_key = g._Strain_key
+           ''', 'auto')
 
-    results = db.sql('''
-            select _Term_key, term, 
-                to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 72
-            ''', 'auto', execute = 1)
-    for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
-                     str(r['cdate']) + TAB + \
-                     str(r['mdate']) + CRT)
-    fp.close()
+    db.sql('create index genotypes_idx1 on genotypes(_Genotype_key)', None)
+
+TEMPTABLES = {
+        'markers' : markerTable,
+        'alleles' : alleleTable,
+        'strains' : strainTable,
+        'genotypes' : genotypeTable,
+}
+
+def vocabs():
 
     #
-    # allele_vectortype.bcp
+    # marker_type
     #
 
-    fp = open(OUTPUTDIR + 'allele_vectortype.bcp', 'w')
+    fp = bcpfile('marker_type.bcp')
 
     results = db.sql('''
-            select _Term_key, term, 
+            select _Marker_Type_key, name, 
                 to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
                 to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 64
+            from MRK_Types
             ''', 'auto', execute = 1)
     for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
+            fp.write(repr(r['_Marker_Type_key']) + TAB + \
+                     r['name'] + TAB + \
                      str(r['cdate']) + TAB + \
                      str(r['mdate']) + CRT)
     fp.close()
 
     #
-    # genotype_existsas.bcp
+    # species
     #
 
-    fp = open(OUTPUTDIR + 'genotype_existsas.bcp', 'w')
+    fp = bcpfile('species.bcp')
 
     results = db.sql('''
-            select _Term_key, term, 
+            select _Organism_key, commonName, latinName, 
                 to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
                 to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-            from VOC_Term where _Vocab_key = 60
+            from MGI_Organism_Marker_View
             ''', 'auto', execute = 1)
     for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
-                     r['term'] + TAB + \
+            fp.write(repr(r['_Organism_key']) + TAB + \
+                     r['commonName'] + TAB + \
+                     r['latinName'] + TAB + \
                      str(r['cdate']) + TAB + \
                      str(r['mdate']) + CRT)
     fp.close()
 
     #
-    # strain_type.bcp
+    # VOC_Term vocabularies (see VOCABS)
+    # one query for all of them, ordered by vocabulary; each row goes to
+    # the bcp file of its vocabulary
     #
-    
-    fp = open(OUTPUTDIR + 'strain_type.bcp', 'w')
-    
+
+    fps = {}
+    for vocabKey, bcpFile in VOCABS:
+        fps[vocabKey] = bcpfile(bcpFile)
+
     results = db.sql('''
-          select _Term_key, term, 
+            select _Vocab_key, _Term_key, term, 
                 to_char(creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
                 to_char(modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-          from VOC_Term where _Vocab_key = 27
-          ''', 'auto')
-
+            from VOC_Term where _Vocab_key in (%s)
+            order by _Vocab_key
+            ''' % (','.join([str(vocabKey) for vocabKey, bcpFile in VOCABS])), 'auto')
     for r in results:
-            fp.write(repr(r['_Term_key']) + TAB + \
+            fps[r['_Vocab_key']].write(repr(r['_Term_key']) + TAB + \
                      r['term'] + TAB + \
                      str(r['cdate']) + TAB + \
                      str(r['mdate']) + CRT)
-    fp.close()
+
+    for vocabKey in fps:
+            fps[vocabKey].close()
 
     #
     # mp_term.bcp
     #
     
-    fp = open(OUTPUTDIR + 'mp_term.bcp', 'w')
+    fp = bcpfile('mp_term.bcp')
     
     #
     # vocabulary terms
@@ -530,9 +765,9 @@ def vocabs():
     # select data fields for accession_do.bcp
     #
 
-    fp = open(OUTPUTDIR + 'accession_do.bcp', 'w')
+    fp = bcpfile('accession_do.bcp')
 
-    results = db.sql('''
+    results = reportdb.stream('''
             select distinct a2.accID, l.name as LogicalDB, a1._Object_key, a1.preferred, 
                 to_char(a2.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
                 to_char(a2.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
@@ -545,7 +780,7 @@ def vocabs():
             and a2._LogicalDB_key = 15
             and a2._LogicalDB_key = l._LogicalDB_key
             order by a1._Object_key
-            ''', 'auto')
+            ''')
 
     for r in results:
             fp.write(r['accID'] + TAB + \
@@ -561,7 +796,7 @@ def vocabs():
     # Synonyms for MP and OMIM terms
     #
 
-    fp = open(OUTPUTDIR + 'mp_synonym.bcp', 'w')
+    fp = bcpfile('mp_synonym.bcp')
     
     results = db.sql('''
           select t._Term_key, s.synonym, 
@@ -586,7 +821,7 @@ def vocabs():
     # mp_closure.bcp
     #
     
-    fp = open(OUTPUTDIR + 'mp_closure.bcp', 'w')
+    fp = bcpfile('mp_closure.bcp')
 
     results = db.sql('''
         select c._AncestorObject_key, c._DescendentObject_key, 
@@ -611,36 +846,13 @@ def markers():
     # accession_marker
     #
 
-    #
-    # select all mouse markers which have a preferred MGI Accession ID.
-    # this will include any splits (since the MGI Acc ID stays with 
-    # the split symbol).
-    #
-
-    db.sql('''select m._Marker_key, m._Organism_key, m.symbol, m.name 
-            into temporary table markers 
-            from MRK_Marker m 
-            where m._Organism_key = 1 
-            and m._Marker_Status_key in (1,2)
-            and exists (select 1 from ACC_Accession a 
-            where m._Marker_key = a._Object_key 
-            and a._MGIType_key = 2 
-            and a.prefixPart = 'MGI:' 
-            and a._LogicalDB_key = 1 
-            and a.preferred = 1) 
-            union 
-            select m._Marker_key, m._Organism_key, m.symbol, m.name 
-            from MRK_Marker m 
-            where m._Organism_key != 1
-            ''', None)
-
-    db.sql('create index markers_idx1 on markers(_Marker_key)', None)
+    temptable('markers')
 
     #
     # select data fields for marker.bcp
     #
 
-    fp = open(OUTPUTDIR + 'marker.bcp', 'w')
+    fp = bcpfile('marker.bcp')
 
     results = db.sql('''
             select k._Marker_key, k._Organism_key, m._Marker_Type_key, s.status, 
@@ -682,7 +894,7 @@ def markers():
     # field, else status = 0
     #
 
-    fp = open(OUTPUTDIR + 'marker_label.bcp', 'w')
+    fp = bcpfile('marker_label.bcp')
 
     results = db.sql('''
             select distinct m._Marker_key, m.label, m.labelType, 1 as status, 
@@ -742,9 +954,9 @@ def markers():
     # select MGI Accession IDs only
     #
 
-    fp = open(OUTPUTDIR + 'accession_marker.bcp', 'w')
+    fp = bcpfile('accession_marker.bcp')
 
-    results = db.sql('''
+    results = reportdb.stream('''
             select m.accID, l.name as LogicalDB, m._Object_key, m.preferred, 
                 to_char(m.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
                 to_char(m.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
@@ -764,7 +976,7 @@ def markers():
                 and m._MGIType_key = 2 
                 and m._LogicalDB_key in (55, 64, 15, 47) 
                 and m._LogicalDB_key = l._LogicalDB_key 
-            ''', 'auto')
+            ''')
 
     for r in results:
             fp.write(r['accID'] + TAB + \
@@ -793,7 +1005,7 @@ def alleles():
     # allele_cellline.bcp
     #
 
-    fp = open(OUTPUTDIR + 'allele_cellline.bcp', 'w')
+    fp = bcpfile('allele_cellline.bcp')
     
     results = db.sql('''
             select _CellLine_key, cellLine, _CellLine_Type_key, _Strain_key, _Derivation_key, isMutant, 
@@ -816,9 +1028,9 @@ def alleles():
     # accession_allele_cellline.bcp
     #
 
-    fp = open(OUTPUTDIR + 'accession_allele_cellline.bcp', 'w')
+    fp = bcpfile('accession_allele_cellline.bcp')
 
-    results = db.sql('''
+    results = reportdb.stream('''
             select m.accID, l.name as LogicalDB, m._Object_key, m.preferred, 
                 to_char(m.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
                 to_char(m.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
@@ -826,7 +1038,7 @@ def alleles():
             where c._CellLine_key = m._Object_key 
             and m._MGIType_key = 28 
             and m._LogicalDB_key = l._LogicalDB_key
-            ''', 'auto')
+            ''')
 
     for r in results:
             fp.write(r['accID'] + TAB + \
@@ -841,7 +1053,7 @@ def alleles():
     # allele_derivation.bcp
     #
 
-    fp = open(OUTPUTDIR + 'allele_derivation.bcp', 'w')
+    fp = bcpfile('allele_derivation.bcp')
     
     results = db.sql('''
         select _Derivation_key, name, 
@@ -865,24 +1077,13 @@ def alleles():
                      str(r['mdate']) + CRT)
     fp.close()
 
-    #
-    # select all alleles with a status of 'approved' or 'autoload'
-    # all other statuses are private/confidential alleles
-    #
-
-    db.sql('''
-        select m._Allele_key into temporary table alleles 
-        from ALL_Allele m, VOC_Term t 
-        where m._Allele_Status_key = t._Term_key 
-        and t.term in ('Approved', 'Autoload') 
-        ''', None)
-    db.sql('create index alleles_idx1 on alleles(_Allele_key)', None)
+    temptable('alleles')
 
     #
     # select data fields for allele.bcp
     #
 
-    fp = open(OUTPUTDIR + 'allele.bcp', 'w')
+    fp = bcpfile('allele.bcp')
 
     results = db.sql('''
         select m._Allele_key, m._Marker_key, m._Mode_key, m._Allele_Type_key, m._Transmission_key, 
@@ -917,7 +1118,7 @@ def alleles():
     # select data fields for allele_allele_cellline.bcp
     #
 
-    fp = open(OUTPUTDIR + 'allele_allele_cellline.bcp', 'w')
+    fp = bcpfile('allele_allele_cellline.bcp')
 
     results = db.sql('''
             select m._Assoc_key, m._Allele_key, m._MutantCellLine_key, 
@@ -942,7 +1143,7 @@ def alleles():
     # field, else status = 0
     #
 
-    fp = open(OUTPUTDIR + 'allele_label.bcp', 'w')
+    fp = bcpfile('allele_label.bcp')
 
     results = db.sql('''
             select m._Allele_key, m.name, 'AN' as labelType, 1 as status, 
@@ -979,7 +1180,7 @@ def alleles():
     # select data fields for allele_note.bcp
     #
 
-    fp = open(OUTPUTDIR + 'allele_note.bcp', 'w')
+    fp = bcpfile('allele_note.bcp')
 
     results = db.sql('''
             select a._Allele_key, rtrim(n.note) as note, nt.noteType, 
@@ -1006,9 +1207,9 @@ def alleles():
     # select data fields for accession_allele.bcp
     #
 
-    fp = open(OUTPUTDIR + 'accession_allele.bcp', 'w')
+    fp = bcpfile('accession_allele.bcp')
 
-    results = db.sql('''
+    results = reportdb.stream('''
             select m.accID, l.name as LogicalDB, m._Object_key, m.preferred, 
                 to_char(m.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
                 to_char(m.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
@@ -1018,7 +1219,7 @@ def alleles():
             and m.prefixPart = 'MGI:' 
             and m._LogicalDB_key = 1 
             and m._LogicalDB_key = l._LogicalDB_key
-            ''', 'auto')
+            ''')
 
     for r in results:
             fp.write(r['accID'] + TAB + \
@@ -1033,7 +1234,7 @@ def alleles():
     # select data fields for allele_subtype_assoc.bcp
     #
 
-    fp = open(OUTPUTDIR + 'allele_subtype_assoc.bcp', 'w')
+    fp = bcpfile('allele_subtype_assoc.bcp')
 
     results = db.sql('''
             select a._Allele_key, va._Term_key, 
@@ -1063,42 +1264,13 @@ def strains():
     # strain_genotype.bcp
     #
 
-    #
-    # select all strains which have a Jax Registry ID or MMRRC ID
-    # plus all strains which are cross-referenced by Allele or Allele CellLine
-    # strain.bcp
-    #
-
-    db.sql('''
-          select distinct s._Strain_key, s._Species_key, s._StrainType_key, s.strain, s.private, 
-                to_char(s.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(s.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-          into temporary table strains 
-          from PRB_Strain s, ACC_Accession a 
-          where s._Strain_key = a._Object_key 
-          and a._MGIType_key = 10 
-          and a._LogicalDB_key in (22, 38) 
-          union 
-          select distinct s._Strain_key, s._Species_key, s._StrainType_key, s.strain, s.private, 
-                to_char(s.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(s.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-          from PRB_Strain s, ALL_Allele a 
-          where s._Strain_key = a._Strain_key 
-          union 
-          select distinct s._Strain_key, s._Species_key, s._StrainType_key, s.strain, s.private, 
-                to_char(s.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
-                to_char(s.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
-          from PRB_Strain s, ALL_CellLine a 
-          where s._Strain_key = a._Strain_key
-          ''', None)
-
-    db.sql('create index strains_idx1 on strains(_Strain_key)', None)
+    temptable('strains')
 
     #
     # strain.bcp
     #
 
-    fp = open(OUTPUTDIR + 'strain.bcp', 'w')
+    fp = bcpfile('strain.bcp')
 
     results = db.sql('select * from strains', 'auto')
 
@@ -1115,7 +1287,7 @@ def strains():
     # strain_marker.bcp
     #
 
-    fp = open(OUTPUTDIR + 'strain_marker.bcp', 'w')
+    fp = bcpfile('strain_marker.bcp')
 
     results = db.sql('''
           select distinct m._Strain_key, m._Marker_key, m._Allele_key, s.private, t.term as qualifier, 
@@ -1140,7 +1312,7 @@ def strains():
     # strain_synonym.bcp
     #
 
-    fp = open(OUTPUTDIR + 'strain_synonym.bcp', 'w')
+    fp = bcpfile('strain_synonym.bcp')
     
     results = db.sql('''
           select m._Synonym_key, m._Object_key, m.synonym, s.private, m.synonymType, 
@@ -1165,7 +1337,7 @@ def strains():
     # strain_strain_type.bcp
     #
 
-    fp = open(OUTPUTDIR + 'strain_strain_type.bcp', 'w')
+    fp = bcpfile('strain_strain_type.bcp')
 
     results = db.sql('''
         select m._Strain_key, m._Term_key, s.private, s.cdate, s.mdate 
@@ -1186,9 +1358,9 @@ def strains():
     # accession_strain.bcp
     #
 
-    fp = open(OUTPUTDIR + 'accession_strain.bcp', 'w')
+    fp = bcpfile('accession_strain.bcp')
     
-    results = db.sql('''
+    results = reportdb.stream('''
         select distinct a.accID, l.name as LogicalDB, a._Object_key, a.preferred, s.private, 
                to_char(a.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
                to_char(a.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
@@ -1196,7 +1368,7 @@ def strains():
           where s._Strain_key = a._Object_key 
           and a._MGIType_key = 10 
           and a._LogicalDB_key = l._LogicalDB_key
-          ''', 'auto')
+          ''')
 
     for r in results:
             fp.write(r['accID'] + TAB + \
@@ -1212,7 +1384,7 @@ def strains():
     # strain_species.bcp
     #
     
-    fp = open(OUTPUTDIR + 'strain_species.bcp', 'w')
+    fp = bcpfile('strain_species.bcp')
 
     results = db.sql('''
         select _Term_key, term, 
@@ -1238,31 +1410,14 @@ def genotypes():
     # allele_pair.bcp
     #
 
-    #
-    # MP/Genotype annotations (1002)
-    # DO/Genotype annotations (1020)
-    #
-
-    db.sql('''
-           select distinct g._Genotype_key 
-           into temporary table genotypes 
-           from strains s, GXD_Genotype g, VOC_Annot a 
-           where s._Strain_key = g._Strain_key 
-           and g._Genotype_key = a._Object_key 
-           and a._AnnotType_key in (1002,1020) 
-           union 
-           select distinct g._Genotype_key 
-           from strains s, PRB_Strain_Genotype g 
-           where s._Strain_key = g._Strain_key
-           ''', 'auto')
-
-    db.sql('create index genotypes_idx1 on genotypes(_Genotype_key)', None)
+    temptable('alleles')
+    temptable('genotypes')
 
     #
     # genotype.bcp
     #
 
-    fp = open(OUTPUTDIR + 'genotype.bcp', 'w')
+    fp = bcpfile('genotype.bcp')
 
     results = db.sql('''
           select g._Genotype_key, s.strain, p.isConditional, p._ExistsAs_key, n.note, 
@@ -1297,7 +1452,7 @@ def genotypes():
     # include the omimCatergory3 ('None' if no DO annotation exists)
     #
 
-    fp = open(OUTPUTDIR + 'genotype_mpt.bcp', 'w')
+    fp = bcpfile('genotype_mpt.bcp')
 
     results = db.sql('''
         (
@@ -1335,7 +1490,7 @@ def genotypes():
     # genotype_header.bcp (MP only)
     #
 
-    fp = open(OUTPUTDIR + 'genotype_header.bcp', 'w')
+    fp = bcpfile('genotype_header.bcp')
 
     results = db.sql('''
         select g._Genotype_key, h._Term_key as headerTerm, h.sequenceNum, 
@@ -1360,7 +1515,7 @@ def genotypes():
     # strain_genotype.bcp
     #
     
-    fp = open(OUTPUTDIR + 'strain_genotype.bcp', 'w')
+    fp = bcpfile('strain_genotype.bcp')
 
     results = db.sql('''
           select p._Strain_key, p._Genotype_key, t.term, 
@@ -1387,7 +1542,7 @@ def genotypes():
     # allele_pair.bcp
     #
 
-    fp = open(OUTPUTDIR + 'allele_pair.bcp', 'w')
+    fp = bcpfile('allele_pair.bcp')
 
     results = db.sql('''
             (
@@ -1428,7 +1583,10 @@ def references():
     # reference.bcp
     #
 
-    fp = open(OUTPUTDIR + 'reference.bcp', 'w')
+    temptable('strains')
+    temptable('genotypes')
+
+    fp = bcpfile('reference.bcp')
 
     #
     # references annotated to a Genotype
@@ -1550,7 +1708,7 @@ def references():
            ''', None)
     db.sql('create index references_idx1 on refs(_Refs_key)', None)
 
-    results = db.sql('''
+    results = reportdb.stream('''
             select r._Refs_key, t.term, b.authors,
             b.title, b.journal, b.vol, b.issue, b.pgs, b.year, 
             b.isReviewArticle, 
@@ -1561,7 +1719,7 @@ def references():
                 VOC_Term t
             where r._Refs_key = b._Refs_key 
             and b._ReferenceType_key = t._Term_key
-            ''', 'auto')
+            ''')
 
     for r in results:
             fp.write(repr(r['_Refs_key']) + TAB + \
@@ -1587,8 +1745,8 @@ def references():
     # accession_reference.bcp
     #
 
-    fp = open(OUTPUTDIR + 'accession_reference.bcp', 'w')
-    results = db.sql('''
+    fp = bcpfile('accession_reference.bcp')
+    results = reportdb.stream('''
             select a.accID, l.name as LogicalDB, a._Object_key, a.preferred, 
             to_char(a.creation_date, 'Mon DD YYYY HH:MIAM') as cdate,
             to_char(a.modification_date, 'Mon DD YYYY HH:MIAM') as mdate
@@ -1596,7 +1754,7 @@ def references():
             where r._Refs_key = a._Object_key 
             and a._MGIType_key = 1 
             and a._LogicalDB_key = l._LogicalDB_key
-            ''', 'auto')
+            ''')
 
     for r in results:
             fp.write(r['accID'] + TAB + \
@@ -1611,15 +1769,15 @@ def references():
     # genotype_mpt_reference.bcp
     #
 
-    fp = open(OUTPUTDIR + 'genotype_mpt_reference.bcp', 'w')
+    fp = bcpfile('genotype_mpt_reference.bcp')
 
-    results = db.sql('''
+    results = reportdb.stream('''
         select g._Refs_key, g._Genotype_key, g._Annot_key, g.cdate, g.mdate 
         from genoreferences g 
         where not exists (select 1 from MGI_Note_VocEvidence_View n 
         where g._AnnotEvidence_key = n._Object_key) 
         order by g._Genotype_key 
-        ''', 'auto')
+        ''')
     for r in results:
             fp.write(repr(r['_Annot_key']) + COLDELIM + \
                      repr(r['_Refs_key']) + COLDELIM + \
@@ -1630,13 +1788,13 @@ def references():
                      str(r['cdate']) + COLDELIM + \
                      str(r['mdate']) + LINEDELIM)
 
-    results = db.sql('''
+    results = reportdb.stream('''
         select g._Refs_key, g._Genotype_key, g._Annot_key, g._AnnotEvidence_key, g.cdate, g.mdate, 
         n._Note_key, n.noteType, n.note 
         from genoreferences g, MGI_Note_VocEvidence_View n 
         where g._AnnotEvidence_key = n._Object_key 
         order by g._Genotype_key, g._AnnotEvidence_key
-        ''', 'auto')
+        ''')
     for r in results:
             fp.write(repr(r['_Annot_key']) + COLDELIM + \
                      repr(r['_Refs_key']) + COLDELIM + \
@@ -1652,9 +1810,9 @@ def references():
     # allele_reference.bcp
     #
 
-    fp = open(OUTPUTDIR + 'allele_reference.bcp', 'w')
+    fp = bcpfile('allele_reference.bcp')
 
-    results = db.sql('select * from allrefs', 'auto')
+    results = reportdb.stream('select * from allrefs')
     for r in results:
             fp.write(repr(r['_Allele_key']) + TAB + \
                      repr(r['_Refs_key']) + TAB + \
@@ -1667,9 +1825,9 @@ def references():
     # strain_reference.bcp
     #
 
-    fp = open(OUTPUTDIR + 'strain_reference.bcp', 'w')
+    fp = bcpfile('strain_reference.bcp')
 
-    results = db.sql('select * from strainreferences', 'auto')
+    results = reportdb.stream('select * from strainreferences')
     for r in results:
             fp.write(repr(r['_Object_key']) + TAB + \
                      repr(r['_Refs_key']) + TAB + \
@@ -1682,9 +1840,9 @@ def references():
     # marker_reference.bcp
     #
 
-    fp = open(OUTPUTDIR + 'marker_reference.bcp', 'w')
+    fp = bcpfile('marker_reference.bcp')
 
-    results = db.sql('select * from mrkreferences', 'auto')
+    results = reportdb.stream('select * from mrkreferences')
     for r in results:
             fp.write(repr(r['_Marker_key']) + TAB + \
                      repr(r['_Refs_key']) + CRT)
@@ -1698,7 +1856,7 @@ def humando():
     # marker_do.bcp
     #
 
-    fp = open(OUTPUTDIR + 'marker_do.bcp', 'w')
+    fp = bcpfile('marker_do.bcp')
 
     results = db.sql('''
         select a._Term_key, a._Object_key, e._Refs_key, 
@@ -1729,7 +1887,7 @@ def mgi_relationship():
     # and 'expresses_component' (1004)
     #
 
-    fp = open(OUTPUTDIR + 'mgi_relationship.bcp', 'w')
+    fp = bcpfile('mgi_relationship.bcp')
 
     results = db.sql('''
         select a.*,
@@ -1753,7 +1911,7 @@ def mgi_relationship():
 
     fp.close()
 
-    fp = open(OUTPUTDIR + 'mgi_relationship_category.bcp', 'w')
+    fp = bcpfile('mgi_relationship_category.bcp')
 
     results = db.sql('''
         select a.*,
@@ -1777,7 +1935,7 @@ def mgi_relationship():
 
     fp.close()
 
-    fp = open(OUTPUTDIR + 'mgi_relationship_property.bcp', 'w')
+    fp = bcpfile('mgi_relationship_property.bcp')
 
     results = db.sql('''
         select p.*,
@@ -1803,7 +1961,7 @@ def mgi_relationship():
     # mgi_relationship_terms.bcp
     #
 
-    fp = open(OUTPUTDIR + 'mgi_relationship_terms.bcp', 'w')
+    fp = bcpfile('mgi_relationship_terms.bcp')
 
     results = db.sql('''
             select v.name, t._Vocab_key, t._Term_key, t.term, 
@@ -1823,15 +1981,162 @@ def mgi_relationship():
     fp.close()
 
 #
-# Main
+# sections, in the order they are run by default
 #
+SECTIONS = [
+        ('vocabs', vocabs),
+        ('alleles', alleles),
+        ('markers', markers),
+        ('strains', strains),
+        ('genotypes', genotypes),
+        ('references', references),
+        ('humando', humando),
+        ('mgi_relationship', mgi_relationship),
+]
+
+def runSection(name):
+    #
+    # run one section; in a worker process this uses the worker's
+    # own connection and temp tables
+    # returns (name, [(bcp file, temporary file)] spooled for the archive,
+    #       [(bcp file, key)] deleted, [bcp file] manifests)
+    #
+
+    del spooled[:]
+    del deleted[:]
+    del manifests[:]
+    dict(SECTIONS)[name]()
+    return (name, list(spooled), list(deleted), list(manifests))
+
+def sortableSince(s):
+    #
+    # --since 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM' as 'YYYY-MM-DD HH:MM'
+    #
+
+    for format in ('%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return time.strftime('%Y-%m-%d %H:%M', time.strptime(s, format))
+        except ValueError:
+            pass
+
+    sys.stderr.write('--since: not a timestamp: %s\n' % (s))
+    sys.exit(1)
+
+def workerInit(deltaFeed, deltaSince):
+    #
+    # each worker process has its own connection and temp tables;
+    # the archive belongs to the parent
+    #
+
+    global archive, delta, since
+
+    archive = None
+    delta = deltaFeed
+    since = deltaSince
+    reportdb.init()
+
+def main():
+
+    global archiveMode, archive, delta, since
+
+    sections = [name for name, section in SECTIONS]
+    jobs = 1
+    archiveFile = None
+
+    try:
+        optlist, args = getopt.getopt(sys.argv[1:], '', ['sections=', 'jobs=', 'archive=', 'since='])
+    except getopt.GetoptError as e:
+        sys.stderr.write('%s\n' % (e))
+        sys.exit(1)
+
+    for opt, arg in optlist:
+        if opt == '--sections':
+            sections = arg.split(',')
+        elif opt == '--jobs':
+            jobs = int(arg)
+        elif opt == '--archive':
+            archiveFile = arg
+        elif opt == '--since':
+            delta = 1
+            since = arg
+
+    for name in sections:
+        if name not in dict(SECTIONS):
+            sys.stderr.write('unknown section: %s (sections: %s)\n' % \
+                (name, ', '.join([n for n, section in SECTIONS])))
+            sys.exit(1)
+
+    if since == 'last':
+        if os.path.exists(STATEFILE):
+            fp = open(STATEFILE, 'r')
+            since = fp.read().strip()
+            fp.close()
+        else:
+            print('%s: no %s; writing a full feed' % (mgi_utils.date(), STATEFILE))
+            since = None
+
+    if since is not None:
+        since = sortableSince(since)
+        print('%s: delta feed since %s' % (mgi_utils.date(), since))
+
+    if delta:
+        # the next --since last starts where this feed starts
+        startTime = db.sql("select to_char(now(), 'YYYY-MM-DD HH24:MI') as now", 'auto')[0]['now']
+        if not os.path.isdir(MANIFESTDIR):
+            os.makedirs(MANIFESTDIR)
+        removeNewManifests()
+
+    if archiveFile is not None:
+        archiveMode = 1
+        archive = tarfile.open(archiveFile + '.new', 'w:gz', compresslevel = COMPRESSLEVEL)
+
+    allDeleted = []
+    allManifests = []
+
+    if jobs <= 1 or len(sections) == 1:
+        # reportdb.stream() reads the temp tables through db's shared session
+        reportdb.init()
+        for name in sections:
+            name, files, sectionDeleted, sectionManifests = runSection(name)
+            allDeleted = allDeleted + sectionDeleted
+            allManifests = allManifests + sectionManifests
+    else:
+        pool = multiprocessing.Pool(min(jobs, len(sections)), initializer = workerInit, initargs = (delta, since))
+        for name, files, sectionDeleted, sectionManifests in pool.imap_unordered(runSection, sections):
+            for bcpFile, tmpFile in files:
+                fp = open(tmpFile, 'rb')
+                addMember(bcpFile, fp)
+                fp.close()
+                os.remove(tmpFile)
+            allDeleted = allDeleted + sectionDeleted
+            allManifests = allManifests + sectionManifests
+            print('%s: %s done' % (mgi_utils.date(), name))
+            sys.stdout.flush()
+        pool.close()
+        pool.join()
+
+    if delta:
+        fp = openbcp('deletions.bcp')
+        for bcpFile, key in sorted(allDeleted):
+            fp.write(bcpFile + TAB + key + CRT)
+        fp.close()
+
+    if archive is not None:
+        archive.close()
+        os.rename(archiveFile + '.new', archiveFile)
+
+    if delta:
+        commitManifests(allManifests)
+
+        # only a feed of every section moves the high-water mark
+        if len(sections) == len(SECTIONS):
+            fp = open(STATEFILE, 'w')
+            fp.write(startTime + CRT)
+            fp.close()
 
-vocabs()
-alleles()
-markers()
-strains()
-genotypes()
-references()
-humando()
-mgi_relationship()
+#
+# Main
+#
 
+if __name__ == '__main__':
+    main()
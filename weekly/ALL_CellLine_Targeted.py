@@ -53,11 +53,11 @@
 #
 '''
 
-import csv
 import sys
 import os
 import reportlib
 import db
+import imsrcache
 import db
 
 db.setTrace()
@@ -65,74 +65,6 @@ db.setTrace()
 CRT = reportlib.CRT
 TAB = reportlib.TAB
 
-IMSR_CSV = os.environ['IMSR_STRAINS_CSV']
-
-# functions
-
-def createImsrEsDict():
-        """
-        Reads in the IMSR allStrains.csv file and generates
-        a map of allele/marker ID to facility abbreviations
-        for es cells only
-        """
-        facilityMap = {}
-        csvfile = open(IMSR_CSV, 'r')
-        reader = csv.reader(csvfile)
-        for row in reader:
-                allele_ids = row[0]
-                marker_ids = row[1]
-                provider = row[3]
-                strain_states = row[4]
-                if strain_states:
-                        for strain_state in strain_states.split(','):
-                                if strain_state.lower() != 'es cell':
-                                        continue
-                                if allele_ids:
-                                        for id in allele_ids.split(','):
-                                                facilityMap.setdefault(id, []).append(provider)
-                                if marker_ids:
-                                        for id in marker_ids.split(','):
-                                                facilityMap.setdefault(id, []).append(provider)
-
-        # unique and sort the provider list
-        for id, facilities in list(facilityMap.items()):
-                facilityMap[id] = list(set(facilities))
-                facilityMap[id].sort()
-
-        return facilityMap
-
-def createImsrStrainDict():
-        """
-        Reads in the IMSR allStrains.csv file and generates
-        a map of allele/marker ID to facility abbreviations
-        for any type except es cells
-        """
-        facilityMap = {}
-        csvfile = open(IMSR_CSV, 'r')
-        reader = csv.reader(csvfile)
-        for row in reader:
-                allele_ids = row[0]
-                marker_ids = row[1]
-                provider = row[3]
-                strain_states = row[4]
-                if strain_states:
-                        for strain_state in strain_states.split(','):
-                                if strain_state.lower() == 'es cell':
-                                        continue
-                                if allele_ids:
-                                        for id in allele_ids.split(','):
-                                                facilityMap.setdefault(id, []).append(provider)
-                                if marker_ids:
-                                        for id in marker_ids.split(','):
-                                                facilityMap.setdefault(id, []).append(provider)
-
-        # unique and sort the provider list
-        for id, facilities in list(facilityMap.items()):
-                facilityMap[id] = list(set(facilities))
-                facilityMap[id].sort()
-
-        return facilityMap
-
 #create report
 fp = reportlib.init(sys.argv[0], outputdir = os.environ['REPORTOUTPUTDIR'], printHeading = None)
 
@@ -189,8 +121,9 @@ db.sql('create index idx_gtallid on gt_seqs (_Allele_key)', None)
 db.sql('create index idx_gtmrkid on gt_seqs (_Marker_key)', None)
 
 # get imsr allele & marker ID => providers for ES Cells, and for Mice
-es = createImsrEsDict()
-strain = createImsrStrainDict()
+imsr = imsrcache.load()
+es = imsr.esProviders
+strain = imsr.strainProviders
 
 results = db.sql('''
         select g.mclID, g.vector, g.mclCreator, g.library, 
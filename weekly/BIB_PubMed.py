@@ -31,9 +31,13 @@ import os
 import mgi_utils
 import reportlib
 import db
+import reportdb
 
 db.setTrace()
 
+# reportdb reads the temp tables through db's shared session
+reportdb.init()
+
 TAB = reportlib.TAB
 CRT = reportlib.CRT
 
@@ -52,7 +56,8 @@ db.sql('''
 
 db.sql('create unique index index_object_key on rfs(_Object_key)', None)
 
-results = db.sql('''
+# MGI id, PubMed id, J:
+reportdb.export(fp, '''
         select distinct r.accID, b.accID as pubmedid, a.accID as jnum
         from rfs r, ACC_Accession b, ACC_Accession a 
         where r._Object_key = b._Object_key 
@@ -63,12 +68,6 @@ results = db.sql('''
         and a._LogicalDB_key = 1 
         and a.prefixPart = 'J:' 
         and a.preferred = 1
-        ''', 'auto')
-
-for r in results:
-
-        fp.write(r['accID'] + TAB)
-        fp.write(r['pubmedid'] + TAB)
-        fp.write(r['jnum'] + CRT)
+        ''')
 
 reportlib.finish_nonps(fp)
@@ -25,6 +25,7 @@
 import sys
 import os
 import reportlib
+import homologycache
 import db
 import Set
 
@@ -48,8 +49,8 @@ ccds = 136
 # {markerKey: featureTypeKey, ...}
 featureTypeDict = {}
 
-# {mouseKey: [humanKeys], ...} for from MRK_Cluster*
-homologyDict = {}
+# Alliance Direct homology clusters (see lib/homologycache.py)
+homology = None
 
 # HGNC {humanKey: hgncId, ...}
 hgncIdDict = {}
@@ -93,37 +94,10 @@ def getCoords(logicalDBkey, provider):
     return tempCoords
 
 def loadLookups():
-    global homologyDict, hgncIdDict, ccdsDict, featureTypeDict
+    global homology, hgncIdDict, ccdsDict, featureTypeDict
 
-    # load lookup mapping mouse marker key to human marker keys from Alliance Direct
-    results = db.sql('''select cm._Cluster_key, cm._Marker_key, m._Organism_key
-        from MRK_Cluster c, MRK_ClusterMember cm, MRK_Marker m
-        where c._ClusterType_key = 9272150
-        and c._ClusterSource_key = 75885739
-        and c._Cluster_key = cm._Cluster_key
-        and cm._Marker_key = m._Marker_key''', 'auto')
-
-    tempClusterDict = {}
-    for r in results:
-        clusterKey = r['_Cluster_key']
-        markerKey = r['_Marker_key']
-        orgKey = r['_Organism_key']
-        if clusterKey not in tempClusterDict:
-           tempClusterDict[clusterKey] = [[],[]]
-        if orgKey == 1:
-            tempClusterDict[clusterKey][0].append(markerKey)
-        else:
-            tempClusterDict[clusterKey][1].append(markerKey)
-
-    # load lookup mapping mouse marker key to the set of all human markers it has homology with
-    for clusterKey in list(tempClusterDict.keys()):
-        mouseList = tempClusterDict[clusterKey][0]
-        humanList = tempClusterDict[clusterKey][1]
-        hgncList = []
-        for mKey in mouseList:
-            if mKey not in homologyDict:
-                homologyDict[mKey] = []
-            homologyDict[mKey] =  homologyDict[mKey] + humanList
+    # mouse marker key to the human markers it has homology with, from Alliance Direct
+    homology = homologycache.load()
 
     # load lookup mapping human markers to their HGNC IDs
     results = db.sql('''select accid, _Object_key
@@ -262,12 +236,13 @@ for r in results:
     else:
         fp.write(noneDisplay)
 
+    # list of human markers this mouse has homology with
+    humanList = homology.homologs(key)
+
     # If the mouse key has no HG or HGNC homology leave blank
-    if key not in homologyDict:
+    if not humanList:
         fp.write(noneDisplay)
     else:
-        # list of human markers this mouse has homology with
-        humanList = homologyDict[key]
         hgncList = []
 
         # get the HGNC IDs associated with the human homologs for this mouse marker
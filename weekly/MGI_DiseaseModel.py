@@ -46,8 +46,8 @@
 
 import sys
 import os
-import csv
 import db
+import imsrcache
 import reportlib
 
 db.setTrace()
@@ -55,7 +55,6 @@ db.setTrace()
 CRT = reportlib.CRT
 TAB = reportlib.TAB
 
-IMSR_CSV = os.environ['IMSR_STRAINS_CSV']
 genotypeidLookup = {}
 rridLookup = {}
 facilityLookup = {}
@@ -103,26 +102,10 @@ def initialize():
         #print(rridLookup)
 
         # cache marker & provider
-        csvfile = open(IMSR_CSV, 'r')
-        reader = csv.reader(csvfile)
-        for r in reader:
-                allele_ids = r[0]
-                marker_ids = r[1]
-                provider = r[3]
-                strain_id = r[5].replace(':EuMMCR','EuMMCR')
-                for id in allele_ids.split(','):
-                    repositoryAlleleLookup.setdefault(id,[]).append(strain_id)
-                for id in marker_ids.split(','):
-                    facilityLookup.setdefault(id,[]).append(provider)
-                    repositoryGeneLookup.setdefault(id,[]).append(strain_id)
-
-        # unique and sort the provider list
-        for id, facilities in list(facilityLookup.items()):
-                facilityLookup[id] = list(set(facilities))
-                facilityLookup[id].sort()
-        #print(facilityLookup)
-        #print(repositoryAlleleLookup['MGI:1855953'])
-        #print(repositoryGeneLookup)
+        imsr = imsrcache.load()
+        repositoryAlleleLookup = imsr.alleleRepositories
+        facilityLookup = imsr.markerProviders
+        repositoryGeneLookup = imsr.markerRepositories
 
         # mouse/human orthologs
         db.sql('''
@@ -32,9 +32,13 @@ import sys
 import os
 import reportlib
 import db
+import reportdb
 
 db.setTrace()
 
+# reportdb reads the temp tables through db's shared session
+reportdb.init()
+
 CRT = reportlib.CRT
 
 fp = reportlib.init(sys.argv[0], outputdir = os.environ['REPORTOUTPUTDIR'], printHeading = None)
@@ -152,8 +156,6 @@ db.sql('''
         and not exists (select 1 from refs rr where ve._Refs_key = rr._Refs_key)
         ''', None)
 
-results = db.sql('select * from refs', 'auto')
-for r in results:
-    fp.write(r['accID'] + CRT)
+reportdb.export(fp, 'select accID from refs')
 
 reportlib.finish_nonps(fp)
@@ -42,10 +42,15 @@ import sys
 import os
 import mgi_utils
 import reportlib
+import accessioncache
 import db
+import reportdb
 
 db.setTrace()
 
+# reportdb reads the temp tables through db's shared session
+reportdb.init()
+
 CRT = reportlib.CRT
 TAB = reportlib.TAB
 
@@ -80,53 +85,25 @@ db.sql('''
 db.sql('create index idx_key on markers(_Marker_key)', None)
 
 # MGI ids
+# EntrezGene IDs for Primary Markers
+# Secondary MGI Ids for Primary Marker
+# (one ACC_Accession query of the current markers; see lib/accessioncache.py)
+
+MGIID = (2, 1, 'MGI:', 1)
+EGID = (2, 55, None, None)
+OTHERID = (2, 1, 'MGI:', 0)
+
+accIDs = accessioncache.resolve([MGIID, EGID, OTHERID], objects = 'select _Current_key from markers')
 
-results = db.sql('''
-        select m._Current_key, a.accID 
-        from markers m, ACC_Accession a 
-        where m._Current_key = a._Object_key 
-        and a._MGIType_key = 2 
-        and a.prefixPart = 'MGI:' 
-        and a._LogicalDB_key = 1 
-        and a.preferred = 1 
-        ''', 'auto')
 mgiID = {}
-for r in results:
-    key = r['_Current_key']
-    value = r['accID']
-    mgiID[key] = value
+for key in accIDs[MGIID]:
+    mgiID[key] = accIDs[MGIID][key][-1]
 
-# Get EntrezGene ID for Primary Markers
-results = db.sql('''
-        select m._Marker_key, a.accID 
-        from markers m, ACC_Accession a 
-        where m.isPrimary = 1 
-        and m._Marker_key = a._Object_key 
-        and a._MGIType_key = 2 
-        and a._LogicalDB_key = 55 
-        ''', 'auto')
 egID = {}
-for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    egID[key] = value
+for key in accIDs[EGID]:
+    egID[key] = accIDs[EGID][key][-1]
 
-# Get Secondary MGI Ids for Primary Marker
-results = db.sql('''
-        select m._Marker_key, a.accID 
-        from markers m, ACC_Accession a 
-        where m.isPrimary = 1 
-        and m._Marker_key = a._Object_key 
-        and a._MGIType_key = 2 
-        and a.prefixPart = 'MGI:' 
-        and a._LogicalDB_key = 1 
-        and a.preferred = 0
-        ''', 'auto')
-otherAccId = {}
-for r in results:
-        if r['_Marker_key'] not in otherAccId:
-                otherAccId[r['_Marker_key']] = []
-        otherAccId[r['_Marker_key']].append(r['accID'])
+otherAccId = accIDs[OTHERID]
 
 # Get Synonyms for Primary Marker
 results = db.sql('''
@@ -190,8 +167,9 @@ for r in results:
 
 #
 # coordinates
+# {_marker_key : [(startC, endC, strand, genomicChromosome)]}
 #
-results = db.sql('''	
+coords = reportdb.listLookup('''	
     select m._marker_key,
            c.strand, 
            c.startCoordinate::int as startC,
@@ -199,14 +177,7 @@ results = db.sql('''
            c.genomicChromosome
     from markers m, MRK_Location_Cache c
     where m._marker_key = c._marker_key
-        ''', 'auto')
-coords = {}
-for r in results:
-    key = r['_marker_key']
-    value = r
-    if key not in coords:
-        coords[key] = []
-    coords[key].append(value)
+        ''', '_marker_key', ('startC', 'endC', 'strand', 'genomicChromosome'))
 
 #
 # final query
@@ -242,7 +213,7 @@ for r in results:
 
         if r['_Marker_key'] in coords:
                 # genomic chromosome, if marker has coordinates
-                chromosome = coords[r['_Marker_key']][0]['genomicChromosome']
+                chromosome = coords[r['_Marker_key']][0][3]
 
         if not chromosome:
                 # genetic chromosome, if marker has no coordinates
@@ -278,9 +249,10 @@ for r in results:
 
                 # column 12-13-14
                 if r['_Marker_key'] in coords:
-                    fp.write(mgi_utils.prvalue(coords[r['_Marker_key']][0]['startC']) + TAB)
-                    fp.write(mgi_utils.prvalue(coords[r['_Marker_key']][0]['endC']) + TAB)
-                    fp.write(mgi_utils.prvalue(coords[r['_Marker_key']][0]['strand']) + TAB)
+                    startC, endC, strand, genomicChromosome = coords[r['_Marker_key']][0]
+                    fp.write(mgi_utils.prvalue(startC) + TAB)
+                    fp.write(mgi_utils.prvalue(endC) + TAB)
+                    fp.write(mgi_utils.prvalue(strand) + TAB)
                 else:
                     fp.write(TAB + TAB + TAB)
 
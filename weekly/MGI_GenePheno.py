@@ -74,9 +74,13 @@ import sys
 import os
 import reportlib
 import db
+import reportdb
 
 db.setTrace()
 
+# reportdb.stream() reads the temp tables through db's shared session
+reportdb.init()
+
 CRT = reportlib.CRT
 TAB = reportlib.TAB
 
@@ -336,7 +340,7 @@ for r in results:
 #
 # process results
 #
-results = db.sql('select distinct _Object_key, _Term_key from mp order by _Object_key, _Term_key', 'auto')
+results = reportdb.stream('select distinct _Object_key, _Term_key from mp order by _Object_key, _Term_key')
 
 for r in results:
 
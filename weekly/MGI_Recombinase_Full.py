@@ -48,12 +48,12 @@
 #
 '''
  
-import csv
 import sys 
 import os
 import reportlib
 import urllib.request, urllib.parse, urllib.error
 import db
+import imsrcache
 
 db.setTrace()
 
@@ -62,26 +62,6 @@ TAB = reportlib.TAB
 
 WI_URL = os.environ['WI_URL']
 
-IMSR_CSV = os.environ['IMSR_STRAINS_CSV']
-
-# functions
-def createImsrAlleleToStrainDict():
-        """
-        Reads in the IMSR allStrains.csv file and generates
-        a map of allele ID to strain name
-        """
-        strainNameMap = {}
-        csvfile = open(IMSR_CSV, 'r')
-        reader = csv.reader(csvfile)
-        for row in reader:
-                allele_ids = row[0]
-                strain_name = row[2]
-                if allele_ids and strain_name:
-                        for id in allele_ids.split(','):
-                                strainNameMap.setdefault(id, []).append(strain_name)
-
-        return strainNameMap
-
 introBLOG = '''
 <p>
 This report provides a list of all recombinase-containing alleles in the MGI database.
@@ -314,7 +294,7 @@ results = db.sql('''
         ''', 'auto')
 
 # map of imsr allele ID to strain names
-imsrStrainMap = createImsrAlleleToStrainDict()
+imsrStrainMap = imsrcache.load().alleleStrains
 
 imsrTAB = {}
 imsrHTML = {}
@@ -190,9 +190,13 @@ import os
 import mgi_utils
 import reportlib
 import db
+import reportdb
 
 db.setTrace()
 
+# reportdb reads the temp tables through db's shared session
+reportdb.init()
+
 TAB = reportlib.TAB
 CRT = reportlib.CRT
 
@@ -317,23 +321,16 @@ def iphone_genes():
     #
     # refs
     #
-    results = db.sql('''
+    refs = reportdb.listLookup('''
             select distinct m._marker_key, r.mgiid
             from markers m, MRK_Reference r
             where m._marker_key = r._marker_key
-            ''', 'auto')
-    refs = {}
-    for r in results:
-        key = r['_marker_key']
-        value = r
-        if key not in refs:
-            refs[key] = []
-        refs[key].append(value)
+            ''', '_marker_key', 'mgiid')
 
     #
     # alleles
     #
-    results = db.sql('''
+    alleles = reportdb.listLookup('''
             select distinct m._marker_key, a.accid
             from markers m, ALL_Allele aa, ACC_Accession a
             where m._marker_key = aa._marker_key
@@ -342,19 +339,12 @@ def iphone_genes():
             and a._logicaldb_key = 1
             and a.prefixpart = 'MGI:'
             and a.preferred = 1
-            ''', 'auto')
-    alleles = {}
-    for r in results:
-        key = r['_marker_key']
-        value = r['accid']
-        if key not in alleles:
-            alleles[key] = []
-        alleles[key].append(value)
+            ''', '_marker_key', 'accid')
 
     #
     # GO annotations
     #
-    results = db.sql('''
+    results = reportdb.rows('''
             select distinct m._marker_key, a.accid,d.dag
             from markers m, VOC_Annot aa, ACC_Accession a,VOC_term t, DAG_Node_View d
             where m._marker_key = aa._object_key
@@ -365,19 +355,17 @@ def iphone_genes():
             and aa._Term_key = t._Term_key
             and t._Term_key = d._Object_key 
             and t._Vocab_key = d._Vocab_key 
-            ''', 'auto')
+            ''')
     goCannots = {}
     goFannots = {}
     goPannots = {}
-    for r in results:
-        key = r['_marker_key']
-        value = r
+    for key, value, dag in results:
     
-        if r['dag'] == 'Cellular Component':
+        if dag == 'Cellular Component':
             goannots = goCannots
-        elif r['dag'] == 'Molecular Function':
+        elif dag == 'Molecular Function':
             goannots = goFannots
-        elif r['dag'] == 'Biological Process':
+        elif dag == 'Biological Process':
             goannots = goPannots
 
         if key not in goannots:
@@ -388,7 +376,7 @@ def iphone_genes():
     # Phenotype Annotations (now using MP/Marker annotations derived by the
     # rollupload product)
     #
-    results = db.sql('''
+    phenoannots = reportdb.listLookup('''
             select distinct m._marker_key, a.accid
             from markers m, VOC_Annot aa, ACC_Accession a
             where m._marker_key = aa._object_key
@@ -397,21 +385,13 @@ def iphone_genes():
             and a._mgitype_key = 13
             and a.preferred = 1
             and aa._Qualifier_key != %d
-            ''' % (MP_MARKER_ANNOT_TYPE, NORMAL_QUALIFIER), 'auto')
-    phenoannots = {}
-    for r in results:
-        key = r['_marker_key']
-        value = r
-    
-        if key not in phenoannots:
-            phenoannots[key] = []
-        phenoannots[key].append(value)
+            ''' % (MP_MARKER_ANNOT_TYPE, NORMAL_QUALIFIER), '_marker_key', 'accid')
 
     #
     # DO annotations rolled up to markers (now using DO/Marker annotations
     # derived by the rollupload)
     #
-    results = db.sql('''
+    dogenotype = reportdb.listLookup('''
             select distinct m._marker_key, a.accid
             from markers m, VOC_Annot aa, ACC_Accession a
             where m._marker_key = aa._object_key
@@ -420,15 +400,7 @@ def iphone_genes():
             and a._mgitype_key = 13
             and a.preferred = 1
             and aa._Qualifier_key != %d
-            ''' % (DO_MARKER_ANNOT_TYPE, NOT_QUALIFIER), 'auto')
-    dogenotype = {}
-    for r in results:
-        key = r['_marker_key']
-        value = r
-    
-        if key not in dogenotype:
-            dogenotype[key] = []
-        dogenotype[key].append(value)
+            ''' % (DO_MARKER_ANNOT_TYPE, NOT_QUALIFIER), '_marker_key', 'accid')
 
     #
     # DO human disease (_annottype_key = 1022)
@@ -455,7 +427,7 @@ def iphone_genes():
 
     db.sql('create index human_idx on human(_Cluster_key)', None)
 
-    results = db.sql('''select distinct m._marker_key, a.accid
+    dohuman = reportdb.listLookup('''select distinct m._marker_key, a.accid
             from markers m, mouse hm, human hh,
             VOC_Annot aa, ACC_Accession a
             where m._marker_key = hm._marker_key
@@ -464,15 +436,7 @@ def iphone_genes():
             and aa._annottype_key = 1022
             and aa._term_key = a._object_key
             and a._mgitype_key = 13
-            and a.preferred = 1''', 'auto')
-    dohuman = {}
-    for r in results:
-        key = r['_marker_key']
-        value = r
-    
-        if key not in dohuman:
-            dohuman[key] = []
-        dohuman[key].append(value)
+            and a.preferred = 1''', '_marker_key', 'accid')
 
     #
     # report
@@ -498,9 +462,9 @@ def iphone_genes():
             i=0
             for n in refs[key]:
                 if i>0:
-                   fp.write('|'+str(n['mgiid']))
+                   fp.write('|'+str(n))
                 else:
-                   fp.write(str(n['mgiid']))
+                   fp.write(str(n))
                    i=1;
             fp.write(TAB)
         else:
@@ -517,9 +481,9 @@ def iphone_genes():
             i=0
             for n in goCannots[key]:
                 if i>0:
-                   fp.write('|'+str(n['accid']))
+                   fp.write('|'+str(n))
                 else:
-                   fp.write(str(n['accid']))
+                   fp.write(str(n))
                    i=1
             fp.write(TAB)
         else:
@@ -530,9 +494,9 @@ def iphone_genes():
             i=0
             for n in goFannots[key]:
                 if i>0:
-                   fp.write('|'+str(n['accid']))
+                   fp.write('|'+str(n))
                 else:
-                   fp.write(str(n['accid']))
+                   fp.write(str(n))
                    i=1
             fp.write(TAB)
         else:
@@ -543,9 +507,9 @@ def iphone_genes():
             i=0
             for n in goPannots[key]:
                 if i>0:
-                   fp.write('|'+str(n['accid']))
+                   fp.write('|'+str(n))
                 else:
-                   fp.write(str(n['accid']))
+                   fp.write(str(n))
                    i=1
             fp.write(TAB)
         else:
@@ -556,9 +520,9 @@ def iphone_genes():
             i=0
             for n in phenoannots[key]:
                 if i>0:
-                   fp.write('|'+str(n['accid']))
+                   fp.write('|'+str(n))
                 else:
-                   fp.write(str(n['accid']))
+                   fp.write(str(n))
                    i=1
             fp.write(TAB)
         else:
@@ -569,9 +533,9 @@ def iphone_genes():
             i=0
             for n in dogenotype[key]:
                 if i>0:
-                   fp.write('|'+str(n['accid']))
+                   fp.write('|'+str(n))
                 else:
-                   fp.write(str(n['accid']))
+                   fp.write(str(n))
                    i=1
             fp.write(TAB)
         else:
@@ -582,9 +546,9 @@ def iphone_genes():
             i=0
             for n in dohuman[key]:
                 if i>0:
-                   fp.write('|'+str(n['accid']))
+                   fp.write('|'+str(n))
                 else:
-                   fp.write(str(n['accid']))
+                   fp.write(str(n))
                    i=1
             #fp.write(TAB)
         else:
@@ -625,26 +589,19 @@ def iphone_mp():
     #
     # Mammalian Phenotype/References
     #
-    results = db.sql('''
+    refs = reportdb.listLookup('''
             select distinct m._term_key, r.mgiid
             from mp m, VOC_Annot aa, VOC_Evidence e, BIB_Citation_Cache r
             where m._term_key = aa._term_key
             and aa._annottype_key = 1002
             and aa._annot_key = e._annot_key
             and e._refs_key = r._refs_key
-            ''', 'auto')
-    refs = {}
-    for r in results:
-        key = r['_term_key']
-        value = r
-        if key not in refs:
-            refs[key] = []
-        refs[key].append(value)
+            ''', '_term_key', 'mgiid')
 
     #
     # Mammalian Phenotype/Genotype by Genotype
     #
-    results = db.sql('''
+    genoannots = reportdb.listLookup('''
             select distinct m._term_key, a.accid
             from mp m, VOC_Annot aa, ACC_Accession a
             where m._term_key = aa._term_key
@@ -654,21 +611,13 @@ def iphone_mp():
             and a._logicaldb_key = 1
             and a.prefixpart = 'MGI:'
             and a.preferred = 1
-            ''', 'auto')
-    genoannots = {}
-    for r in results:
-        key = r['_term_key']
-        value = r['accid']
-    
-        if key not in genoannots:
-            genoannots[key] = []
-        genoannots[key].append(value)
+            ''', '_term_key', 'accid')
 
     #
     # Mammalian Phenotype/Genotype by Marker (updated to use the pre-computed
     # MP/Marker annotations, computed by rollupload)
     #
-    results = db.sql('''
+    markerannots = reportdb.listLookup('''
             select distinct m._term_key, a.accid
             from mp m, VOC_Annot aa, ACC_Accession a
             where m._term_key = aa._term_key
@@ -679,20 +628,12 @@ def iphone_mp():
             and a.prefixpart = 'MGI:'
             and a.preferred = 1
             and aa._Qualifier_key != %d
-            ''' % (MP_MARKER_ANNOT_TYPE, NORMAL_QUALIFIER), 'auto')
-    markerannots = {}
-    for r in results:
-        key = r['_term_key']
-        value = r['accid']
-    
-        if key not in markerannots:
-            markerannots[key] = []
-        markerannots[key].append(value)
+            ''' % (MP_MARKER_ANNOT_TYPE, NORMAL_QUALIFIER), '_term_key', 'accid')
 
     #
     # Mammalian Phenotype/Genotype by Allele
     #
-    results = db.sql('''
+    alleleannots = reportdb.listLookup('''
             select distinct m._term_key, a.accid
             from mp m, VOC_Annot aa, GXD_AlleleGenotype g, ACC_Accession a
             where m._term_key = aa._term_key
@@ -703,14 +644,7 @@ def iphone_mp():
             and a._logicaldb_key = 1
             and a.prefixpart = 'MGI:'
             and a.preferred = 1
-            ''', 'auto')
-    alleleannots = {}
-    for r in results:
-        key = r['_term_key']
-        value = r['accid']
-        if key not in alleleannots:
-            alleleannots[key] = []
-        alleleannots[key].append(value)
+            ''', '_term_key', 'accid')
 
     #
     # report
@@ -735,9 +669,9 @@ def iphone_mp():
             i=0
             for n in refs[key]:
                 if i>0:
-                   fp.write('|'+str(n['mgiid']))
+                   fp.write('|'+str(n))
                 else:
-                   fp.write(str(n['mgiid']))
+                   fp.write(str(n))
                    i=1
             fp.write(TAB)
         else:
@@ -797,26 +731,19 @@ def iphone_do():
     #
     # DO/Genotype/References
     #
-    results = db.sql('''
+    refs1 = reportdb.listLookup('''
             select distinct m._term_key, r.mgiid
             from diseaseontology m, VOC_Annot aa, VOC_Evidence e, BIB_Citation_Cache r
             where m._term_key = aa._term_key
             and aa._annottype_key = 1020
             and aa._annot_key = e._annot_key
             and e._refs_key = r._refs_key
-            ''', 'auto')
-    refs1 = {}
-    for r in results:
-        key = r['_term_key']
-        value = r
-        if key not in refs1:
-            refs1[key] = []
-        refs1[key].append(value)
+            ''', '_term_key', 'mgiid')
 
     #
     # DO/Genotype by Genotype
     #
-    results = db.sql('''
+    genoannots1 = reportdb.listLookup('''
             select distinct m._term_key, a.accid
             from diseaseontology m, VOC_Annot aa, ACC_Accession a
             where m._term_key = aa._term_key
@@ -826,20 +753,12 @@ def iphone_do():
             and a._logicaldb_key = 1
             and a.prefixpart = 'MGI:'
             and a.preferred = 1
-            ''', 'auto')
-    genoannots1 = {}
-    for r in results:
-        key = r['_term_key']
-        value = r['accid']
-    
-        if key not in genoannots1:
-            genoannots1[key] = []
-        genoannots1[key].append(value)
+            ''', '_term_key', 'accid')
 
     #
     # DO/Marker pairs (now updated to use ones pre-computed by rollupload)
     #
-    results = db.sql('''
+    markerannots1 = reportdb.listLookup('''
             select distinct m._term_key, a.accid
             from diseaseontology m, VOC_Annot aa, ACC_Accession a
             where m._term_key = aa._term_key
@@ -850,20 +769,12 @@ def iphone_do():
             and a.prefixpart = 'MGI:'
             and a.preferred = 1
             and aa._Qualifier_key != %d
-            ''' % (DO_MARKER_ANNOT_TYPE, NOT_QUALIFIER), 'auto')
-    markerannots1 = {}
-    for r in results:
-        key = r['_term_key']
-        value = r['accid']
-    
-        if key not in markerannots1:
-            markerannots1[key] = []
-        markerannots1[key].append(value)
+            ''' % (DO_MARKER_ANNOT_TYPE, NOT_QUALIFIER), '_term_key', 'accid')
 
     #
     # DO/Genotype by Allele
     #
-    results = db.sql('''
+    alleleannots1 = reportdb.listLookup('''
             select distinct m._term_key, a.accid
             from diseaseontology m, VOC_Annot aa, GXD_AlleleGenotype g, ACC_Accession a
             where m._term_key = aa._term_key
@@ -874,39 +785,24 @@ def iphone_do():
             and a._logicaldb_key = 1
             and a.prefixpart = 'MGI:'
             and a.preferred = 1
-            ''', 'auto')
-    alleleannots1 = {}
-    for r in results:
-        key = r['_term_key']
-        value = r['accid']
-    
-        if key not in alleleannots1:
-            alleleannots1[key] = []
-        alleleannots1[key].append(value)
+            ''', '_term_key', 'accid')
 
     #
     # DO/Human Marker/References
     #
-    results = db.sql('''
+    refs2 = reportdb.listLookup('''
             select distinct m._term_key, r.mgiid
             from diseaseontology m, VOC_Annot aa, VOC_Evidence e, BIB_Citation_Cache r
             where m._term_key = aa._term_key
             and aa._annottype_key = 1022
             and aa._annot_key = e._annot_key
             and e._refs_key = r._refs_key
-            ''', 'auto')
-    refs2 = {}
-    for r in results:
-        key = r['_term_key']
-        value = r
-        if key not in refs2:
-            refs2[key] = []
-        refs2[key].append(value)
+            ''', '_term_key', 'mgiid')
 
     #
     # DO/Human Marker by Marker
     #
-    results = db.sql('''
+    markerannots2 = reportdb.listLookup('''
             select distinct m._term_key, a.accid
             from diseaseontology m, VOC_Annot aa, ACC_Accession a
             where m._term_key = aa._term_key
@@ -915,15 +811,7 @@ def iphone_do():
             and a._mgitype_key = 2
             and a._logicaldb_key = 55
             and a.preferred = 1
-            ''', 'auto')
-    markerannots2 = {}
-    for r in results:
-        key = r['_term_key']
-        value = r['accid']
-    
-        if key not in markerannots2:
-            markerannots2[key] = []
-        markerannots2[key].append(value)
+            ''', '_term_key', 'accid')
 
     #
     # report
@@ -943,9 +831,9 @@ def iphone_do():
             i=0
             for n in refs1[key]:
                 if i>0:
-                   fp.write('|'+str(n['mgiid']))
+                   fp.write('|'+str(n))
                 else:
-                   fp.write(str(n['mgiid']))
+                   fp.write(str(n))
                    i=1
             fp.write(TAB)
         else:
@@ -978,9 +866,9 @@ def iphone_do():
             i=0
             for n in refs2[key]:
                 if i>0:
-                   fp.write('|'+str(n['mgiid']))
+                   fp.write('|'+str(n))
                 else:
-                   fp.write(str(n['mgiid']))
+                   fp.write(str(n))
                    i=1
             fp.write(TAB)
         else:
@@ -50,9 +50,13 @@ import os
 import mgi_utils
 import reportlib
 import db
+import reportdb
 
 db.setTrace()
 
+# reportdb reads the temp tables through db's shared session
+reportdb.init()
+
 CRT = reportlib.CRT
 TAB = reportlib.TAB
 
@@ -166,22 +170,16 @@ for r in results:
 
 #
 # coordinates
+# {_marker_key : [(startC, endC, strand)]}
 #
-results = db.sql('''	
+coords = reportdb.listLookup('''	
     select m._marker_key,
            c.strand, 
            c.startCoordinate::int as startC,
            c.endCoordinate::int as endC
     from markers m, MRK_Location_Cache c
     where m._marker_key = c._marker_key
-        ''', 'auto')
-coords = {}
-for r in results:
-    key = r['_marker_key']
-    value = r
-    if key not in coords:
-        coords[key] = []
-    coords[key].append(value)
+        ''', '_marker_key', ('startC', 'endC', 'strand'))
 
 #
 # biotype
@@ -242,9 +240,10 @@ for r in results:
 
     # column 10-11-12
     if key in coords:
-        fp.write(mgi_utils.prvalue(coords[r['_Marker_key']][0]['startC']) + TAB)
-        fp.write(mgi_utils.prvalue(coords[r['_Marker_key']][0]['endC']) + TAB)
-        fp.write(mgi_utils.prvalue(coords[r['_Marker_key']][0]['strand']) + TAB)
+        startC, endC, strand = coords[r['_Marker_key']][0]
+        fp.write(mgi_utils.prvalue(startC) + TAB)
+        fp.write(mgi_utils.prvalue(endC) + TAB)
+        fp.write(mgi_utils.prvalue(strand) + TAB)
     else:
         fp.write(TAB + TAB + TAB)
 
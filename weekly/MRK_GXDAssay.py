@@ -29,9 +29,13 @@ import sys
 import os
 import reportlib
 import db
+import reportdb
 
 db.setTrace()
 
+# reportdb reads the temp tables through db's shared session
+reportdb.init()
+
 TAB = reportlib.TAB
 CRT = reportlib.CRT
 
@@ -41,7 +45,7 @@ CRT = reportlib.CRT
 
 fp = reportlib.init(sys.argv[0], outputdir = os.environ['REPORTOUTPUTDIR'], printHeading = None)
 
-results = db.sql('''
+ids = reportdb.listLookup('''
         select distinct a.accID, g._Marker_key 
         from GXD_Assay g, ACC_Accession a 
         where g._AssayType_key not in (10,11) 
@@ -50,14 +54,7 @@ results = db.sql('''
         and a.prefixPart = 'MGI:' 
         and a._LogicalDB_key = 1 
         and a.preferred = 1
-        ''', 'auto')
-ids = {}
-for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    if key not in ids:
-        ids[key] = []
-    ids[key].append(value)
+        ''', '_Marker_key', 'accID')
 
 results = db.sql('''
         select distinct a.accID, m._Marker_key, m.symbol 
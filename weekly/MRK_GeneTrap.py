@@ -31,6 +31,7 @@
 import sys
 import os
 import reportlib
+import markercache
 import db
 
 db.setTrace()
@@ -41,51 +42,30 @@ db.setTrace()
 
 fp = reportlib.init(sys.argv[0], outputdir = os.environ['REPORTOUTPUTDIR'], printHeading = None)
 
-# all official mouse markers that have at least one Gene Trap
-
-db.sql('''
-        select m._Marker_key, m.symbol, m.name, m.chromosome, 
-        m.cmoffset, 
-        upper(substring(s.status, 1, 1)) as markerStatus,        
-        t.name as markerType 
-        into temporary table markers 
-        from MRK_Marker m, MRK_Status s, MRK_Types t 
-        where m._Organism_key = 1 
-        and m._Marker_Status_key = 1 
-        and m._Marker_Status_key = s._Marker_Status_key 
-        and m._Marker_Type_key = t._Marker_Type_key 
-        and exists (select 1 from ALL_Allele a 
-        where m._Marker_key = a._Marker_key
-        and a.isMixed = 0 
-        and a._Allele_Type_key = 847121)
-        ''', None)
-db.sql('create index idx1 on markers(_Marker_key)', None)
-db.sql('create index idx2 on markers(symbol)', None)
+# marker symbol, name, status, type, chromosome, cM offset, MGI id
+markers = markercache.load()
 
-# MGI ids
+# all official mouse markers that have at least one Gene Trap
 
 results = db.sql('''
-        select distinct m._Marker_key, a.accID 
-        from markers m, ACC_Accession a 
-        where m._Marker_key = a._Object_key 
-        and a._MGIType_key = 2 
-        and a._LogicalDB_key = 1 
-        and a.prefixPart = 'MGI:' 
-        and a.preferred = 1
+        select distinct a._Marker_key 
+        from ALL_Allele a 
+        where a.isMixed = 0 
+        and a._Allele_Type_key = 847121
+        and a._Marker_key is not null
         ''', 'auto')
-mgiID = {}
+geneTraps = []
 for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    mgiID[key] = value
+    m = markers.get(r['_Marker_key'])
+    if m is not None and m['_Organism_key'] == 1 and m['_Marker_Status_key'] == 1:
+        geneTraps.append(m)
 
 # Mutant Cell Line for gene traps
 
 results = db.sql('''
-        select distinct m._Marker_key, c.cellLine 
-        from markers m, ALL_Allele a, ALL_Allele_CellLine ac, ALL_Cellline c 
-        where m._Marker_key = a._Marker_key 
-        and a._Allele_Type_key = 847121 
+        select distinct a._Marker_key, c.cellLine 
+        from ALL_Allele a, ALL_Allele_CellLine ac, ALL_Cellline c 
+        where a._Allele_Type_key = 847121 
         and a.isMixed = 0 
         and a._Allele_key = ac._Allele_key 
         and ac._MutantCellLine_key = c._CellLine_key 
@@ -101,9 +81,9 @@ for r in results:
 
 # process
 
-results = db.sql('select * from markers order by symbol', 'auto')
+geneTraps.sort(key = lambda m: m['symbolOrder'])
 
-for r in results:
+for r in geneTraps:
         key = r['_Marker_key']
 
         if r['cmoffset'] == -1.0:
@@ -113,9 +93,9 @@ for r in results:
         else:
                 cmoffset = str(r['cmoffset'])
 
-        fp.write(mgiID[key] + reportlib.TAB + \
+        fp.write(r['mgiID'] + reportlib.TAB + \
                  r['symbol'] + reportlib.TAB + \
-                 r['markerStatus'] + reportlib.TAB + \
+                 r['status'][0].upper() + reportlib.TAB + \
                  r['markerType'] + reportlib.TAB + \
                  r['name'] + reportlib.TAB + \
                  cmoffset + reportlib.TAB + \
@@ -36,9 +36,13 @@ import os
 import mgi_utils
 import reportlib
 import db
+import reportdb
 
 db.setTrace()
 
+# reportdb.stream() reads the temp tables through db's shared session
+reportdb.init()
+
 TAB = reportlib.TAB
 CRT = reportlib.CRT
 
@@ -90,22 +94,16 @@ db.sql('create index markers_idx2 on markers(symbol)', None)
 
 #
 # coordinates
+# {_marker_key : [(startC, endC, strand)]}
 #
-results = db.sql('''	
+coords = reportdb.listLookup('''	
     select m._marker_key,
            c.strand, 
            c.startCoordinate::int as startC,
            c.endCoordinate::int as endC
     from markers m, MRK_Location_Cache c
     where m._marker_key = c._marker_key
-        ''', 'auto')
-coords = {}
-for r in results:
-    key = r['_marker_key']
-    value = r
-    if key not in coords:
-        coords[key] = []
-    coords[key].append(value)
+        ''', '_marker_key', ('startC', 'endC', 'strand'))
 
 #
 # feature types
@@ -133,21 +131,14 @@ for r in results:
 #
 # synonyms
 #
-results = db.sql('''	
+synonyms = reportdb.listLookup('''	
     select m._marker_key, s.synonym
     from markers m, MGI_Synonym s, MGI_SynonymType st
     where m._marker_key = s._object_key
     and s._mgitype_key = 2
     and s._synonymtype_key = st._synonymtype_key
     and st.synonymtype = 'exact'
-        ''', 'auto')
-synonyms = {}
-for r in results:
-    key = r['_marker_key']
-    value = r['synonym']
-    if key not in synonyms:
-        synonyms[key] = []
-    synonyms[key].append(value)
+        ''', '_marker_key', 'synonym')
 
 #
 # main report
@@ -225,7 +216,7 @@ query3 = '''
 #
 # include withdrawns
 #
-results = db.sql('(%s union %s union %s) order by symbol' % (query1, query2, query3), 'auto')
+results = reportdb.stream('(%s union %s union %s) order by symbol' % (query1, query2, query3))
 for r in results:
 
     key = r['_marker_key']
@@ -251,9 +242,10 @@ for r in results:
     fp1.write(r['cmposition'] + TAB)
 
     if key in coords:
-        fp1.write(mgi_utils.prvalue(coords[key][0]['startC']) + TAB)
-        fp1.write(mgi_utils.prvalue(coords[key][0]['endC']) + TAB)
-        fp1.write(mgi_utils.prvalue(coords[key][0]['strand']) + TAB)
+        startC, endC, strand = coords[key][0]
+        fp1.write(mgi_utils.prvalue(startC) + TAB)
+        fp1.write(mgi_utils.prvalue(endC) + TAB)
+        fp1.write(mgi_utils.prvalue(strand) + TAB)
     else:
         fp1.write(TAB + TAB + TAB)
 
@@ -277,7 +269,7 @@ for r in results:
 #
 # do not include withdrawns
 #
-results = db.sql('%s order by symbol' % (query1), 'auto')
+results = reportdb.stream('%s order by symbol' % (query1))
 for r in results:
 
     key = r['_marker_key']
@@ -304,9 +296,10 @@ for r in results:
     fp2.write(r['cmposition'] + TAB)
 
     if key in coords:
-        fp2.write(mgi_utils.prvalue(coords[key][0]['startC']) + TAB)
-        fp2.write(mgi_utils.prvalue(coords[key][0]['endC']) + TAB)
-        fp2.write(mgi_utils.prvalue(coords[key][0]['strand']) + TAB)
+        startC, endC, strand = coords[key][0]
+        fp2.write(mgi_utils.prvalue(startC) + TAB)
+        fp2.write(mgi_utils.prvalue(endC) + TAB)
+        fp2.write(mgi_utils.prvalue(strand) + TAB)
     else:
         fp2.write(TAB + TAB + TAB)
 
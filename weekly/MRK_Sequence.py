@@ -77,9 +77,14 @@ import os
 import mgi_utils
 import reportlib
 import db
+import reportdb
+import reportcontext
 
 db.setTrace()
 
+# reportdb reads the temp tables through db's shared session
+reportdb.init()
+
 TAB = reportlib.TAB
 CRT = reportlib.CRT
 
@@ -113,18 +118,9 @@ fp.write('UniGene IDs\t')
 fp.write('Feature Type\n')
 
 # deleted sequences
+# shared by the reports run in the same session; see lib/reportcontext.py
 
-db.sql('select s._Sequence_key into temporary table deleted from SEQ_Sequence s where s._SequenceStatus_key = 316343', None)
-db.sql('create index deleted_idx1 on deleted(_Sequence_key)', None)
-
-db.sql('''
-    select a.accID, a._LogicalDB_key 
-    into temporary table deletedIDs from deleted d, ACC_Accession a 
-    where d._Sequence_key = a._Object_key 
-    and a._MGIType_key = 19
-    ''', None)
-db.sql('create index deletedIDS_idx1 on deletedIDs(accID)', None)
-db.sql('create index deletedIDS_idx2 on deletedIDs(_LogicalDB_key)', None)
+deletedIDs = reportcontext.current().table('deletedIDs')
 
 # all official mouse markers that have at least one Sequence ID
 #
@@ -184,160 +180,68 @@ for r in results:
     mcvTerms[key].append(term)
 #
 # coordinates
+# {_marker_key : [(startC, endC, strand)]}
 #
-results = db.sql('''	
+coords = reportdb.listLookup('''	
     select m._marker_key,
            c.strand, 
            c.startCoordinate::int as startC,
            c.endCoordinate::int as endC
     from markers m, MRK_Location_Cache c
     where m._marker_key = c._marker_key
-        ''', 'auto')
-coords = {}
-for r in results:
-    key = r['_marker_key']
-    value = r
-    if key not in coords:
-        coords[key] = []
-    coords[key].append(value)
+        ''', '_marker_key', ('startC', 'endC', 'strand'))
 
-# GenBank ids
-results = db.sql('''
-      select distinct m._Marker_key, a.accID 
-      from markers m, ACC_Accession a 
-      where m._Marker_key = a._Object_key 
-      and a._MGIType_key = 2 
-      and a._LogicalDB_key = 9 
-      and not exists (select 1 from deletedIDs d where a.accID = d.accID and a._LogicalDB_key = d._LogicalDB_key)
-      ''', 'auto')
-gbID = {}
-for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    if key not in gbID:
-        gbID[key] = []
-    gbID[key].append(value)
-# UniGene ids
+# sequence ids, by logical db
+#
+#	9	GenBank
+#	23	UniGene
+#	27	RefSeq transcript (not "XP_" or "NP_"), RefSeq protein ("XP_", "NP_")
+#	133	Ensembl transcript
+#	134	Ensembl protein
+#	13	UniProt
+#	41	TrEMBL
+#
+# one scan of ACC_Accession for all of them, without the deleted sequences
 
-results = db.sql('''
-      select distinct m._Marker_key, a.accID
-      from markers m, ACC_Accession a
-      where m._Marker_key = a._Object_key
-      and a._MGIType_key = 2
-      and a._LogicalDB_key = 23
-      and not exists (select 1 from deletedIDs d where a.accID = d.accID and a. _LogicalDB_key = d._LogicalDB_key)
-      ''', 'auto')
+gbID = {}
 ugID = {}
-for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    if key not in ugID:
-        ugID[key] = []
-    ugID[key].append(value)
-
-# RefSeq transcript ids
-results = db.sql('''
-      select distinct m._Marker_key, a.accID 
-      from markers m, ACC_Accession a 
-      where m._Marker_key = a._Object_key 
-      and a._MGIType_key = 2 
-      and a._LogicalDB_key = 27 
-      and a.prefixPart not in ('XP_', 'NP_') 
-      and not exists (select 1 from deletedIDs d where a.accID = d.accID and a._LogicalDB_key = d._LogicalDB_key)
-      ''', 'auto')
 rstrans = {}
-for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    if key not in rstrans:
-        rstrans[key] = []
-    rstrans[key].append(value)
-
-# RefSeq protein ids
-results = db.sql('''
-      select distinct m._Marker_key, a.accID 
-      from markers m, ACC_Accession a 
-      where m._Marker_key = a._Object_key 
-      and a._MGIType_key = 2 
-      and a._LogicalDB_key = 27 
-      and a.prefixPart in ('XP_', 'NP_') 
-      and not exists (select 1 from deletedIDs d where a.accID = d.accID and a._LogicalDB_key = d._LogicalDB_key)
-      ''', 'auto')
 rsprot = {}
-for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    if key not in rsprot:
-        rsprot[key] = []
-    rsprot[key].append(value)
-
-# Ensembl transript IDs
-results = db.sql('''
-      select distinct m._Marker_key, a.accID 
-      from markers m, ACC_Accession a 
-      where m._Marker_key = a._Object_key 
-      and a._MGIType_key = 2 
-      and a._LogicalDB_key = 133 
-      and not exists (select 1 from deletedIDs d where a.accID = d.accID and a._LogicalDB_key = d._LogicalDB_key)
-      ''', 'auto')
 enstrans = {}
-for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    if key not in enstrans:
-        enstrans[key] = []
-    enstrans[key].append(value)
-
-# Ensembl protein IDs
-results = db.sql('''
-      select distinct m._Marker_key, a.accID 
-      from markers m, ACC_Accession a 
-      where m._Marker_key = a._Object_key 
-      and a._MGIType_key = 2 
-      and a._LogicalDB_key = 134 
-      and not exists (select 1 from deletedIDs d where a.accID = d.accID and a._LogicalDB_key = d._LogicalDB_key)
-      ''', 'auto')
 ensprot = {}
-for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    if key not in ensprot:
-        ensprot[key] = []
-    ensprot[key].append(value)
-
-# UniProt ids
-results = db.sql('''
-      select distinct m._Marker_key, a.accID 
-      from markers m, ACC_Accession a 
-      where m._Marker_key = a._Object_key 
-      and a._MGIType_key = 2 
-      and a._LogicalDB_key = 13
-      and not exists (select 1 from deletedIDs d where a.accID = d.accID and a._LogicalDB_key = d._LogicalDB_key)
-      ''', 'auto')
 uniprotID = {}
-for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    if key not in uniprotID:
-        uniprotID[key] = []
-    uniprotID[key].append(value)
+tremblID = {}
 
-# TrEMBL ids
-results = db.sql('''
-      select distinct m._Marker_key, a.accID 
+seqIDs = {
+        9 : gbID,
+        23 : ugID,
+        133 : enstrans,
+        134 : ensprot,
+        13 : uniprotID,
+        41 : tremblID,
+}
+
+results = reportdb.rows('''
+      select distinct m._Marker_key, a._LogicalDB_key, a.prefixPart, a.accID 
       from markers m, ACC_Accession a 
       where m._Marker_key = a._Object_key 
       and a._MGIType_key = 2 
-      and a._LogicalDB_key = 41
-      and not exists (select 1 from deletedIDs d where a.accID = d.accID and a._LogicalDB_key = d._LogicalDB_key)
-      ''', 'auto')
-tremblID = {}
-for r in results:
-    key = r['_Marker_key']
-    value = r['accID']
-    if key not in tremblID:
-        tremblID[key] = []
-    tremblID[key].append(value)
+      and a._LogicalDB_key in (9, 23, 27, 133, 134, 13, 41) 
+      and not exists (select 1 from %s d where a.accID = d.accID and a._LogicalDB_key = d._LogicalDB_key)
+      ''' % (deletedIDs))
+for key, logicalDB, prefixPart, value in results:
+    if logicalDB == 27:
+        if prefixPart is None:
+            continue
+        if prefixPart in ('XP_', 'NP_'):
+            lookup = rsprot
+        else:
+            lookup = rstrans
+    else:
+        lookup = seqIDs[logicalDB]
+    if key not in lookup:
+        lookup[key] = []
+    lookup[key].append(value)
 
 # process
 
@@ -385,9 +289,10 @@ for r in results:
 
         # genome coordinates: column 8-9-10
         if key in coords:
-                fp.write(mgi_utils.prvalue(coords[r['_Marker_key']][0]['startC']) + TAB)
-                fp.write(mgi_utils.prvalue(coords[r['_Marker_key']][0]['endC']) + TAB)
-                fp.write(mgi_utils.prvalue(coords[r['_Marker_key']][0]['strand']) + TAB)
+                startC, endC, strand = coords[r['_Marker_key']][0]
+                fp.write(mgi_utils.prvalue(startC) + TAB)
+                fp.write(mgi_utils.prvalue(endC) + TAB)
+                fp.write(mgi_utils.prvalue(strand) + TAB)
         else:
                 fp.write(TAB + TAB + TAB)
 